@@ -0,0 +1,329 @@
+# app/api.py
+"""
+Async HTTP API around the single-document pipeline (app.main.process_pdf_file).
+Run from project root:
+uvicorn app.api:app --host 0.0.0.0 --port 8000
+
+  POST /jobs              upload a PDF (+ settings) -> {"job_id", "status", "deduplicated"}
+  GET  /jobs/{job_id}     status
+  GET  /jobs/{job_id}/result
+  POST /summarize         synchronous, for small PDFs (<= API_SYNC_MAX_BYTES)
+  POST /summarize/stream  NDJSON stream of stage events (stats, citations, summary, Hindi, result;
+                          summary tokens with stream_tokens=true)
+  GET  /health
+
+Uploads are deduplicated by md5 + settings: the same PDF submitted twice with the same settings
+maps to the same job. Model work runs in small thread pools fed from asyncio queues, never on the
+event loop: /jobs in the bulk lane (API_WORKERS, default 1), /summarize and /summarize/stream in
+their own sync lane (API_SYNC_WORKERS, default 1), so an interactive request never waits behind
+queued large jobs. A sync
+request for a job still queued in the bulk lane moves it to the sync lane.
+
+Several server processes sharing one copy of the weights: set API_PRELOAD_MODELS=1 (and optionally
+MODEL_MMAP=1) and let gunicorn import the app before forking its workers:
+API_PRELOAD_MODELS=1 API_PROCESSES=4 gunicorn --preload -k uvicorn.workers.UvicornWorker -w 4 app.api:app
+
+Threads: the CPU plan (scripts.autotune) is applied at import with the physical cores split between
+API_PROCESSES server processes (set it to gunicorn's -w; default WEB_CONCURRENCY, else 1). Thread
+and batch variables already set in the environment are kept.
+
+Env: API_UPLOAD_DIR (.api_uploads), API_WORKERS (1), API_SYNC_WORKERS (1), API_SYNC_MAX_BYTES (2 MB),
+API_MAX_JOBS (1000),
+API_PRELOAD_MODELS (0), API_PROCESSES.
+"""
+import os
+import time
+import uuid
+import json
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+
+from src.utils import safe_filename
+from src.pipeline.planner import load_plan, apply_plan
+
+logger = logging.getLogger("api")
+
+UPLOAD_DIR = Path(os.environ.get("API_UPLOAD_DIR", ".api_uploads"))
+WORKERS = int(os.environ.get("API_WORKERS", 1))
+SYNC_WORKERS = int(os.environ.get("API_SYNC_WORKERS", 1))
+SYNC_MAX_BYTES = int(os.environ.get("API_SYNC_MAX_BYTES", 2 * 1024 * 1024))
+MAX_JOBS = int(os.environ.get("API_MAX_JOBS", 1000))
+PROCESSES = int(os.environ.get("API_PROCESSES") or os.environ.get("WEB_CONCURRENCY") or 1)
+
+MODES = ("generative", "extractive")
+
+
+def _preload_models():
+    # load everything in the master process; gunicorn --preload forks the workers afterwards
+    from src.inference.prefork import warm_up
+    from app.main import _get_model
+    _get_model()
+    warm_up("extractive", translate=True)   # SBERT + translators; the mT5 summarizer is _get_model
+
+
+# before any model loads (and before gunicorn --preload forks, so every worker inherits its share)
+apply_plan(load_plan(), processes=PROCESSES)
+
+if os.environ.get("API_PRELOAD_MODELS", "0").lower() in ("1", "true", "yes", "on"):
+    _preload_models()
+
+
+def _process(pdf_path, settings):
+    # imported lazily: loading the pipeline pulls in the models
+    from app.main import process_pdf_file
+    return process_pdf_file(pdf_path, **settings)
+
+
+def _iter_process(pdf_path, settings):
+    from app.main import iter_process_pdf_file
+    return iter_process_pdf_file(pdf_path, **settings)
+
+
+class JobManager:
+    """In-memory job table + queue; finished jobs beyond API_MAX_JOBS are forgotten oldest-first."""
+
+    def __init__(self, workers: int = WORKERS, max_jobs: int = MAX_JOBS, process_fn=_process,
+                 sync_workers: int = SYNC_WORKERS):
+        self.jobs = {}          # job_id -> job dict
+        self.by_key = {}        # md5:settings hash -> job_id
+        self.max_jobs = max_jobs
+        self.process_fn = process_fn
+        self.n_workers = workers
+        self.n_sync_workers = sync_workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-model")
+        self.sync_executor = ThreadPoolExecutor(max_workers=sync_workers, thread_name_prefix="api-sync")
+        self.queue: Optional[asyncio.Queue] = None        # bulk lane (/jobs)
+        self.sync_queue: Optional[asyncio.Queue] = None   # sync lane (/summarize)
+        self._tasks = []
+
+    async def start(self):
+        self.queue, self.sync_queue = asyncio.Queue(), asyncio.Queue()
+        self._tasks = ([asyncio.create_task(self._worker("bulk")) for _ in range(self.n_workers)]
+                       + [asyncio.create_task(self._worker("sync")) for _ in range(self.n_sync_workers)])
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.sync_executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def key(md5: str, settings: dict) -> str:
+        return md5 + ":" + hashlib.sha1(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+    def submit(self, md5: str, pdf_path: Path, settings: dict, sync: bool = False):
+        """(job, deduplicated). A failed job is retried on resubmission. sync=True: the sync lane."""
+        key = self.key(md5, settings)
+        lane = "sync" if sync else "bulk"
+        job = self.jobs.get(self.by_key.get(key))
+        if job is not None and job["status"] != "failed":
+            if sync and job["status"] == "queued" and job["lane"] == "bulk":
+                # someone is waiting on it: the bulk worker skips it once it is in the sync lane
+                job["lane"] = "sync"
+                self.sync_queue.put_nowait(job["job_id"])
+            return job, True
+        job = {
+            "job_id": uuid.uuid4().hex, "key": key, "md5": md5, "filename": pdf_path.name,
+            "pdf_path": str(pdf_path), "settings": settings, "status": "queued",
+            "created_at": time.time(), "started_at": None, "finished_at": None,
+            "result": None, "error": None, "done": asyncio.Event(), "lane": lane,
+        }
+        self.jobs[job["job_id"]] = job
+        self.by_key[key] = job["job_id"]
+        (self.sync_queue if sync else self.queue).put_nowait(job["job_id"])
+        self._evict()
+        return job, False
+
+    def _evict(self):
+        finished = [j for j in self.jobs.values() if j["status"] in ("done", "failed")]
+        for j in sorted(finished, key=lambda j: j["finished_at"])[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[j["job_id"]]
+            if self.by_key.get(j["key"]) == j["job_id"]:
+                del self.by_key[j["key"]]
+
+    async def _worker(self, lane):
+        loop = asyncio.get_running_loop()
+        queue, executor = (self.sync_queue, self.sync_executor) if lane == "sync" else (self.queue, self.executor)
+        while True:
+            job_id = await queue.get()
+            job = self.jobs.get(job_id)
+            if job is None or job["status"] != "queued" or job["lane"] != lane:
+                continue   # evicted, or moved to the sync lane
+            job["status"], job["started_at"] = "running", time.time()
+            try:
+                job["result"] = await loop.run_in_executor(executor, self.process_fn, job["pdf_path"], job["settings"])
+                job["status"] = "done"
+            except Exception as e:
+                logger.exception("job %s failed", job_id)
+                job["status"], job["error"] = "failed", str(e)
+            job["finished_at"] = time.time()
+            job["done"].set()
+
+    def position(self, job):
+        if job["status"] != "queued":
+            return None
+        queued = sorted((j for j in self.jobs.values() if j["status"] == "queued" and j["lane"] == job["lane"]),
+                        key=lambda j: j["created_at"])
+        return [j["job_id"] for j in queued].index(job["job_id"])
+
+
+def job_status(job, manager=None):
+    out = {k: job[k] for k in ("job_id", "status", "lane", "md5", "filename", "settings",
+                               "created_at", "started_at", "finished_at", "error")}
+    if manager is not None:
+        out["queue_position"] = manager.position(job)
+    return out
+
+
+async def _save_upload(file: UploadFile, max_bytes: Optional[int] = None):
+    """Stream the upload to disk while hashing; stored once per content as <md5>/<name>.pdf."""
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = UPLOAD_DIR / f".{uuid.uuid4().hex}.part"
+    h, size = hashlib.md5(), 0
+    try:
+        with tmp.open("wb") as f:
+            while chunk := await file.read(1 << 20):
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise HTTPException(413, f"PDF larger than {max_bytes} bytes; use POST /jobs")
+                h.update(chunk)
+                f.write(chunk)
+        md5 = h.hexdigest()
+        dest_dir = UPLOAD_DIR / md5; dest_dir.mkdir(exist_ok=True)
+        dest = dest_dir / f"{safe_filename(Path(file.filename or 'upload').stem) or 'upload'}.pdf"
+        if dest.exists():
+            tmp.unlink()
+        else:
+            os.replace(tmp, dest)
+        return md5, dest
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _settings(ocr, ocr_page_limit, salience_threshold, max_contexts, translate_to_hi, mode, lazy_translation,
+              stream_tokens=False):
+    if mode not in MODES:
+        raise HTTPException(422, f"mode must be one of {MODES}")
+    # stream_tokens (greedy decoding) changes the summary, so it is part of the dedup key
+    return {"ocr": ocr, "ocr_page_limit": ocr_page_limit, "salience_threshold": salience_threshold,
+            "max_contexts": max_contexts, "translate_to_hi": translate_to_hi, "mode": mode,
+            "lazy_translation": lazy_translation, "stream_tokens": stream_tokens}
+
+
+manager = JobManager()
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    await manager.start()
+    yield
+    await manager.stop()
+
+
+app = FastAPI(title="Legal Summarizer API", lifespan=lifespan)
+
+
+@app.get("/health")
+async def health():
+    queued = {lane: sum(1 for j in manager.jobs.values() if j["status"] == "queued" and j["lane"] == lane)
+              for lane in ("bulk", "sync")}
+    return {"status": "ok", "workers": manager.n_workers, "sync_workers": manager.n_sync_workers,
+            "queued": queued["bulk"], "sync_queued": queued["sync"], "jobs": len(manager.jobs)}
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(file: UploadFile = File(...),
+                     ocr: bool = Form(False), ocr_page_limit: Optional[int] = Form(None),
+                     salience_threshold: float = Form(0.55), max_contexts: int = Form(8),
+                     translate_to_hi: bool = Form(True), mode: str = Form("generative"),
+                     lazy_translation: bool = Form(False)):
+    settings = _settings(ocr, ocr_page_limit, salience_threshold, max_contexts, translate_to_hi, mode, lazy_translation)
+    md5, path = await _save_upload(file)
+    job, dedup = manager.submit(md5, path, settings)
+    return {"job_id": job["job_id"], "status": job["status"], "deduplicated": dedup}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = manager.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Unknown job")
+    return job_status(job, manager)
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_result(job_id: str):
+    job = manager.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Unknown job")
+    if job["status"] == "failed":
+        raise HTTPException(500, job["error"])
+    if job["status"] != "done":
+        raise HTTPException(409, f"Job is {job['status']}")
+    return job["result"]
+
+
+@app.post("/summarize")
+async def summarize_sync(file: UploadFile = File(...),
+                         ocr: bool = Form(False), ocr_page_limit: Optional[int] = Form(None),
+                         salience_threshold: float = Form(0.55), max_contexts: int = Form(8),
+                         translate_to_hi: bool = Form(True), mode: str = Form("generative"),
+                         lazy_translation: bool = Form(False)):
+    """Small documents: same dedup as /jobs, processed in the sync lane; waits for the result."""
+    settings = _settings(ocr, ocr_page_limit, salience_threshold, max_contexts, translate_to_hi, mode, lazy_translation)
+    md5, path = await _save_upload(file, max_bytes=SYNC_MAX_BYTES)
+    job, _ = manager.submit(md5, path, settings, sync=True)
+    await job["done"].wait()
+    if job["status"] == "failed":
+        raise HTTPException(500, job["error"])
+    return job["result"]
+
+
+async def _event_stream(pdf_path, settings):
+    """Run the event generator on a sync-lane thread and relay its events as NDJSON lines."""
+    loop = asyncio.get_running_loop()
+    q = asyncio.Queue()
+
+    def run():
+        try:
+            for ev in _iter_process(str(pdf_path), settings):
+                loop.call_soon_threadsafe(q.put_nowait, ev)
+        except Exception as e:
+            logger.exception("streaming run failed for %s", pdf_path)
+            loop.call_soon_threadsafe(q.put_nowait, {"event": "error", "error": str(e)})
+        finally:
+            loop.call_soon_threadsafe(q.put_nowait, None)
+
+    loop.run_in_executor(manager.sync_executor, run)
+    while (ev := await q.get()) is not None:
+        yield json.dumps(ev, ensure_ascii=False) + "\n"
+
+
+@app.post("/summarize/stream")
+async def summarize_stream(file: UploadFile = File(...),
+                           ocr: bool = Form(False), ocr_page_limit: Optional[int] = Form(None),
+                           salience_threshold: float = Form(0.55), max_contexts: int = Form(8),
+                           translate_to_hi: bool = Form(True), mode: str = Form("generative"),
+                           lazy_translation: bool = Form(False), stream_tokens: bool = Form(False)):
+    """
+    Stage events as they complete; an already finished job for the same upload is replayed as its result.
+    The summary keeps beam search and arrives as one summary_en event; stream_tokens=true streams
+    summary_en_token events from greedy decoding instead (faster first words, lower quality).
+    """
+    settings = _settings(ocr, ocr_page_limit, salience_threshold, max_contexts, translate_to_hi, mode, lazy_translation,
+                         stream_tokens)
+    md5, path = await _save_upload(file)
+    job = manager.jobs.get(manager.by_key.get(manager.key(md5, settings)))
+    if job is not None and job["status"] == "done":
+        line = json.dumps({"event": "result", "result": job["result"]}, ensure_ascii=False) + "\n"
+        return StreamingResponse(iter([line]), media_type="application/x-ndjson")
+    return StreamingResponse(_event_stream(path, settings), media_type="application/x-ndjson")
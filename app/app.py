@@ -1,5 +1,5 @@
 # app/app.py
-import os, sys
+import os, sys, time, hashlib
 from pathlib import Path
 
 # Ensure project root on path
@@ -13,7 +13,31 @@ import streamlit as st
 from io import BytesIO
 import json
 
-from main import process_pdf_file, save_json  # ✅ clean import
+from background import BackgroundRunner
+
+
+@st.cache_resource(show_spinner="Loading models…")
+def get_runner():
+    # ✅ models are loaded once per server process, not on every rerun / session
+    # thread / batch settings from the autotuner profile (scripts.autotune); the app is a single process
+    from src.pipeline.planner import load_plan, apply_plan
+    apply_plan(load_plan(), single_process=True)
+    from main import iter_process_pdf_file
+    return BackgroundRunner(iter_process_pdf_file)
+
+
+@st.cache_resource
+def _saved_paths():
+    return set()
+
+
+def _file_md5(up):
+    # md5 per uploaded file, computed once per session
+    cache = st.session_state.setdefault("upload_md5", {})
+    if up.file_id not in cache:
+        cache[up.file_id] = hashlib.md5(up.getvalue()).hexdigest()
+    return cache[up.file_id]
+
 
 st.set_page_config(page_title="Legal Summarizer (PDF → EN/HI + Citations)", layout="wide")
 
@@ -22,50 +46,56 @@ st.caption("Drop a court judgment PDF. I’ll extract text, detect language, fin
 
 with st.sidebar:
     st.header("Settings")
+    # inference settings: changing these processes the files again (results are cached per setting)
     ocr = st.toggle("Use OCR (for scanned PDFs)", value=False)
     ocr_page_limit = st.number_input("OCR page limit (optional)", min_value=1, value=10, step=1)
-    salience_threshold = st.slider("Salience threshold", 0.0, 1.0, 0.55, 0.01)
     max_contexts = st.slider("Max contexts in prompt", 1, 16, 8, 1)
+    stream_tokens = st.toggle("Stream the summary as it is written (greedy decoding, lower quality)", value=False)
+    st.divider()
+    # display-only settings: never trigger inference
+    salience_threshold = st.slider("Salience threshold (citation table)", 0.0, 1.0, 0.55, 0.01)
     output_dir = st.text_input("Save JSON outputs to folder", value="output_folder/json")
     st.divider()
     st.markdown("**Tip:** Run from repo root:**\n```bash\nstreamlit run app/app.py\n```")
 
+settings = {"ocr": bool(ocr), "ocr_page_limit": int(ocr_page_limit), "max_contexts": int(max_contexts),
+            "translate_to_hi": True, "stream_tokens": bool(stream_tokens)}
+
 uploaded = st.file_uploader("Upload PDF(s)", type=["pdf"], accept_multiple_files=True)
 
 if uploaded:
-    for up in uploaded:
+    from main import save_json
+    runner = get_runner()
+    # queue every file first so they are processed in the background while earlier ones render
+    entries = [(up, runner.submit(up.name, up.getvalue(), _file_md5(up), settings)) for up in uploaded]
+
+    for up, entry in entries:
         st.subheader(f"File: {up.name}")
-        with st.spinner("Processing… please wait"):
-            tmp_dir = Path(".streamlit_tmp"); tmp_dir.mkdir(exist_ok=True)
-            pdf_path = tmp_dir / up.name
-            pdf_path.write_bytes(up.read())
-
-            try:
-                result = process_pdf_file(
-                    str(pdf_path),
-                    ocr=ocr,
-                    ocr_page_limit=int(ocr_page_limit),
-                    salience_threshold=float(salience_threshold),
-                    max_contexts=int(max_contexts),
-                    translate_to_hi=True
-                )
-            except Exception as e:
-                st.error(f"❌ Processing failed: {e}")
-                continue
+        if entry["status"] == "failed":
+            st.error(f"❌ Processing failed: {entry['error']}")
+            continue
+        if entry["status"] != "done":
+            st.progress(entry["progress"], text=f"{entry['status']}: {entry['stage']}")
+        info = entry["info"]
+        if info:
+            st.caption(f"Language: {info['language_detected']} · {info['word_count']} words · "
+                       f"OCR: {'yes' if info['ocr_used'] else 'no'}")
 
         # Show summaries
         col1, col2 = st.columns(2)
         with col1:
             st.markdown("### 🇬🇧 English Summary")
-            st.write(result.get("summary_en_ctxaware", ""))
+            st.write(entry["summary_en"] + ("" if entry["status"] == "done" else " ▌"))
         with col2:
             st.markdown("### 🇮🇳 सारांश (Hindi Summary)")
-            st.write(result.get("summary_hi_ctxaware", ""))
+            st.write(entry["summary_hi"])
 
         # Show citation contexts
         st.markdown("### 📚 Citation Contexts")
-        ctxs = result.get("citation_contexts", [])
-        if not ctxs:
+        ctxs = entry["contexts"]
+        if ctxs is None:
+            st.caption("…")
+        elif not ctxs:
             st.info("No citations detected.")
         else:
             import pandas as pd
@@ -74,21 +104,38 @@ if uploaded:
                 "role": c.get("role", ""),
                 "salience": round(float(c.get("salience", 0.0)), 3),
                 "context_window": " ".join(c.get("context_window", [])[:3])
-            } for c in ctxs]
+            } for c in ctxs if float(c.get("salience", 0.0)) >= salience_threshold]
+            st.caption(f"{len(rows)} of {len(ctxs)} citations at salience ≥ {salience_threshold:.2f}")
             st.dataframe(pd.DataFrame(rows), use_container_width=True, height=300)
 
+        result = entry["result"]
+        if result is None:
+            continue
+
         # Download JSON
         out_bytes = BytesIO(json.dumps(result, ensure_ascii=False, indent=2).encode("utf-8"))
         st.download_button(
             label="⬇️ Download JSON",
             data=out_bytes,
             file_name=f"{result['doc_id']}.json",
-            mime="application/json"
+            mime="application/json",
+            key=f"dl-{entry['key']}"
         )
 
         if output_dir:
-            try:
-                saved = save_json(result, output_dir)
-                st.success(f"✅ Saved to {saved}")
-            except Exception as e:
-                st.warning(f"⚠️ Could not save: {e}")
+            # save each result once per folder, not on every rerun
+            saved_key = (entry["key"], output_dir)
+            if saved_key not in _saved_paths():
+                try:
+                    saved = save_json(result, output_dir)
+                    _saved_paths().add(saved_key)
+                    st.success(f"✅ Saved to {saved}")
+                except Exception as e:
+                    st.warning(f"⚠️ Could not save: {e}")
+            else:
+                st.caption(f"Saved to {output_dir}")
+
+    # poll while anything is still being processed
+    if runner.pending(e["key"] for _, e in entries):
+        time.sleep(0.5)
+        st.rerun()
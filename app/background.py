@@ -0,0 +1,86 @@
+# app/background.py
+"""
+Background processing for the Streamlit app.
+
+One BackgroundRunner per server process (held by st.cache_resource): uploads are processed on a
+single model worker thread, keyed by (md5, inference settings; stream_tokens is one of them, as
+greedy token streaming gives a different summary than beam search). Each entry accumulates the stage
+events of iter_process_pdf_file, so any rerun of the script can render per-file progress and
+partial output without calling the pipeline again; finished entries double as the result cache.
+"""
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# fraction of the work done once an event has been seen
+STAGE_PROGRESS = {"queued": 0.0, "extracted": 0.2, "citations": 0.45, "summary_en": 0.8,
+                  "summary_hi": 0.95, "result": 1.0}
+
+
+def settings_key(md5: str, settings: dict) -> str:
+    return md5 + ":" + hashlib.sha1(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+class BackgroundRunner:
+    def __init__(self, iter_fn, workers: int = 1, max_entries: int = 64):
+        self.iter_fn = iter_fn
+        self.max_entries = max_entries
+        self.entries = OrderedDict()      # key -> entry (most recently used last)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="st-pipeline")
+
+    def submit(self, name: str, data: bytes, md5: str, settings: dict) -> dict:
+        """The entry for this file + settings; processing is started only if there is none (or it failed)."""
+        key = settings_key(md5, settings)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry["status"] != "failed":
+                self.entries.move_to_end(key)
+                return entry
+            entry = {"key": key, "name": name, "status": "queued", "stage": "queued", "progress": 0.0,
+                     "info": {}, "contexts": None, "summary_en": "", "summary_hi": "",
+                     "result": None, "error": None}
+            self.entries[key] = entry
+            self._evict()
+        self._executor.submit(self._run, entry, name, data, settings)
+        return entry
+
+    def _evict(self):
+        done = [k for k, e in self.entries.items() if e["status"] in ("done", "failed")]
+        for k in done[:max(0, len(self.entries) - self.max_entries)]:
+            del self.entries[k]
+
+    def _run(self, entry, name, data, settings):
+        # the upload only touches disk while it is being processed
+        tmp_dir = Path(tempfile.mkdtemp(prefix="legal_summarizer_"))
+        try:
+            pdf_path = tmp_dir / name
+            pdf_path.write_bytes(data)
+            entry["status"] = "running"
+            for ev in self.iter_fn(str(pdf_path), **settings):
+                kind = ev["event"]
+                if kind == "extracted":
+                    entry["info"] = {k: v for k, v in ev.items() if k != "event"}
+                elif kind == "citations":
+                    entry["contexts"] = ev["citation_contexts"]
+                elif kind == "summary_en_token":
+                    entry["summary_en"] += ev["text"]
+                elif kind in ("summary_en", "summary_hi"):
+                    entry[kind] = ev["text"]
+                elif kind == "result":
+                    entry["result"] = ev["result"]
+                if kind in STAGE_PROGRESS:
+                    entry["stage"], entry["progress"] = kind, STAGE_PROGRESS[kind]
+            entry["status"] = "done"
+        except Exception as e:
+            entry["status"], entry["error"] = "failed", str(e)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def pending(self, keys) -> bool:
+        return any(self.entries.get(k, {}).get("status") in ("queued", "running") for k in keys)
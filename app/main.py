@@ -4,17 +4,19 @@ os.environ.setdefault("TRANSFORMERS_NO_TF", "1")  # avoid TF GPU noise
 
 from pathlib import Path
 import json
-from typing import Dict, Any
+from typing import Any, Callable, Dict, Iterator
 import re
 import textwrap
-import torch
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+import threading
 
-from src.utils import safe_filename
+from src.utils import safe_filename, model_lock
 from src.extractor.text_extractor import extract
 from src.cleaning.cleaner import clean_text
-from src.translation.translator import is_devanagari, translate_sentences
-from src.citations.citation_extractor import find_citations, build_contexts
+from src.translation.translator import is_devanagari, translate_sentences, translate_mixed
+from src.translation.lazy import lazy_working_text
+from src.citations.citation_extractor import find_citations, build_contexts, encode_sentences
+from src.summarizer.extractive import extractive_summary
+from src.utils import sentence_spans, split_hindi_sentences, language_map, language_runs
 
 try:
     from src.citations.citation_salience import classify_role, compute_salience
@@ -23,32 +25,55 @@ except Exception:
     _HAS_SALIENCE = False
 
 
-# ✅ Use your fine-tuned model from Drive
-MODEL_PATH = "/content/drive/MyDrive/mt5-legal-best"
+# ✅ Your fine-tuned model; override with env LEGAL_MT5_MODEL_PATH. Loaded on first summary, not at import.
+MODEL_PATH = os.environ.get("LEGAL_MT5_MODEL_PATH", "/content/drive/MyDrive/mt5-legal-best")
 
-_tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH)
-_model = AutoModelForSeq2SeqLM.from_pretrained(MODEL_PATH)
-_device = "cuda" if torch.cuda.is_available() else "cpu"
-_model.to(_device)
-_model.eval()
+_tokenizer = None
+_model = None
+_device = None
+_model_load_lock = threading.Lock()
 
 
-def _generate_summary_mt5(text: str, max_length: int = 320) -> str:
-    """Generate summary using your fine-tuned mT5 model with repetition control and citation cleaning."""
+def _get_model():
+    """(tokenizer, model, device) for MODEL_PATH, loaded once."""
+    global _tokenizer, _model, _device
+    with _model_load_lock:
+        if _model is None:
+            import torch
+            from src.inference.weights import load_hf_model
+            _tokenizer, model = load_hf_model(MODEL_PATH)   # memory-mapped with MODEL_MMAP=1
+            _device = "cuda" if torch.cuda.is_available() else "cpu"
+            model.to(_device)
+            _model = model
+    return _tokenizer, _model, _device
+
+
+def _prep_mt5_input(text: str) -> str:
     # 🚫 Clean excessive citation patterns before feeding model
     text = re.sub(r"\(?\d{4}\)?\s*\(?\d+\)?\s*[A-Z]{2,}\s*\d+", "", text)  # (2005) 2 SCC 16 etc.
     text = re.sub(r"\bSCC\b|\bSLT\b|\bAIR\b|\bDLT\b|\bLJ\b|\bSCW\b|\bALL\b", "", text)
-    text = re.sub(r"\s{2,}", " ", text).strip()
+    return re.sub(r"\s{2,}", " ", text).strip()
+
 
-    inputs = _tokenizer(
-        text,
+def _clean_mt5_output(summary: str) -> str:
+    summary = re.sub(r"<extra_id_\d+>", "", summary)
+    summary = re.sub(r"<REG_\d+>", "", summary)
+    return re.sub(r"\s{2,}", " ", summary).strip()
+
+
+def _generate_summary_mt5(text: str, max_length: int = 320) -> str:
+    """Generate summary using your fine-tuned mT5 model with repetition control and citation cleaning."""
+    import torch
+    tok, model, device = _get_model()
+    inputs = tok(
+        _prep_mt5_input(text),
         return_tensors="pt",
         truncation=True,
         max_length=512
-    ).to(_device)
+    ).to(device)
 
-    with torch.no_grad():
-        outputs = _model.generate(
+    with model_lock(model), torch.no_grad():
+        outputs = model.generate(
             **inputs,
             max_new_tokens=max_length,
             num_beams=5,
@@ -58,12 +83,40 @@ def _generate_summary_mt5(text: str, max_length: int = 320) -> str:
             early_stopping=True
         )
 
-    summary = _tokenizer.decode(outputs[0], skip_special_tokens=True)
+    return _clean_mt5_output(tok.decode(outputs[0], skip_special_tokens=True))
 
-    summary = re.sub(r"<extra_id_\d+>", "", summary)
-    summary = re.sub(r"<REG_\d+>", "", summary)
-    summary = re.sub(r"\s{2,}", " ", summary).strip()
-    return summary
+
+def _stream_summary_mt5(text: str, max_length: int = 320):
+    """
+    Same model/input as _generate_summary_mt5 but yields text pieces as they are decoded.
+    Streaming needs one hypothesis, so this decodes greedily (no beam search).
+    """
+    import torch
+    from transformers import TextIteratorStreamer
+    tok, model, device = _get_model()
+    inputs = tok(_prep_mt5_input(text), return_tensors="pt", truncation=True, max_length=512).to(device)
+    streamer = TextIteratorStreamer(tok, skip_prompt=True, skip_special_tokens=True)
+    gen_kwargs = dict(**inputs, max_new_tokens=max_length, num_beams=1, do_sample=False,
+                      repetition_penalty=1.5, no_repeat_ngram_size=3, streamer=streamer)
+    errors = []
+
+    def run():
+        try:
+            with model_lock(model), torch.no_grad():
+                model.generate(**gen_kwargs)
+        except Exception as e:
+            errors.append(e)
+            streamer.end()
+
+    t = threading.Thread(target=run, name="mt5-stream", daemon=True)
+    t.start()
+    for piece in streamer:
+        piece = re.sub(r"<extra_id_\d+>|<REG_\d+>", "", piece)
+        if piece:
+            yield piece
+    t.join()
+    if errors:
+        raise errors[0]
 
 
 def _compute_roles_salience(contexts):
@@ -83,15 +136,31 @@ def _compute_roles_salience(contexts):
     return contexts
 
 
-def process_pdf_file(pdf_path: str,
-                     ocr: bool = False,
-                     ocr_page_limit: int | None = None,
-                     salience_threshold: float = 0.55,
-                     max_contexts: int = 8,
-                     translate_to_hi: bool = True) -> Dict[str, Any]:
+def iter_process_pdf_file(pdf_path: str,
+                          ocr: bool = False,
+                          ocr_page_limit: int | None = None,
+                          salience_threshold: float = 0.55,
+                          max_contexts: int = 8,
+                          translate_to_hi: bool = True,
+                          mode: str = "generative",
+                          lazy_translation: bool = False,
+                          stream_tokens: bool = False) -> Iterator[Dict[str, Any]]:
     """
-    Full pipeline for a single PDF → dict with summaries & citation contexts.
+    process_pdf_file as a generator of stage events, yielded as soon as each stage completes:
+
+      {"event": "extracted", doc_id, filename, language_detected, ocr_used, md5, char_count, word_count}
+      {"event": "citations", citations_count, citation_contexts}
+      {"event": "summary_en_token", "text": piece}     (generative mode with stream_tokens=True)
+      {"event": "summary_en", "text": summary}
+      {"event": "summary_hi", "text": summary}
+      {"event": "result", "result": <same dict process_pdf_file returns>}
+
+    By default the English summary uses beam search (the same summary as process_pdf_file) and
+    arrives in one piece. stream_tokens=True opts into greedy decoding so tokens can be streamed:
+    faster first words, lower quality, a different summary.
     """
+    if mode not in ("generative", "extractive"):
+        raise ValueError(f"Unknown mode: {mode}")
     pdf = Path(pdf_path)
     doc_id = safe_filename(pdf.stem)
 
@@ -104,52 +173,113 @@ def process_pdf_file(pdf_path: str,
 
     # 3️⃣ Language detection
     lang = "hi" if is_devanagari(text_preserve) else "en"
+    yield {"event": "extracted", "doc_id": doc_id, "filename": pdf.name, "language_detected": lang,
+           "ocr_used": bool(ext.get("ocr_used", False)), "md5": ext.get("md5"),
+           "char_count": len(text_single), "word_count": len(text_single.split())}
 
     # 4️⃣ Translation (if Hindi → English)
     working_text = text_single
     alignment = None
-    if lang == "hi":
-        sents = re.split(r'(?<=[।.!?])\s+', text_single.strip()) if text_single.strip() else []
-        sents = [s for s in sents if s.strip()]
-        en_sents = translate_sentences(sents, src="hi", tgt="en") if sents else []
+    translate_input = translate_to_hi or mode == "generative"
+    if lang == "hi" and translate_input and lazy_translation:
+        working_text, alignment = lazy_working_text(
+            text_single, window=3, top_k=max_contexts, central_k=12 if mode == "extractive" else 0
+        )
+        working_text = working_text or text_single
+    elif lang == "hi" and translate_input:
+        sents = split_hindi_sentences(text_single)
+        lmap = language_map(sents)
+        en_sents = translate_mixed(sents, lmap, src="hi", tgt="en")  # English segments pass through
         working_text = " ".join(en_sents) if en_sents else text_single
-        alignment = {"hindi_count": len(sents), "en_count": len(en_sents)}
+        alignment = {"hindi_count": len(sents), "en_count": lmap.count("hi"),
+                     "language_map": language_runs(lmap)}
+    language_map_runs = alignment.pop("language_map", None) if alignment else None
 
     # 5️⃣ Citations
     citations = find_citations(working_text)
-    contexts = build_contexts(working_text, citations, window=3, top_k=max_contexts)
+    if mode == "extractive":
+        spans = sentence_spans(working_text)
+        sentences = [s for (_, _, s) in spans]
+        sent_embs = encode_sentences(sentences)
+        contexts = build_contexts(working_text, citations, window=3, top_k=max_contexts,
+                                  spans=spans, sent_embs=sent_embs)
+    else:
+        contexts = build_contexts(working_text, citations, window=3, top_k=max_contexts)
     contexts = _compute_roles_salience(contexts)
+    yield {"event": "citations", "citations_count": len(citations), "citation_contexts": contexts}
 
     # 6️⃣ Generate summary (English) — now citation-cleaned internally
-    summary_en = _generate_summary_mt5(working_text)
+    summary_hi = ""
+    if mode == "extractive":
+        summary_en = extractive_summary(sentences, sent_embs, contexts)
+        if lang == "hi" and not translate_input:
+            summary_en, summary_hi = "", summary_en
+    elif stream_tokens:
+        pieces = []
+        for piece in _stream_summary_mt5(working_text):
+            pieces.append(piece)
+            yield {"event": "summary_en_token", "text": piece}
+        summary_en = _clean_mt5_output("".join(pieces))
+    else:
+        summary_en = _generate_summary_mt5(working_text)
+    yield {"event": "summary_en", "text": summary_en}
 
     # 7️⃣ Translate summary to Hindi (optional, with chunked translation)
-    summary_hi = ""
-    if translate_to_hi:
+    if translate_to_hi and summary_en:
         try:
             en_chunks = textwrap.wrap(summary_en, width=350)
-            hi_chunks = []
-            for chunk in en_chunks:
-                part = translate_sentences([chunk], src="en", tgt="hi")
-                hi_chunks.append(part[0] if part else "")
+            hi_chunks = translate_sentences(en_chunks, src="en", tgt="hi")  # one batched call
             summary_hi = " ".join(hi_chunks)
         except Exception as e:
             summary_hi = f"⚠️ Translation failed: {e}"
+    if summary_hi:
+        yield {"event": "summary_hi", "text": summary_hi}
 
     # 8️⃣ Build result object
     result = {
         "doc_id": doc_id,
         "filename": pdf.name,
         "language_detected": lang,
+        "language_map": language_map_runs,
         "ocr_used": bool(ext.get("ocr_used", False)),
         "md5": ext.get("md5"),
-        "word_count": len((working_text or "").split()),
+        "word_count": len(((text_single if alignment and alignment.get("lazy") else working_text) or "").split()),
         "citations_count": len(citations),
         "citation_contexts": contexts,
         "summary_en_ctxaware": summary_en,
         "summary_hi_ctxaware": summary_hi,
         "alignment": alignment,
     }
+    yield {"event": "result", "result": result}
+
+
+def process_pdf_file(pdf_path: str,
+                     ocr: bool = False,
+                     ocr_page_limit: int | None = None,
+                     salience_threshold: float = 0.55,
+                     max_contexts: int = 8,
+                     translate_to_hi: bool = True,
+                     mode: str = "generative",
+                     lazy_translation: bool = False,
+                     stream_tokens: bool = False,
+                     on_event: Callable[[Dict[str, Any]], None] | None = None) -> Dict[str, Any]:
+    """
+    Full pipeline for a single PDF → dict with summaries & citation contexts.
+    mode="extractive" skips mT5 and builds the summary from top-ranked sentences
+    (same output keys); translate_to_hi=False then also skips HI→EN input translation.
+    lazy_translation=True translates only the Hindi sentences that feed citations / the summary.
+    on_event: optional callback receiving the stage events of iter_process_pdf_file.
+    stream_tokens: greedy decoding with summary_en_token events (see iter_process_pdf_file).
+    """
+    result = None
+    for ev in iter_process_pdf_file(pdf_path, ocr=ocr, ocr_page_limit=ocr_page_limit,
+                                    salience_threshold=salience_threshold, max_contexts=max_contexts,
+                                    translate_to_hi=translate_to_hi, mode=mode,
+                                    lazy_translation=lazy_translation, stream_tokens=stream_tokens):
+        if on_event is not None:
+            on_event(ev)
+        if ev["event"] == "result":
+            result = ev["result"]
     return result
 
 
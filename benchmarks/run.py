@@ -0,0 +1,267 @@
+"""
+End-to-end benchmark suite: per-stage timings and the full process_single over the bundled
+English/ PDFs, plus the stages that start from the existing output_folder/json documents.
+Runs offline on tiny stand-in models by default (benchmarks/standins.py); --real_models uses the
+configured ones.
+Run from project root:
+python -m benchmarks.run [--limit 5] [--repeat 3] [--stages extract,clean,...] [--out bench.json]
+python -m benchmarks.run --update_baseline          # record this machine's numbers as the baseline
+python -m benchmarks.run --check                    # exit 1 when a stage regressed past its threshold
+                                                    # (or has no baseline to compare with)
+
+Each stage is timed over the same documents `--repeat` times (best run kept); models and caches
+are warmed up first and the translation memory is off. sec_per_doc is the compared metric.
+benchmarks/baseline.json holds the per-stage regression thresholds (fraction slower than the
+baseline that is tolerated) and, once recorded, the baseline results with the environment they
+were measured on. Stand-in timings are only comparable with stand-in baselines on similar hardware.
+"""
+import os
+os.environ.setdefault("TRANSFORMERS_NO_TF", "1")
+import argparse
+import json
+import platform
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+PDF_STAGES = ["extract", "clean", "find_citations", "segment", "embed", "build_contexts", "role_salience",
+              "generate", "translate", "process_single"]
+JSON_STAGES = ["json_read", "json_role_salience", "json_translate"]
+STAGES = PDF_STAGES + JSON_STAGES
+
+
+def _timed(fn, items, repeat):
+    """Best-of-`repeat` total seconds of fn(item) over items, and the per-item times of that run."""
+    best = None
+    for _ in range(repeat):
+        per = []
+        for it in items:
+            t0 = time.perf_counter()
+            fn(it)
+            per.append(time.perf_counter() - t0)
+        if best is None or sum(per) < sum(best):
+            best = per
+    return best
+
+
+def _row(per, n_units=None, unit=None):
+    from src.pipeline.tracing import percentile
+    total = sum(per)
+    row = {"docs": len(per), "total_sec": round(total, 4), "sec_per_doc": round(total / len(per), 5),
+           "p50_ms": round(percentile(sorted(per), 50) * 1000, 3), "max_ms": round(max(per) * 1000, 3)}
+    if unit and n_units:
+        row[f"{unit}_per_sec"] = round(n_units / total, 2) if total else None
+    return row
+
+
+def _prepare_pdf_docs(pdfs):
+    # inputs for the later stages, computed once (untimed)
+    from src.extractor.text_extractor import extract
+    from src.cleaning.cleaner import clean_text
+    from src.citations.citation_extractor import find_citations, encode_sentences, build_contexts
+    from src.citations.citation_salience import classify_role, compute_salience
+    from src.summarizer.summarizer import make_citation_aware_input
+    from src.utils import sentence_spans
+    docs = []
+    for p in pdfs:
+        raw = extract(p)["text"]
+        _, single = clean_text(raw)
+        spans = sentence_spans(single)
+        citations = find_citations(single)
+        embs = encode_sentences([s for _, _, s in spans])
+        contexts = build_contexts(single, citations, window=5, top_k=8, spans=spans, sent_embs=embs)
+        for c in contexts:
+            c["role"] = classify_role(" ".join(c["context_window"]))
+            c["salience"] = compute_salience(c["supporting_sentences"], c["role"])
+        docs.append({"pdf": p, "raw": raw, "text": single, "spans": spans, "citations": citations, "embs": embs,
+                     "contexts": contexts, "prompt": make_citation_aware_input(single, contexts),
+                     "summary_sents": [s for _, _, s in spans[:4]]})
+    return docs
+
+
+def run_pdf_stages(pdfs, stages, repeat):
+    from src.extractor.text_extractor import extract
+    from src.cleaning.cleaner import clean_text
+    from src.citations.citation_extractor import find_citations, encode_sentences, build_contexts
+    from src.citations.citation_salience import classify_role, compute_salience
+    from src.summarizer.summarizer import summarize_text
+    from src.translation.translator import translate_sentences
+    from src.utils import sentence_spans
+    from scripts.process_folder import process_single
+
+    docs = _prepare_pdf_docs(pdfs)
+    n_sents = sum(len(d["spans"]) for d in docs)
+    n_cits = sum(len(d["citations"]) for d in docs)
+
+    def role_salience(d):
+        for c in d["contexts"]:
+            role = classify_role(" ".join(c["context_window"]))
+            compute_salience(c["supporting_sentences"], role)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        fns = {
+            "extract": (lambda d: extract(d["pdf"]), None, None),
+            "clean": (lambda d: clean_text(d["raw"]), None, None),
+            "find_citations": (lambda d: find_citations(d["text"]), n_cits, "citations"),
+            "segment": (lambda d: sentence_spans(d["text"]), n_sents, "sentences"),
+            "embed": (lambda d: encode_sentences([s for _, _, s in d["spans"]]), n_sents, "sentences"),
+            "build_contexts": (lambda d: build_contexts(d["text"], d["citations"], window=5, top_k=8,
+                                                        spans=d["spans"], sent_embs=d["embs"]), n_cits, "citations"),
+            "role_salience": (role_salience, n_cits, "citations"),
+            "generate": (lambda d: summarize_text(d["prompt"]), None, None),
+            "translate": (lambda d: translate_sentences(d["summary_sents"], src="en", tgt="hi", use_memory=False),
+                          None, None),
+            "process_single": (lambda d: process_single(d["pdf"], tmp, json_format="compact"), None, None),
+        }
+        for name in PDF_STAGES:
+            if name not in stages:
+                continue
+            fn, n_units, unit = fns[name]
+            fn(docs[0])   # warm-up
+            results[name] = _row(_timed(fn, docs, repeat), n_units, unit)
+            print(f"  {name:20s} {results[name]['sec_per_doc'] * 1000:10.2f} ms/doc")
+    return results
+
+
+def run_json_stages(json_dir, limit, stages, repeat):
+    from src.pipeline.docjson import iter_doc_jsons, read_doc_json
+    from src.citations.citation_salience import classify_role, compute_salience
+    from src.translation.translator import translate_sentences
+    # iter_doc_jsons yields (path, doc)
+    items = [item for item, _ in zip(iter_doc_jsons(json_dir), range(limit))]
+    if not items:
+        return {}
+    paths = [p for p, _ in items]
+    docs = [d for _, d in items]
+
+    def role_salience(d):
+        for c in d.get("citation_contexts") or []:
+            compute_salience(c.get("supporting_sentences") or [], classify_role(" ".join(c.get("context_window", []))))
+
+    def translate(d):
+        sents = [s for s in re.split(r"(?<=[.!?])\s+", d.get("summary_en") or "") if s][:4]
+        translate_sentences(sents, src="en", tgt="hi", use_memory=False)
+
+    fns = {"json_read": (read_doc_json, paths), "json_role_salience": (role_salience, docs),
+           "json_translate": (translate, docs)}
+    results = {}
+    for name in JSON_STAGES:
+        if name not in stages:
+            continue
+        fn, items = fns[name]
+        fn(items[0])
+        results[name] = _row(_timed(fn, items, repeat))
+        print(f"  {name:20s} {results[name]['sec_per_doc'] * 1000:10.2f} ms/doc")
+    return results
+
+
+def environment(standins):
+    from src.pipeline.planner import cpu_topology
+    env = {"python": platform.python_version(), "platform": platform.platform(), "standins": standins}
+    topo = cpu_topology()
+    env.update({k: topo[k] for k in ("cpu_model", "cores", "logical_cpus")})
+    for mod in ("torch", "transformers", "sentence_transformers"):
+        try:
+            env[mod] = __import__(mod).__version__
+        except Exception:
+            env[mod] = None
+    return env
+
+
+def load_baseline(path=BASELINE_PATH):
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def compare(results, baseline):
+    """[(stage, current, baseline, allowed, regressed)] for the stages present in both."""
+    thresholds = baseline.get("thresholds", {})
+    base = baseline.get("results") or {}
+    out = []
+    for name, row in results.items():
+        if name not in base:
+            continue
+        allowed = thresholds.get(name, thresholds.get("default", 0.25))
+        ref = base[name]["sec_per_doc"]
+        out.append((name, row["sec_per_doc"], ref, allowed, row["sec_per_doc"] > ref * (1 + allowed)))
+    return out
+
+
+def main(limit=5, repeat=3, stages=None, real_models=False, out=None, update_baseline=False, check=False,
+         baseline_path=BASELINE_PATH):
+    standins = not real_models
+    if standins:
+        from benchmarks.standins import use_standins
+        use_standins()
+    os.environ["TRANSLATION_MEMORY"] = "0"
+    stages = stages or STAGES
+
+    pdfs = sorted((PROJECT_ROOT / "English").glob("*.pdf"))[:limit]
+    results = {}
+    if pdfs and set(stages) & set(PDF_STAGES):
+        print(f"PDF stages on {len(pdfs)} document(s) from English/:")
+        results.update(run_pdf_stages(pdfs, stages, repeat))
+    if set(stages) & set(JSON_STAGES):
+        print("JSON stages on output_folder/json:")
+        results.update(run_json_stages(PROJECT_ROOT / "output_folder" / "json", limit, stages, repeat))
+
+    report = {"environment": environment(standins), "limit": limit, "repeat": repeat,
+              "measured_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}
+    if out:
+        Path(out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    baseline = load_baseline(baseline_path)
+    if update_baseline:
+        from src.pipeline.manifest import atomic_write_text
+        baseline.update({"environment": report["environment"], "limit": limit, "repeat": repeat,
+                         "measured_at": report["measured_at"], "results": results})
+        atomic_write_text(baseline_path, json.dumps(baseline, indent=2) + "\n")
+        print(f"\nBaseline updated: {baseline_path}")
+        return report
+
+    rows = compare(results, baseline)
+    missing = sorted(set(results) - {r[0] for r in rows})
+    if missing:
+        print(f"\n⚠️ no baseline for: {', '.join(missing)} (python -m benchmarks.run --update_baseline)")
+    if check and (missing or not results):
+        # a gate without a reference is not a pass
+        print("\n--check: every measured stage needs a baseline")
+        sys.exit(1)
+    if not rows:
+        return report
+    if (baseline.get("environment") or {}).get("standins") != standins:
+        print("\n⚠️ baseline was measured with", "stand-in" if not standins else "real", "models")
+    print(f"\n{'stage':20s} {'ms/doc':>10s} {'baseline':>10s} {'allowed':>8s}")
+    regressed = []
+    for name, cur, ref, allowed, bad in rows:
+        print(f"{name:20s} {cur * 1000:10.2f} {ref * 1000:10.2f} {allowed:+8.0%}{'  ❌ regression' if bad else ''}")
+        if bad:
+            regressed.append(name)
+    if check and regressed:
+        print(f"\n{len(regressed)} stage(s) regressed: {', '.join(regressed)}")
+        sys.exit(1)
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--limit", type=int, default=5, help="documents per stage")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--stages", default=None, help=f"comma-separated subset of {','.join(STAGES)}")
+    ap.add_argument("--real_models", action="store_true", help="configured models instead of the stand-ins")
+    ap.add_argument("--out", default=None, help="write this run's report as JSON")
+    ap.add_argument("--baseline", default=str(BASELINE_PATH))
+    ap.add_argument("--update_baseline", action="store_true")
+    ap.add_argument("--check", action="store_true", help="exit 1 on a regression past the thresholds")
+    args = ap.parse_args()
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()] if args.stages else None
+    unknown = set(stages or ()) - set(STAGES)
+    if unknown:
+        ap.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    main(limit=args.limit, repeat=args.repeat, stages=stages, real_models=args.real_models, out=args.out,
+         update_baseline=args.update_baseline, check=args.check, baseline_path=Path(args.baseline))
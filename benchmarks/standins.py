@@ -0,0 +1,105 @@
+# benchmarks/standins.py
+"""
+Tiny, randomly initialised stand-ins for the pipeline's models, built locally (no download):
+
+  sbert/      SentenceTransformer (2-layer BERT + mean pooling)    -> env SBERT_MODEL
+  seq2seq/    2-layer T5 + tokenizer                               -> env SUMMARY_MODEL, MT5_MODEL_NAME,
+                                                                      TRANSLATE_HI_EN_MODEL, TRANSLATE_EN_HI_MODEL
+
+The tokenizer is a BPE trained on the bundled judgment texts (output_folder/texts), so token
+counts and sequence lengths are realistic even though the outputs are noise. The models load
+through the same code paths as the real ones (SentenceTransformer(path), load_hf_model(path)),
+so the benchmark times the pipeline around the models, not the models' size.
+
+Built once per STANDIN_VERSION into BENCH_STANDIN_DIR (default ~/.cache/legal_summarizer/standins).
+"""
+import os
+import json
+from pathlib import Path
+
+STANDIN_VERSION = 1
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "legal_summarizer", "standins")
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+VOCAB_SIZE = 4000
+SEED = 1234
+
+
+def standin_dir() -> Path:
+    return Path(os.environ.get("BENCH_STANDIN_DIR", DEFAULT_DIR)) / f"v{STANDIN_VERSION}"
+
+
+def _corpus(limit_chars=4_000_000):
+    texts_dir = PROJECT_ROOT / "output_folder" / "texts"
+    total = 0
+    for p in sorted(texts_dir.glob("*.txt")):
+        t = p.read_text(encoding="utf-8", errors="ignore")
+        total += len(t)
+        yield t
+        if total >= limit_chars:
+            return
+
+
+def _build_tokenizer(out: Path):
+    from tokenizers import Tokenizer, models, pre_tokenizers, trainers, decoders
+    from transformers import PreTrainedTokenizerFast
+    tok = Tokenizer(models.BPE(unk_token="<unk>"))
+    tok.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tok.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(vocab_size=VOCAB_SIZE, special_tokens=["<pad>", "</s>", "<unk>", "<cls>"],
+                                  initial_alphabet=pre_tokenizers.ByteLevel.alphabet())
+    tok.train_from_iterator(_corpus(), trainer=trainer)
+    fast = PreTrainedTokenizerFast(tokenizer_object=tok, pad_token="<pad>", eos_token="</s>",
+                                   unk_token="<unk>", cls_token="<cls>", model_max_length=512)
+    fast.save_pretrained(out)
+    return fast
+
+
+def _build_seq2seq(out: Path, tok):
+    from transformers import T5Config, T5ForConditionalGeneration
+    cfg = T5Config(vocab_size=len(tok), d_model=64, d_kv=16, d_ff=128, num_layers=2, num_decoder_layers=2,
+                   num_heads=4, pad_token_id=tok.pad_token_id, eos_token_id=tok.eos_token_id,
+                   decoder_start_token_id=tok.pad_token_id)
+    T5ForConditionalGeneration(cfg).save_pretrained(out, safe_serialization=True)
+    tok.save_pretrained(out)
+
+
+def _build_sbert(out: Path, tok):
+    from transformers import BertConfig, BertModel
+    from sentence_transformers import SentenceTransformer, models
+    hf_dir = out.with_name(out.name + "-hf")
+    cfg = BertConfig(vocab_size=len(tok), hidden_size=64, num_hidden_layers=2, num_attention_heads=4,
+                     intermediate_size=128, max_position_embeddings=512, pad_token_id=tok.pad_token_id)
+    BertModel(cfg).save_pretrained(hf_dir, safe_serialization=True)
+    tok.save_pretrained(hf_dir)
+    encoder = models.Transformer(str(hf_dir), max_seq_length=128)
+    pooling = models.Pooling(encoder.get_word_embedding_dimension(), pooling_mode="mean")
+    SentenceTransformer(modules=[encoder, pooling], device="cpu").save(str(out))
+
+
+def build_standins(force=False) -> dict:
+    """{env var: local path} for every stand-in; builds them on first use."""
+    root = standin_dir()
+    paths = {"sbert": root / "sbert", "seq2seq": root / "seq2seq"}
+    done = root / "BUILD.json"
+    if force or not done.exists():
+        import torch
+        torch.manual_seed(SEED)
+        root.mkdir(parents=True, exist_ok=True)
+        tok = _build_tokenizer(root / "tokenizer")
+        _build_seq2seq(paths["seq2seq"], tok)
+        _build_sbert(paths["sbert"], tok)
+        done.write_text(json.dumps({"version": STANDIN_VERSION, "vocab_size": len(tok), "seed": SEED}),
+                        encoding="utf-8")
+    s2s = str(paths["seq2seq"])
+    return {"SBERT_MODEL": str(paths["sbert"]), "SUMMARY_MODEL": s2s, "MT5_MODEL_NAME": s2s,
+            "CASCADE_SMALL_MODEL": s2s, "TRANSLATE_HI_EN_MODEL": s2s, "TRANSLATE_EN_HI_MODEL": s2s}
+
+
+def use_standins(force=False) -> dict:
+    """Point the pipeline at the stand-ins; call before any src.* model module is imported."""
+    env = build_standins(force)
+    os.environ.update(env)
+    os.environ["HF_HUB_OFFLINE"] = "1"
+    os.environ["TRANSFORMERS_OFFLINE"] = "1"
+    return env
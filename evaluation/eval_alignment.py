@@ -1,27 +1,34 @@
 # evaluation/eval_alignment.py
-import json, argparse, numpy as np
-from pathlib import Path
-from sentence_transformers import SentenceTransformer, util
+import argparse, numpy as np
+from sentence_transformers import util
 from src.translation.translator import translate_sentences
+from src.inference.embedding import get_embedding_service
+from src.translation.memory import get_memory
+from src.store.docstore import open_docstore
 
 def main(json_dir, hyp_field_en="summary_en_ctxaware", hyp_field_hi="summary_hi_ctxaware"):
-    model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-mpnet-base-v2")
-    sims = []
-    for fp in Path(json_dir).glob("*.json"):
-        data = json.loads(fp.read_text(encoding="utf-8"))
+    service = get_embedding_service()
+    ens, en_his = [], []
+    fields = [hyp_field_en, hyp_field_hi, "summary_en", "summary_hi"]
+    for data in open_docstore(json_dir).iter_docs(fields):
         en = data.get(hyp_field_en) or data.get("summary_en")
         hi = data.get(hyp_field_hi) or data.get("summary_hi")
         if not en or not hi:
             continue
         # translate HI->EN to compare semantics
-        en_hi = translate_sentences([hi], src="hi", tgt="en")[0]
-        emb = model.encode([en, en_hi], convert_to_tensor=True)
-        sim = float(util.cos_sim(emb[0], emb[1]).item())
-        sims.append(sim)
+        ens.append(en)
+        en_his.append(translate_sentences([hi], src="hi", tgt="en")[0])
+    sims = []
+    if ens:
+        # one pooled, length-sorted encode for every pair
+        emb = service.encode(ens + en_his)
+        sims = util.pairwise_cos_sim(emb[:len(ens)], emb[len(ens):]).tolist()
+    tm = get_memory()
     if not sims:
         print("No bilingual pairs found.")
         return
-    print({"count": len(sims), "mean_alignment": float(np.mean(sims)), "std": float(np.std(sims))})
+    print({"count": len(sims), "mean_alignment": float(np.mean(sims)), "std": float(np.std(sims)),
+           "translation_memory": tm.stats() if tm else None, "embedding": service.stats()})
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
@@ -1,7 +1,7 @@
 # evaluation/eval_citation_metrics.py  (replace existing)
-import json, re, argparse
-from pathlib import Path
+import re, argparse
 from difflib import SequenceMatcher
+from src.store.docstore import open_docstore
 try:
     from rapidfuzz import fuzz
     rapidfuzz_available = True
@@ -24,11 +24,10 @@ def similarity(a: str, b: str) -> float:
         return SequenceMatcher(None, a, b).ratio()
 
 def main(json_dir, hyp_field="summary_en_ctxaware", top_k=12, sim_thresh=0.55):
-    json_dir = Path(json_dir)
+    store = open_docstore(json_dir)
     totals = {"tp":0, "fp":0, "fn":0, "docs":0}
 
-    for fp in json_dir.glob("*.json"):
-        data = json.loads(fp.read_text(encoding="utf-8"))
+    for data in store.iter_docs(["citation_contexts", hyp_field]):
         contexts = sorted(data.get("citation_contexts", []), key=lambda c: c.get("salience",0), reverse=True)[:top_k]
         gold_names = [norm(c.get("raw","")) for c in contexts if c.get("raw")]
         hyp = data.get(hyp_field) or ""
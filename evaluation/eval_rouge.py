@@ -1,13 +1,12 @@
 # evaluation/eval_rouge.py
-import json, argparse
-from pathlib import Path
+import argparse
 from evaluate import load
+from src.store.docstore import open_docstore
 
 def main(json_dir, ref_field="gold_summary_en", hyp_field="summary_en_ctxaware"):
     rouge = load("rouge")
     refs, hyps = [], []
-    for fp in Path(json_dir).glob("*.json"):
-        data = json.loads(fp.read_text(encoding="utf-8"))
+    for data in open_docstore(json_dir).iter_docs([ref_field, hyp_field, "summary_en"]):
         ref = data.get(ref_field) or data.get("summary_en")  # fallback if you put gold later
         hyp = data.get(hyp_field) or data.get("summary_en")
         if ref and hyp:
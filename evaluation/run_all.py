@@ -0,0 +1,173 @@
+# evaluation/run_all.py
+"""
+All corpus metrics in one pass over the outputs (docstore / JSON folder read once):
+
+  rouge      ROUGE-1/L F1 of hyp vs ref (rouge_score per document in worker processes; mean over docs)
+  citations  gold citation coverage of the hypothesis (exact containment, then rapidfuzz
+             partial_ratio of all of a document's gold names in one cdist call; documents in parallel)
+  alignment  EN summary vs HI summary translated back: all HI summaries in one batched
+             translate_sentences call, all texts in one pooled SBERT encode
+
+Same definitions as eval_rouge / eval_citation_metrics / eval_alignment, except that ROUGE is the
+plain mean over documents (evaluate's default aggregator reports a bootstrap estimate of it).
+Run from project root:
+python -m evaluation.run_all output_folder [--metrics rouge,citations,alignment] [--workers 8] [--out eval.json]
+"""
+import os
+os.environ.setdefault("TRANSFORMERS_NO_TF", "1")
+import argparse
+import json
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from src.store.docstore import open_docstore
+from evaluation.eval_citation_metrics import norm
+
+METRICS = ("rouge", "citations", "alignment")
+
+
+def load_corpus(json_dir, ref_field, hyp_field, en_field, hi_field, top_k):
+    """One read of the store; every document reduced to the few strings the metrics need."""
+    fields = list(dict.fromkeys([ref_field, hyp_field, en_field, hi_field, "summary_en", "summary_hi",
+                                 "citation_contexts"]))
+    docs = []
+    for data in open_docstore(json_dir).iter_docs(fields):
+        contexts = sorted(data.get("citation_contexts") or [], key=lambda c: c.get("salience", 0), reverse=True)[:top_k]
+        docs.append({
+            "doc_id": data["doc_id"],
+            "ref": data.get(ref_field) or data.get("summary_en"),   # fallback until gold summaries exist
+            "hyp": data.get(hyp_field) or data.get("summary_en"),
+            "hyp_raw": data.get(hyp_field) or "",
+            "en": data.get(en_field) or data.get("summary_en"),
+            "hi": data.get(hi_field) or data.get("summary_hi"),
+            "gold": [norm(c.get("raw", "")) for c in contexts if c.get("raw")],
+        })
+    return docs
+
+
+def _chunks(items, n):
+    size = max(1, -(-len(items) // n))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _rouge_chunk(pairs):
+    from rouge_score import rouge_scorer
+    scorer = rouge_scorer.RougeScorer(["rouge1", "rougeL"])
+    out = []
+    for ref, hyp in pairs:
+        s = scorer.score(ref, hyp)
+        out.append((s["rouge1"].fmeasure, s["rougeL"].fmeasure))
+    return out
+
+
+def rouge(docs, pool, workers):
+    pairs = [(d["ref"], d["hyp"]) for d in docs if d["ref"] and d["hyp"]]
+    if not pairs:
+        return None
+    scores = [s for chunk in pool.map(_rouge_chunk, _chunks(pairs, workers * 4)) for s in chunk]
+    return {"count": len(scores), "rouge1": statistics.fmean(s[0] for s in scores),
+            "rougeL": statistics.fmean(s[1] for s in scores)}
+
+
+def _citation_chunk(args):
+    docs, sim_thresh = args
+    try:
+        from rapidfuzz import fuzz, process
+    except Exception:
+        process = None
+        from difflib import SequenceMatcher
+    out = []
+    for gold, hyp in docs:
+        hyp_n = norm(hyp)
+        gold = [g for g in gold if g]
+        tp = sum(1 for g in gold if g in hyp_n)
+        rest = [g for g in gold if g not in hyp_n]
+        if rest and process is not None:
+            # every remaining gold name of the document against the hypothesis in one call
+            sims = process.cdist(rest, [hyp_n], scorer=fuzz.partial_ratio, score_cutoff=sim_thresh * 100)
+            tp += int((sims[:, 0] >= sim_thresh * 100).sum())
+        elif rest:
+            tp += sum(1 for g in rest if SequenceMatcher(None, g, hyp_n).ratio() >= sim_thresh)
+        out.append((tp, len(gold) - tp))
+    return out
+
+
+def citations(docs, pool, workers, sim_thresh):
+    items = [(d["gold"], d["hyp_raw"]) for d in docs]
+    if not items:
+        return None
+    counts = [c for chunk in pool.map(_citation_chunk, [(ch, sim_thresh) for ch in _chunks(items, workers * 4)])
+              for c in chunk]
+    tp = sum(c[0] for c in counts)
+    fn = sum(c[1] for c in counts)
+    fp = 0   # gold coverage only, as in eval_citation_metrics
+    recall = tp / (tp + fn + 1e-9)
+    precision = tp / (tp + fp + 1e-9)
+    return {"docs": len(counts), "precision": precision, "recall": recall,
+            "f1": 2 * precision * recall / (precision + recall + 1e-9)}
+
+
+def alignment(docs):
+    from sentence_transformers import util
+    from src.translation.translator import translate_sentences
+    from src.inference.embedding import get_embedding_service
+    pairs = [(d["en"], d["hi"]) for d in docs if d["en"] and d["hi"]]
+    if not pairs:
+        return None
+    ens = [en for en, _ in pairs]
+    # one call: length-sorted batches across the whole corpus, translation memory in front
+    en_his = translate_sentences([hi for _, hi in pairs], src="hi", tgt="en")
+    service = get_embedding_service()
+    emb = service.encode(ens + en_his)
+    sims = util.pairwise_cos_sim(emb[:len(ens)], emb[len(ens):]).tolist()
+    return {"count": len(sims), "mean_alignment": statistics.fmean(sims), "std": statistics.pstdev(sims),
+            "embedding": service.stats()}
+
+
+def main(json_dir, metrics=METRICS, ref_field="gold_summary_en", hyp_field="summary_en_ctxaware",
+         en_field="summary_en_ctxaware", hi_field="summary_hi_ctxaware", top_k=12, sim_thresh=0.55,
+         workers=None, out=None):
+    workers = workers or os.cpu_count() or 1
+    timings = {}
+    t0 = time.perf_counter()
+    docs = load_corpus(json_dir, ref_field, hyp_field, en_field, hi_field, top_k)
+    timings["load"] = time.perf_counter() - t0
+    report = {"docs": len(docs)}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for name in metrics:
+            t0 = time.perf_counter()
+            if name == "rouge":
+                report["rouge"] = rouge(docs, pool, workers)
+            elif name == "citations":
+                report["citations"] = citations(docs, pool, workers, sim_thresh)
+            elif name == "alignment":
+                report["alignment"] = alignment(docs)
+            timings[name] = time.perf_counter() - t0
+    report["seconds"] = {k: round(v, 3) for k, v in timings.items()}
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if out:
+        Path(out).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("json_dir", help="output folder (or its json/ folder)")
+    ap.add_argument("--metrics", default=",".join(METRICS))
+    ap.add_argument("--ref_field", default="gold_summary_en")
+    ap.add_argument("--hyp_field", default="summary_en_ctxaware")
+    ap.add_argument("--en_field", default="summary_en_ctxaware")
+    ap.add_argument("--hi_field", default="summary_hi_ctxaware")
+    ap.add_argument("--top_k", type=int, default=12)
+    ap.add_argument("--sim_thresh", type=float, default=0.55)
+    ap.add_argument("--workers", type=int, default=None, help="processes for ROUGE / fuzzy matching (default: all CPUs)")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args()
+    metrics = [m.strip() for m in args.metrics.split(",") if m.strip()]
+    unknown = set(metrics) - set(METRICS)
+    if unknown:
+        ap.error(f"unknown metric(s): {', '.join(sorted(unknown))}")
+    main(args.json_dir, metrics=metrics, ref_field=args.ref_field, hyp_field=args.hyp_field, en_field=args.en_field,
+         hi_field=args.hi_field, top_k=args.top_k, sim_thresh=args.sim_thresh, workers=args.workers, out=args.out)
@@ -0,0 +1,165 @@
+"""
+CPU autotuner: short calibration on a few sample PDFs, saved as the CPU plan profile that
+process_folder, ctx_summarize and the app pick up (see src/pipeline/planner.py).
+Run from project root:
+python -m scripts.autotune sample_pdfs/ --limit 3 [--mode extractive] [--out cpu_plan.json]
+
+1. every (processes x intra-op threads) split of the physical cores runs the sample documents in a
+   fresh interpreter (models warmed up first, untimed) -> docs/sec;
+2. with the winning thread count, SBERT and translation batch sizes are timed on the sample text.
+Translation memory is off during calibration so repeated runs measure the models, not the cache.
+"""
+import os
+os.environ.setdefault("TRANSFORMERS_NO_TF", "1")
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from src.pipeline.planner import cpu_topology, candidate_splits, make_plan, save_plan, profile_path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+SBERT_BATCHES = (16, 32, 64, 128)
+TRANSLATE_BATCHES = (4, 8, 16, 32)
+
+
+def _trial_throughput(pdfs, processes, intra, mode, translate):
+    # runs inside the trial interpreter: warm up, fork, one untimed round, one timed round
+    from concurrent.futures import wait
+    from src.inference.prefork import warm_up, fork_pool
+    from scripts.process_folder import process_single
+    kwargs = dict(mode=mode, translate=translate)
+    with tempfile.TemporaryDirectory() as tmp:
+        warm_up(mode, translate)
+        if processes == 1:
+            process_single(pdfs[0], tmp, **kwargs)
+            t0 = time.perf_counter()
+            for p in pdfs:
+                process_single(p, tmp, **kwargs)
+            n = len(pdfs)
+        else:
+            with fork_pool(processes, intra) as pool:
+                wait([pool.submit(process_single, pdfs[i % len(pdfs)], tmp, **kwargs) for i in range(processes)])
+                # every worker gets the whole sample
+                jobs = [p for _ in range(processes) for p in pdfs]
+                t0 = time.perf_counter()
+                for fut in [pool.submit(process_single, p, tmp, **kwargs) for p in jobs]:
+                    fut.result()
+                n = len(jobs)
+    dt = time.perf_counter() - t0
+    return {"docs": n, "seconds": round(dt, 3), "docs_per_sec": round(n / dt, 4)}
+
+
+def _sample_sentences(pdfs, limit=256):
+    from src.extractor.text_extractor import extract
+    from src.utils import sentence_spans
+    sents = []
+    for p in pdfs:
+        sents += [s for _, _, s in sentence_spans(extract(p)["text"]) if s][:limit]
+    return sents[:limit]
+
+
+def _trial_batches(pdfs, translate):
+    from src.citations.citation_extractor import get_sbert
+    from src.translation.translator import translate_batch, EN_TO_HI
+    sents = _sample_sentences(pdfs)
+    out = {"sbert": {}, "translate": {}}
+    model = get_sbert()
+    model.encode(sents[:8])
+    for b in SBERT_BATCHES:
+        t0 = time.perf_counter()
+        model.encode(sents, batch_size=b)
+        out["sbert"][b] = round(len(sents) / (time.perf_counter() - t0), 2)
+    if translate:
+        few = sents[:64]
+        translate_batch(few[:2], EN_TO_HI)
+        for b in TRANSLATE_BATCHES:
+            t0 = time.perf_counter()
+            translate_batch(few, EN_TO_HI, batch_size=b)
+            out["translate"][b] = round(len(few) / (time.perf_counter() - t0), 2)
+    return out
+
+
+def _run_trial(spec):
+    """Runs `spec` in a fresh interpreter with its thread env set before torch is imported."""
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT), TRANSLATION_MEMORY="0",
+               OMP_NUM_THREADS=str(spec["intra"]), MKL_NUM_THREADS=str(spec["intra"]),
+               TOKENIZERS_PARALLELISM="true" if spec["processes"] == 1 else "false")
+    proc = subprocess.run([sys.executable, "-m", "scripts.autotune", "--_trial", json.dumps(spec)],
+                          cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError((proc.stderr.strip().splitlines() or ["trial failed"])[-1])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _trial_main(spec):
+    import torch
+    torch.set_num_threads(spec["intra"])
+    torch.set_num_interop_threads(1)
+    pdfs = [Path(p) for p in spec["pdfs"]]
+    if spec["kind"] == "batches":
+        res = _trial_batches(pdfs, spec["translate"])
+    else:
+        res = _trial_throughput(pdfs, spec["processes"], spec["intra"], spec["mode"], spec["translate"])
+    print(json.dumps(res))
+
+
+def _best(rates: dict, default):
+    return int(max(rates, key=rates.get)) if rates else default
+
+
+def main(input_folder, limit=3, mode="generative", translate=True, out=None, max_processes=None):
+    pdfs = sorted(Path(input_folder).glob("*.pdf"))[:limit]
+    if not pdfs:
+        print("No PDFs found in", input_folder); return
+    topo = cpu_topology()
+    splits = [s for s in candidate_splits(topo["cores"]) if not max_processes or s[0] <= max_processes]
+    print(f"{topo['cores']} usable physical core(s) ({topo['logical_cpus']} logical, cgroup {topo['cgroup_cpus']}); "
+          f"trying {len(splits)} process x thread split(s) on {len(pdfs)} document(s)")
+    base = {"pdfs": [str(p) for p in pdfs], "mode": mode, "translate": translate}
+
+    throughput = {}
+    for processes, intra in splits:
+        try:
+            res = _run_trial(dict(base, kind="throughput", processes=processes, intra=intra))
+        except RuntimeError as e:
+            print(f"  {processes:3d} proc x {intra:3d} threads: failed ({e})")
+            continue
+        throughput[f"{processes}x{intra}"] = res
+        print(f"  {processes:3d} proc x {intra:3d} threads: {res['docs_per_sec']:.3f} docs/s")
+    if not throughput:
+        print("Every calibration trial failed; no profile written."); sys.exit(1)
+    best = max(throughput, key=lambda k: throughput[k]["docs_per_sec"])
+    processes, intra = map(int, best.split("x"))
+
+    batches = _run_trial(dict(base, kind="batches", processes=processes, intra=intra))
+    sbert_b = _best(batches["sbert"], 64)
+    translate_b = _best(batches["translate"], 16)
+    print(f"  SBERT sentences/s by batch: {batches['sbert']} -> {sbert_b}")
+    if batches["translate"]:
+        print(f"  translation sentences/s by batch: {batches['translate']} -> {translate_b}")
+
+    plan = make_plan(topo, processes, intra, sbert_batch_size=sbert_b, translate_batch_size=translate_b,
+                     measurements={"mode": mode, "documents": len(pdfs), "throughput": throughput, "batches": batches})
+    path = save_plan(plan, out)
+    print(f"\nPlan: {processes} process(es) x {intra} thread(s), SBERT batch {sbert_b}, "
+          f"translation batch {translate_b} -> {path}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--_trial":
+        _trial_main(json.loads(sys.argv[2])); sys.exit(0)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input_folder", help="a few representative PDFs")
+    parser.add_argument("--limit", type=int, default=3, help="sample documents per trial")
+    parser.add_argument("--mode", choices=("generative", "extractive"), default="generative")
+    parser.add_argument("--no_translate", action="store_true", help="extractive mode only")
+    parser.add_argument("--max_processes", type=int, default=None, help="e.g. to leave RAM for other services")
+    parser.add_argument("--out", default=None, help=f"profile path (default {profile_path()})")
+    args = parser.parse_args()
+    main(args.input_folder, limit=args.limit, mode=args.mode, translate=not args.no_translate, out=args.out,
+         max_processes=args.max_processes)
@@ -0,0 +1,62 @@
+"""
+Throughput benchmark: extractive triage mode vs the generative (mT5) path.
+Run from project root:
+python -m scripts.bench_extractive English --limit 5 --out bench_extractive.json
+
+Models are warmed up on the first PDF (untimed) so load time does not skew docs/sec.
+"""
+import os
+os.environ.setdefault("TRANSFORMERS_NO_TF", "1")
+import argparse, json, tempfile, time
+from pathlib import Path
+
+from scripts.process_folder import process_single
+
+
+def _time_mode(pdfs, mode, translate, out_dir):
+    # warm-up (loads SBERT / mT5 / translators once)
+    process_single(pdfs[0], out_dir, mode=mode, translate=translate)
+    per_doc = []
+    for p in pdfs:
+        t0 = time.perf_counter()
+        process_single(p, out_dir, mode=mode, translate=translate)
+        per_doc.append(time.perf_counter() - t0)
+    total = sum(per_doc)
+    return {
+        "mode": mode,
+        "docs": len(per_doc),
+        "total_sec": round(total, 3),
+        "sec_per_doc": round(total / len(per_doc), 3),
+        "docs_per_sec": round(len(per_doc) / total, 3) if total else None,
+    }
+
+
+def main(input_folder, limit=5, out=None, skip_generative=False, translate=True):
+    pdfs = sorted(Path(input_folder).glob("*.pdf"))[:limit]
+    if not pdfs:
+        print("No PDFs found in", input_folder); return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        results["extractive"] = _time_mode(pdfs, "extractive", translate, tmp)
+        if not skip_generative:
+            results["generative"] = _time_mode(pdfs, "generative", True, tmp)
+
+    if "generative" in results:
+        results["speedup"] = round(results["generative"]["sec_per_doc"] / max(results["extractive"]["sec_per_doc"], 1e-9), 1)
+
+    print(json.dumps(results, indent=2))
+    if out:
+        Path(out).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("input_folder")
+    ap.add_argument("--limit", type=int, default=5)
+    ap.add_argument("--out", default=None)
+    ap.add_argument("--skip_generative", action="store_true")
+    ap.add_argument("--no_translate", action="store_true")
+    args = ap.parse_args()
+    main(args.input_folder, limit=args.limit, out=args.out,
+         skip_generative=args.skip_generative, translate=not args.no_translate)
@@ -1,16 +1,44 @@
 # scripts/build_training_data.py
-import json, re, argparse
+"""
+Training pairs (citation-aware input -> English summary) from the processed documents.
+
+Streaming and parallel: the parent walks the store in doc_id order (only the target fields) and
+hands (doc_id, target) to worker processes; each worker opens its own read-only store, loads the
+full text + citation contexts, builds the token-aware prompt (make_citation_aware_input with the
+tokenizer: the evidence is kept whole and the facts fill the rest of the 512-token budget) and
+tokenizes input and target. Results come back in order (imap), so the output is deterministic.
+
+The parent deduplicates on sha1(normalised input + target), splits train/val by a seeded hash of
+the doc_id (a document stays in its split when its input or target changes between builds, so
+regenerated summaries never move eval documents into training) and streams:
+  out_path                      train JSONL {"input","target"}
+  <stem>.val.jsonl              val JSONL (with --val_fraction > 0)
+  <stem>_tokenized/train|val/   sharded input_ids/labels arrays (src.training.pretokenized),
+                                loaded with PretokenizedDataset (memory-mapped)
+
+Run from project root:
+python -m scripts.build_training_data output_folder/json train.jsonl [--workers 8] [--val_fraction 0.05]
+"""
+import os
+os.environ.setdefault("TRANSFORMERS_NO_TF", "1")
+import json, re, argparse, hashlib
+from multiprocessing import get_context
 from pathlib import Path
 from tqdm import tqdm
 
-from src.summarizer.summarizer import make_citation_aware_input
+from src.summarizer.summarizer import make_citation_aware_input, DEFAULT_SUMMARY_MODEL
+from src.store.docstore import open_docstore
+
+TARGET_FIELDS = ["summary_en_ctxaware", "summary_en"]
+MIN_TARGET_WORDS = 40
+PREFIX = "summarize: "   # the prompt style of summarize_text
 
 def clean(s):
     if not isinstance(s, str):
         return ""
     return re.sub(r"\s+", " ", s).strip()
 
-def build_input(doc_json: dict, texts_dir: Path):
+def build_input(doc_json: dict, texts_dir: Path, tokenizer=None, max_tokens=None):
     # prefer full text if available
     txt_path = texts_dir / (doc_json.get("doc_id","") + ".txt")
     if txt_path.exists():
@@ -19,32 +47,118 @@ def build_input(doc_json: dict, texts_dir: Path):
         # fallback: try any text-like fields you saved; otherwise use summary_en_ctxaware or summary_en
         full_text = doc_json.get("full_text","") or doc_json.get("summary_en_ctxaware","") or doc_json.get("summary_en","")
     contexts = doc_json.get("citation_contexts", [])
-    return make_citation_aware_input(full_text, contexts)
+    # whitespace collapsed first so the token budget is measured on the text that is written
+    return make_citation_aware_input(clean(full_text), contexts, tokenizer=tokenizer, max_tokens=max_tokens,
+                                     prefix=PREFIX)
 
-def main(json_dir, out_path):
-    json_dir = Path(json_dir)
-    texts_dir = json_dir.parent / "texts"
-    items = []
-    files = sorted(json_dir.glob("*.json"))
-    for fp in tqdm(files):
-        data = json.loads(fp.read_text(encoding="utf-8"))
+def dedup_key(inp: str, target: str) -> str:
+    return hashlib.sha1((inp.lower() + "\x00" + target.lower()).encode("utf-8")).hexdigest()
+
+def is_val(doc_id: str, val_fraction: float, seed: int) -> bool:
+    if val_fraction <= 0:
+        return False
+    h = hashlib.sha1(f"{seed}:{doc_id}".encode("utf-8")).digest()
+    return int.from_bytes(h[:8], "big") / 2 ** 64 < val_fraction
+
+# ---- worker process ----
+_W = {}
+
+def _init_worker(json_dir, tokenizer_name, max_input_len, max_target_len):
+    _W["store"] = open_docstore(json_dir, sync=False)   # the parent has synced it
+    _W["texts_dir"] = Path(json_dir).parent / "texts"
+    _W["max_input_len"], _W["max_target_len"] = max_input_len, max_target_len
+    _W["tok"] = None
+    if tokenizer_name:
+        os.environ["TOKENIZERS_PARALLELISM"] = "false"   # the parallelism is the worker processes
+        from transformers import AutoTokenizer
+        _W["tok"] = AutoTokenizer.from_pretrained(tokenizer_name)
+
+def _build_item(args):
+    doc_id, target = args
+    data = _W["store"].get(doc_id, ["full_text", "citation_contexts"] + TARGET_FIELDS)
+    if not data:
+        return None
+    tok = _W["tok"]
+    inp = clean(build_input(data, _W["texts_dir"], tokenizer=tok, max_tokens=_W["max_input_len"] if tok else None))
+    if not inp:
+        return None
+    item = {"doc_id": doc_id, "input": inp, "target": target}
+    if tok is not None:
+        item["input_ids"] = tok(PREFIX + inp, truncation=True, max_length=_W["max_input_len"])["input_ids"]
+        item["labels"] = tok(text_target=target, truncation=True, max_length=_W["max_target_len"])["input_ids"]
+    return item
+
+# ---- parent ----
+def _targets(store):
+    for data in store.iter_docs(TARGET_FIELDS):
         # pick best available target (prefer ctx-aware if you generated it)
         target = clean(data.get("summary_en_ctxaware") or data.get("summary_en"))
-        if not target or len(target.split()) < 40:
-            continue
-        inp = clean(build_input(data, texts_dir))
-        if not inp:
-            continue
-        items.append({"input": inp, "target": target})
-
-    with open(out_path, "w", encoding="utf-8") as f:
-        for it in items:
-            f.write(json.dumps(it, ensure_ascii=False) + "\n")
-    print(f"Wrote {len(items)} training items to {out_path}")
+        if target and len(target.split()) >= MIN_TARGET_WORDS:
+            yield data["doc_id"], target
+
+def main(json_dir, out_path, workers=None, val_fraction=0.0, seed=13, tokenizer=DEFAULT_SUMMARY_MODEL,
+         max_input_len=512, max_target_len=256, shard_size=10000, chunksize=8):
+    json_dir = Path(json_dir)
+    out_path = Path(out_path)
+    store = open_docstore(json_dir)
+    total = len(store)
+    workers = workers or os.cpu_count() or 1
+
+    split_paths = {"train": out_path, "val": out_path.with_name(out_path.stem + ".val.jsonl")}
+    splits = ["train", "val"] if val_fraction > 0 else ["train"]
+    files = {s: open(split_paths[s], "w", encoding="utf-8") for s in splits}
+    shards = {}
+    if tokenizer:
+        from src.training.pretokenized import ShardWriter
+        tok_dir = out_path.with_name(out_path.stem + "_tokenized")
+        meta = {"tokenizer": tokenizer, "prefix": PREFIX, "max_input_len": max_input_len,
+                "max_target_len": max_target_len, "val_fraction": val_fraction, "seed": seed}
+        shards = {s: ShardWriter(tok_dir / s, shard_size=shard_size, meta=dict(meta, split=s)) for s in splits}
+
+    counts = {s: 0 for s in splits}
+    seen, dupes, skipped = set(), 0, 0
+    init = (str(json_dir), tokenizer, max_input_len, max_target_len)
+    # spawn: a clean interpreter per worker (no inherited sqlite handles or tokenizer threads)
+    with get_context("spawn").Pool(workers, initializer=_init_worker, initargs=init) as pool:
+        for item in tqdm(pool.imap(_build_item, _targets(store), chunksize=chunksize), total=total):
+            if item is None:
+                skipped += 1
+                continue
+            key = dedup_key(item["input"], item["target"])
+            if key in seen:
+                dupes += 1
+                continue
+            seen.add(key)
+            split = "val" if is_val(item["doc_id"], val_fraction, seed) else "train"
+            files[split].write(json.dumps({"input": item["input"], "target": item["target"]}, ensure_ascii=False) + "\n")
+            if shards:
+                shards[split].add(item["input_ids"], item["labels"])
+            counts[split] += 1
+
+    for f in files.values():
+        f.close()
+    for w in shards.values():
+        w.close()
+    print(f"Wrote {counts['train']} training items to {out_path}"
+          + (f", {counts['val']} to {split_paths['val']}" if "val" in counts else "")
+          + f" ({dupes} duplicates, {skipped} without input)")
+    if shards:
+        print(f"Pre-tokenized shards: {tok_dir}")
+    return counts
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("json_dir", help="e.g., output_folder/json")
     ap.add_argument("out_path", help="e.g., train.jsonl")
+    ap.add_argument("--workers", type=int, default=None, help="worker processes (default: all CPUs)")
+    ap.add_argument("--val_fraction", type=float, default=0.0, help="share of items in the val split")
+    ap.add_argument("--seed", type=int, default=13, help="seed of the train/val split (hash of doc_id)")
+    ap.add_argument("--tokenizer", default=DEFAULT_SUMMARY_MODEL, help="tokenizer for the token budget and the shards")
+    ap.add_argument("--no_tokenize", action="store_true", help="JSONL only (char-cut inputs, no shards)")
+    ap.add_argument("--max_input_len", type=int, default=512)
+    ap.add_argument("--max_target_len", type=int, default=256)
+    ap.add_argument("--shard_size", type=int, default=10000, help="items per shard")
     args = ap.parse_args()
-    main(args.json_dir, args.out_path)
+    main(args.json_dir, args.out_path, workers=args.workers, val_fraction=args.val_fraction, seed=args.seed,
+         tokenizer=None if args.no_tokenize else args.tokenizer, max_input_len=args.max_input_len,
+         max_target_len=args.max_target_len, shard_size=args.shard_size)
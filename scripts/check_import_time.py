@@ -0,0 +1,126 @@
+"""
+Cold-start budget check: imports each entry point in a fresh interpreter, reports the wall time and
+which heavy libraries got imported along the way. Exits non-zero when a lightweight entry point
+is over budget, pulls in torch/transformers/sentence_transformers/nltk at import time, or fails to
+import (it was not measured). --allow_missing_deps reports lightweight entry points whose
+third-party dependency is not installed as skipped instead (for partial environments).
+Run from project root:
+python -m scripts.check_import_time [--budget 1.0] [--repeat 3] [--allow_missing_deps]
+The same check runs as a test: python -m pytest tests/test_import_time.py
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY = ("torch", "transformers", "sentence_transformers", "nltk", "pandas", "evaluate", "streamlit")
+
+# must start fast and without heavy libraries (models load on first use)
+LIGHT = [
+    "src.citations.citation_extractor",
+    "src.store.docstore",
+    "src.pipeline.stages",
+    "src.pipeline.planner",
+    "scripts.make_gold_citations",
+    "scripts.merge_shards",
+    "scripts.docstore",
+    "scripts.process_folder",
+    "scripts.ctx_summarize",
+    "scripts.build_training_data",
+    "evaluation.eval_citation_metrics",
+    "evaluation.extract_citations_from_summary",
+    "app.main",
+    "app.api",
+]
+# reported only: these need their heavy library to do anything at all
+HEAVY_OK = [
+    "evaluation.eval_rouge",
+    "evaluation.eval_alignment",
+]
+
+PROJECT_PACKAGES = ("src", "app", "scripts", "evaluation", "benchmarks")
+
+_PROBE = """
+import json, sys, time, importlib
+t = time.perf_counter()
+try:
+    importlib.import_module({module!r})
+except ModuleNotFoundError as e:
+    print(json.dumps({{"error": f"{{type(e).__name__}}: {{e}}", "missing": e.name}}))
+    sys.exit(0)
+dt = time.perf_counter() - t
+print(json.dumps({{"seconds": dt, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def probe(module, repeat=3):
+    """Best-of-`repeat` import time in a fresh interpreter (excludes interpreter start-up)."""
+    best = None
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT))
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY)],
+                              cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {"error": (proc.stderr.strip().splitlines() or ["?"])[-1]}
+        res = json.loads(proc.stdout.strip().splitlines()[-1])
+        if "error" in res:
+            return res
+        if best is None or res["seconds"] < best["seconds"]:
+            best = res
+    return best
+
+
+def missing_dependency(res) -> str:
+    """The third-party package whose absence made the import fail ("" for any other error)."""
+    name = (res.get("missing") or "").split(".")[0]
+    return name if name and name not in PROJECT_PACKAGES else ""
+
+
+def verdict(module, res, budget, allow_missing_deps=False):
+    """(status, note): status is "ok", "skipped" or "failed" for a lightweight entry point."""
+    if "error" in res:
+        dep = missing_dependency(res)
+        if allow_missing_deps and dep:
+            return "skipped", f"not measured: {dep} not installed"
+        return "failed", f"❌ import failed: {res['error']}"
+    if res["seconds"] > budget:
+        return "failed", "❌ over budget"
+    if res["heavy"]:
+        return "failed", "❌ heavy import"
+    return "ok", ""
+
+
+def main(budget=1.0, repeat=3, allow_missing_deps=False):
+    failed, skipped = [], []
+    print(f"{'module':45s} {'import s':>9s}  heavy")
+    for module in LIGHT + HEAVY_OK:
+        res = probe(module, repeat)
+        if module in LIGHT:
+            status, note = verdict(module, res, budget, allow_missing_deps)
+            (failed if status == "failed" else skipped if status == "skipped" else []).append(module)
+        else:
+            note = f"import failed: {res['error']}" if "error" in res else ""
+        if "error" in res:
+            print(f"{module:45s} {'-':>9s}  {note}")
+        else:
+            print(f"{module:45s} {res['seconds']:9.3f}  {','.join(res['heavy']) or '-'}{'  ' + note if note else ''}")
+    if skipped:
+        print(f"\n⚠️ {len(skipped)} entry point(s) not measured (missing dependencies): {', '.join(skipped)}")
+    if failed:
+        print(f"\n{len(failed)} entry point(s) failed the import / {budget}s / no-heavy-import check: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"\n{len(LIGHT) - len(skipped)} lightweight entry point(s) import in < {budget}s without heavy libraries.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds per lightweight entry point")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--allow_missing_deps", action="store_true",
+                        help="skip (instead of fail) entry points whose third-party dependency is not installed")
+    args = parser.parse_args()
+    main(budget=args.budget, repeat=args.repeat, allow_missing_deps=args.allow_missing_deps)
@@ -1,5 +1,5 @@
 # scripts/ctx_summarize.py
-import json, argparse
+import argparse
 from pathlib import Path
 
 import sys
@@ -8,14 +8,19 @@ sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from src.summarizer.context_aware_bilingual import generate_parallel_summary
 from src.summarizer.citation_mini_summaries import summarize_all_citations
+from src.summarizer.cascade import cascade_config
+from src.pipeline.docjson import write_doc_json
+from src.store.docstore import open_docstore
+from src.pipeline.planner import load_plan, apply_plan
 
-def main(in_dir, out_dir=None, salience_threshold=0.45, max_contexts=8, translate_to_hi=True):
-    in_dir = Path(in_dir)
-    out_dir = Path(out_dir) if out_dir else in_dir
-    out_dir.mkdir(parents=True, exist_ok=True)
+def main(in_dir, out_dir=None, salience_threshold=0.45, max_contexts=8, translate_to_hi=True, cascade=None):
+    # results are written to the docstore in place; out_dir additionally exports full JSON files
+    store = open_docstore(in_dir)
+    out_dir = Path(out_dir) if out_dir else None
+    if out_dir:
+        out_dir.mkdir(parents=True, exist_ok=True)
 
-    for fp in sorted(in_dir.glob("*.json")):
-        data = json.loads(fp.read_text(encoding="utf-8"))
+    for data in store.iter_docs(["working_text", "summary_en", "text", "citation_contexts"]):
 
         # ✅ Use RAW FULL TEXT, not summary_en
         raw_text = data.get("text", "")
@@ -46,17 +51,19 @@ def main(in_dir, out_dir=None, salience_threshold=0.45, max_contexts=8, translat
         )
 
         # ✅ Per-citation mini explanations (appears in UI)
-        cit_summaries = summarize_all_citations(contexts, translate_to_hi=translate_to_hi)
+        cit_summaries = summarize_all_citations(contexts, translate_to_hi=translate_to_hi, cascade=cascade)
 
-        # ✅ Save to JSON
-        data["summary_en_ctxaware"] = par["summary_en"]
-        data["summary_hi_ctxaware"] = par.get("summary_hi", "")
-        data["summary_en_sentences"] = par.get("summary_en_sentences", [])
-        data["summary_hi_sentences"] = par.get("summary_hi_sentences", [])
-        data["citation_summaries"] = cit_summaries
-
-        (out_dir / fp.name).write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-        print("✔", fp.name)
+        # ✅ Save (only the new fields)
+        store.update(data["doc_id"], {
+            "summary_en_ctxaware": par["summary_en"],
+            "summary_hi_ctxaware": par.get("summary_hi", ""),
+            "summary_en_sentences": par.get("summary_en_sentences", []),
+            "summary_hi_sentences": par.get("summary_hi_sentences", []),
+            "citation_summaries": cit_summaries,
+        })
+        if out_dir:
+            write_doc_json(out_dir, data["doc_id"], store.get(data["doc_id"]))
+        print("✔", data["doc_id"])
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser()
@@ -65,9 +72,17 @@ if __name__ == "__main__":
     p.add_argument("--salience_threshold", type=float, default=0.45)
     p.add_argument("--max_contexts", type=int, default=8)
     p.add_argument("--no_translate", action="store_true")
+    p.add_argument("--cascade", action="store_true", help="route citation mini-summaries by salience")
+    p.add_argument("--cascade_low", type=float, default=None)
+    p.add_argument("--cascade_high", type=float, default=None)
+    p.add_argument("--cascade_small_model", default=None)
+    p.add_argument("--plan", default=None, help="CPU plan profile (default: the scripts.autotune profile)")
     args = p.parse_args()
+    apply_plan(load_plan(args.plan), single_process=True)
 
     main(args.json_in_dir, args.json_out_dir,
          salience_threshold=args.salience_threshold,
          max_contexts=args.max_contexts,
-         translate_to_hi=not args.no_translate)
+         translate_to_hi=not args.no_translate,
+         cascade=cascade_config(low_threshold=args.cascade_low, high_threshold=args.cascade_high,
+                                small_model=args.cascade_small_model) if args.cascade else None)
@@ -0,0 +1,25 @@
+"""
+Sync / inspect / export the document store of an output folder.
+Run from project root:
+python -m scripts.docstore output_folder                 # import new/changed json/ files
+python -m scripts.docstore output_folder --export out/   # write full per-document JSON files
+"""
+import argparse
+import logging
+
+from src.pipeline.docjson import JSON_FORMATS
+from src.store.docstore import open_docstore
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("output_folder", help="process_folder output folder (or its json/ subfolder)")
+    parser.add_argument("--export", default=None, help="folder to export the documents to")
+    parser.add_argument("--json_format", choices=JSON_FORMATS, default="pretty")
+    args = parser.parse_args()
+    store = open_docstore(args.output_folder)
+    print(f"{len(store)} documents in", store.path)
+    if args.export:
+        n = store.export_json_dir(args.export, json_format=args.json_format)
+        print(f"Exported {n} documents to", args.export)
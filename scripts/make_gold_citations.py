@@ -1,13 +1,13 @@
 # scripts/make_gold_citations.py
-import json, argparse
-from pathlib import Path
+import argparse
+
+from src.store.docstore import open_docstore
 
 PREF_ORDER = ["RELIED", "OVERRULED", "MENTIONED"]
 
 def main(indir, k=8):
-    indir = Path(indir)
-    for fp in sorted(indir.glob("*.json")):
-        data = json.loads(fp.read_text(encoding="utf-8"))
+    store = open_docstore(indir)
+    for data in store.iter_docs(["citation_contexts"]):
         ctxs = data.get("citation_contexts", [])
         if not ctxs:
             continue
@@ -31,9 +31,8 @@ def main(indir, k=8):
             gold.append(raw)
             if len(gold) >= k:
                 break
-        data["gold_citations"] = gold
-        fp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-    print("✅ gold_citations written.")
+        store.update(data["doc_id"], {"gold_citations": gold})
+    print("✅ gold_citations written to", store.path)
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("json_dir")
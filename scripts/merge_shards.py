@@ -0,0 +1,19 @@
+"""
+Merge the outputs of sharded process_folder runs into index.csv / citation_contexts.jsonl.
+Run from project root once every shard has finished:
+python -m scripts.merge_shards output_folder [--shards N]
+"""
+import argparse
+import logging
+
+from src.pipeline.shards import merge_shards
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("output_folder")
+    parser.add_argument("--shards", type=int, default=None, help="expected shard count (warns about missing shards)")
+    args = parser.parse_args()
+    n = merge_shards(args.output_folder, expected=args.shards)
+    print(f"Merged {n} documents into", args.output_folder)
@@ -4,107 +4,202 @@
 Batch runner to process a folder of PDFs and produce outputs.
 Run from project root:
 python -m scripts.process_folder input_folder output_folder --ocr --workers 4
+
+Fast triage (top-ranked sentences + citations, no mT5 generation):
+python -m scripts.process_folder input_folder output_folder --mode extractive [--no_translate]
+
+Stages (extract, translate_input, citations, embed, generate, translate_output, write) run in a
+staged executor by default; size them with --workers / --stage_workers extract=4,embed=1,...
+
+Re-running on the same output folder only processes new or changed PDFs (see run_manifest.jsonl);
+pass --force to reprocess everything.
+
+Multi-process on one node: --executor prefork --workers N loads the models once and forks N workers
+that share the weights copy-on-write (add MODEL_MMAP=1 to map them from local safetensors); a
+per-worker RSS / shared / private memory report is logged.
+
+CPU plan: after python -m scripts.autotune sample_pdfs/, --workers / --executor default to the
+calibrated process count, and torch threads, tokenizer parallelism and batch sizes follow the
+profile (explicit flags win). Without a profile a single process uses all physical cores and
+prefork workers split them evenly.
+
+Tracing: every document's stage spans (wall/CPU time, sizes, token counts) go to trace.jsonl and
+trace.chrome.json (open in chrome://tracing or ui.perfetto.dev); per-stage percentiles to
+trace_summary.json. --profile extract,generate (or all) also runs cProfile around those spans and
+writes profiles/<stage>.prof + .txt.
+
+Memory budget: --memory_budget_mb 3000 (or env MEMORY_BUDGET_MB) sizes SBERT/translation batches and
+beam search from the headroom left in each worker, drops intermediate text between stages and
+degrades documents that would not fit (embeddings of citation windows only, no citation
+mini-summaries, extractive summary) instead of crashing; per-stage peak RSS is in trace_summary.json.
+
+Several processes/machines sharing the output folder: --shard 0/4 ... --shard 3/4 (documents are
+assigned by content hash), then python -m scripts.merge_shards output_folder.
 """
 import os
 os.environ.setdefault("TRANSFORMERS_NO_TF", "1")
 import argparse
+import time
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
-import csv, json, logging
+import logging
 
+from src.translation import translator
+from src.translation.memory import get_memory
+from src.summarizer.cascade import cascade_config
+from src.pipeline.stages import MODES, STAGES, new_job, process_document
+from src.pipeline.executor import StagedExecutor
+from src.pipeline.manifest import RunManifest, config_hash, aggregate_fingerprint
+from src.pipeline.writers import index_row, write_index, ContextsWriter
+from src.pipeline.docjson import JSON_FORMATS, doc_json_path, json_format_of, convert_doc_json
+from src.pipeline.shards import parse_shard, shard_of, shard_suffix
 from src.utils import md5_of_file, safe_filename
-from src.extractor.text_extractor import extract
-from src.cleaning.cleaner import clean_text, clean_for_json
-from src.translation.translator import is_devanagari, translate_sentences
-from src.citations.citation_extractor import find_citations,build_contexts
-from src.citations.citation_extractor_ner import extract_citations
-
-from src.summarizer.summarizer import make_citation_aware_input, summarize_text
-from src.citations.citation_salience import classify_role, compute_salience
-from src.summarizer.citation_summarizer import summarize_all_citations_in_json
+from src.inference.scheduler import enable_scheduler, scheduler_enabled, log_scheduler_stats
+from src.inference.embedding import get_embedding_service
+from src.inference.prefork import warm_up, fork_pool, log_workers_memory_report
+from src.pipeline.planner import load_plan, apply_plan
+from src.pipeline.tracing import TraceWriter, merge_profiles
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger("process_folder")
 
-def process_single(pdf_path, out_dir, ocr=False, ocr_page_limit=None):
-    pdf_path = Path(pdf_path)
-    base = safe_filename(pdf_path.stem)
-    outdir = Path(out_dir)
-    texts_dir = outdir / "texts"; texts_dir.mkdir(parents=True, exist_ok=True)
-    json_dir = outdir / "json"; json_dir.mkdir(parents=True, exist_ok=True)
-
-    # extract raw
-    res = extract(pdf_path, ocr=ocr, ocr_page_limit=ocr_page_limit)
-    raw_text = res.get("text", "")
-
-    # clean: produce readable text (with paragraphs) and single-line text (for JSON)
-    text_preserve, text_single = clean_text(raw_text)
-
-    # save text file with preserved paragraphs
-    (texts_dir / f"{base}.txt").write_text(text_preserve, encoding="utf-8")
-
-    # detect language (simple heuristic)
-    lang = "hi" if is_devanagari(text_preserve) else "en"
-
-    # If Hindi, translate sentence-by-sentence with alignment
-    alignment = None
-    working_text = text_single
-    if lang == "hi":
-        # split into sentences based on Punkt on preserved text, then translate
-        from src.utils import sentence_spans
-        spans = sentence_spans(text_single)
-        hindi_sents = [s for (_,_,s) in spans]
-        en_sents = translate_sentences(hindi_sents, src="hi", tgt="en")
-        working_text = " ".join(en_sents)
-        alignment = {"hindi_count": len(hindi_sents)}
-
-    # citations
-    citations = find_citations(working_text)
-    contexts = build_contexts(working_text, citations, window=5, top_k=8)
-
-    for c in contexts:
-        combined_text = " ".join(c["context_window"])
-        role = classify_role(combined_text)
-        sal = compute_salience(c["supporting_sentences"], role)
-        c["role"] = role
-        c["salience"] = sal
-
-    citation_summaries = summarize_all_citations_in_json(
-        {"citation_contexts": contexts}, sentences=2, max_out_len=96, translate_to_hi=(lang=="hi")
-    )
-
-    # build citation-aware input and summarize
-    cit_input = make_citation_aware_input(working_text, contexts)
-    en_summary = summarize_text(cit_input)
-    # translate summary back (sentence-level)
-    import re
-    en_summary_sents = re.split(r'(?<=[.!?])\s+', en_summary.strip())
-    hi_summary_sents = translate_sentences(en_summary_sents, src="en", tgt="hi") if lang == "hi" else None
-    hi_summary = " ".join(hi_summary_sents) if hi_summary_sents else None
-
-    # prepare json output, ensure no newlines in JSON fields
-    out_json = {
-        "doc_id": base,
-        "filename": pdf_path.name,
-        "filepath": str(pdf_path.resolve()),
-        "md5": res.get("md5"),
-        "ocr_used": res.get("ocr_used", False),
-        "language": lang,
-        "word_count": len(working_text.split()),
-        "citations_count": len(citations),
-        "citations": citations,
-        "citation_contexts": contexts,
-        "summary_en": clean_for_json(en_summary),
-        "summary_hi": clean_for_json(hi_summary) if hi_summary else None,
-        "alignment": alignment
-    }
-
-    (json_dir / f"{base}.json").write_text(json.dumps(out_json, ensure_ascii=False, indent=2), encoding="utf-8")
-    logger.info("Processed %s (citations=%d)", pdf_path.name, len(citations))
-    return out_json
-
-def main(input_folder, output_folder, ocr=False, workers=2, ocr_page_limit=None):
+def process_single(pdf_path, out_dir, ocr=False, ocr_page_limit=None, mode="generative", translate=True,
+                   cascade=None, lazy_translation=False, json_format="pretty", trace=None, memory_budget_mb=None):
+    """
+    mode="generative": mT5 document summary + citation mini-summaries.
+    mode="extractive": summary = top-ranked sentences (SBERT centrality + citation salience);
+                       no summarize_text / summarize_all_citations_in_json. Same JSON schema.
+    translate=False (extractive only) skips HI<->EN translation entirely.
+    cascade: optional cascade_config() dict routing citation mini-summaries by salience.
+    lazy_translation: for Hindi input, translate only the sentences that feed citations,
+                      supporting sentences and the summary input (word_count is then the source count).
+    json_format: "pretty" (indent=2), "compact" or "gzip" (compact, <doc_id>.json.gz).
+    trace: cProfile settings, see new_job(); the result carries the document's spans as "trace_spans".
+    memory_budget_mb: RSS budget of this worker process; documents that would exceed it are degraded
+                      (listed under "degraded" in their JSON) instead of failing.
+    """
+    job = new_job(pdf_path, out_dir, ocr=ocr, ocr_page_limit=ocr_page_limit, mode=mode, translate=translate,
+                  cascade=cascade, lazy_translation=lazy_translation, json_format=json_format, trace=trace,
+                  memory_budget_mb=memory_budget_mb)
+    return process_document(job)
+
+def parse_stage_workers(spec):
+    """'extract=4,citations=2' -> {"extract": 4, "citations": 2}"""
+    out = {}
+    for part in (spec or "").split(","):
+        if part.strip():
+            name, n = part.split("=")
+            out[name.strip()] = int(n)
+    return out
+
+def _run_threads(pdfs, job_kwargs, workers):
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futures = {ex.submit(process_single, p, **job_kwargs): p for p in pdfs}
+        for fut in as_completed(futures):
+            p = futures.pop(fut)   # drop the reference so finished results are not kept around
+            try:
+                yield p, fut.result(), None
+            except Exception as e:
+                yield p, None, e
+
+def _run_prefork(pdfs, job_kwargs, workers):
+    # models are loaded once here, then every worker is forked and shares the weight pages
+    warm_up(job_kwargs["mode"], job_kwargs["translate"])
+    pool = fork_pool(workers)
+    try:
+        futures = {pool.submit(process_single, p, **job_kwargs): p for p in pdfs}
+        reported = False
+        for fut in as_completed(futures):
+            p = futures.pop(fut)
+            if not reported:
+                # workers have loaded their per-process state by now
+                log_workers_memory_report(); reported = True
+            try:
+                yield p, fut.result(), None
+            except Exception as e:
+                yield p, None, e
+        log_workers_memory_report()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def _run_staged(pdfs, job_kwargs, stage_workers, queue_size):
+    out_dir = job_kwargs.pop("out_dir")
+    ex = StagedExecutor(STAGES, workers=stage_workers, queue_size=queue_size)
+    yield from ex.run((p, new_job(p, out_dir, **job_kwargs)) for p in pdfs)
+
+def _process_streaming(todo, kept, job_kwargs, cfg, manifest, contexts_path, executor, workers,
+                       stage_workers, queue_size, tracer=None, built_at=None):
+    """
+    Process `todo`; each finished document is recorded in the manifest and its contexts appended
+    to citation_contexts.jsonl right away, then the result is dropped. Returns the new entries.
+    """
+    new_entries = []
+    writer = ContextsWriter(contexts_path)
+    try:
+        writer.carry_over(kept, built_at)
+        if not todo:
+            writer.close()
+            return new_entries
+        if executor == "staged":
+            # --workers sizes the CPU (process-pool) stages unless --stage_workers says otherwise
+            sw = {"extract": workers, "citations": max(1, workers // 2)}
+            if scheduler_enabled():
+                # several documents in each model stage at once, so the scheduler has something to batch
+                sw.update({"translate_input": 4, "embed": 4, "generate": 4, "translate_output": 4})
+            sw.update(stage_workers or {})
+            results = _run_staged(todo, dict(job_kwargs), sw, queue_size)
+        elif executor == "prefork":
+            results = _run_prefork(todo, job_kwargs, workers)
+        else:
+            results = _run_threads(todo, job_kwargs, workers)
+
+        json_dir = Path(job_kwargs["out_dir"]) / "json"
+        for p, res, err in tqdm(results, total=len(todo)):
+            if err is not None:
+                logger.error("Error processing %s: %s", p, err)
+                continue
+            if tracer is not None:
+                tracer.write_doc(res.pop("trace_spans", None))
+            contexts = res.get("citation_contexts", [])
+            writer.write_doc(res["doc_id"], contexts)
+            new_entries.append(manifest.record(res["md5"], cfg, res["doc_id"],
+                                               doc_json_path(json_dir, res["doc_id"], job_kwargs["json_format"]),
+                                               index_row(res), len(contexts)))
+            del res, contexts
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    return new_entries
+
+def _convert_kept(kept, json_format, manifest):
+    """json_format is not in the config hash: unchanged documents in another format are re-serialized, not reprocessed."""
+    out, converted = [], 0
+    for e in kept:
+        if json_format_of(e["json_path"]) != json_format:
+            path = convert_doc_json(e["json_path"], json_format)
+            e = manifest.record(e["md5"], e["config_hash"], e["doc_id"], path, e["index_row"], e["contexts_count"])
+            converted += 1
+        out.append(e)
+    if converted:
+        logger.info("Re-serialized %d unchanged documents as %s JSON", converted, json_format)
+    return out
+
+def main(input_folder, output_folder, ocr=False, workers=2, ocr_page_limit=None, mode="generative", translate=True,
+         cascade=None, lazy_translation=False, executor="staged", stage_workers=None, queue_size=4, force=False, shard=None,
+         json_format="pretty", profile=None, memory_budget_mb=None):
+    """
+    Incremental: documents whose PDF content (md5) and pipeline config are already recorded in
+    <output>/run_manifest.jsonl (and whose JSON is still on disk) are skipped; an interrupted run
+    resumes where it stopped. force=True reprocesses everything.
+    shard=(i, N): only the documents with int(md5) % N == i; aggregates and manifest get a
+    .shard-i-of-N suffix (combine them with scripts.merge_shards).
+    Aggregates are streamed as documents complete; memory stays bounded by the documents in flight
+    (plus one small manifest entry per document).
+    profile: span names (or ["all"]) to run under cProfile.
+    memory_budget_mb: per worker process; see process_single.
+    """
     input_folder = Path(input_folder)
     output_folder = Path(output_folder)
     output_folder.mkdir(parents=True, exist_ok=True)
@@ -112,45 +207,53 @@ def main(input_folder, output_folder, ocr=False, workers=2, ocr_page_limit=None)
     if not pdfs:
         print("No PDFs found in", input_folder); return
 
-    index_rows = []
-    all_contexts = []
+    suffix = shard_suffix(shard)
+    profile_dir = output_folder / f"profiles{suffix}"
+    trace = {"profile": list(profile), "profile_dir": str(profile_dir)} if profile else None
+    job_kwargs = dict(out_dir=output_folder, ocr=ocr, ocr_page_limit=ocr_page_limit, mode=mode, translate=translate,
+                      cascade=cascade, lazy_translation=lazy_translation, json_format=json_format, trace=trace,
+                      memory_budget_mb=memory_budget_mb)
+    cfg = config_hash(new_job(pdfs[0], output_folder, **{k: v for k, v in job_kwargs.items() if k != "out_dir"})["opts"])
+    manifest = RunManifest(output_folder / f"run_manifest{suffix}.jsonl")
 
-    with ThreadPoolExecutor(max_workers=workers) as ex:
-        futures = {ex.submit(process_single, p, output_folder, ocr, ocr_page_limit): p for p in pdfs}
-        for fut in tqdm(as_completed(futures), total=len(futures)):
-            p = futures[fut]
-            try:
-                res = fut.result()
-                index_rows.append(res)
-                for c in res.get("citation_contexts", []):
-                    all_contexts.append({"doc_id": res["doc_id"], **c})
-            except Exception as e:
-                logger.exception("Error processing %s: %s", p, e)
-
-    # write index CSV
-    csv_path = output_folder / "index.csv"
-    fieldnames = ["doc_id","filename","filepath","md5","ocr_used","language","word_count","citations_count"]
-    with csv_path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for r in sorted(index_rows, key=lambda x: x["doc_id"]):
-            writer.writerow({
-                "doc_id": r.get("doc_id",""),
-                "filename": r.get("filename",""),
-                "filepath": r.get("filepath",""),
-                "md5": r.get("md5",""),
-                "ocr_used": r.get("ocr_used",False),
-                "language": r.get("language",""),
-                "word_count": r.get("word_count",0),
-                "citations_count": r.get("citations_count",0)
-            })
-
-    # write combined contexts jsonl
-    contexts_path = output_folder / "citation_contexts.jsonl"
-    with contexts_path.open("w", encoding="utf-8") as f:
-        for c in all_contexts:
-            f.write(json.dumps(c, ensure_ascii=False) + "\n")
+    kept, todo = [], []
+    for p in pdfs:
+        md5 = md5_of_file(p)
+        if shard and shard_of(md5, shard[1]) != shard[0]:
+            continue
+        entry = None if force else manifest.lookup(md5, cfg, safe_filename(p.stem))
+        (kept if entry else todo).append(entry or p)
+    logger.info("%s%d documents unchanged, %d to process",
+                f"shard {shard[0]}/{shard[1]}: " if shard else "", len(kept), len(todo))
+    kept = _convert_kept(kept, json_format, manifest)
+
+    csv_path = output_folder / f"index{suffix}.csv"
+    contexts_path = output_folder / f"citation_contexts{suffix}.jsonl"
+    if (not todo and aggregate_fingerprint(kept) == manifest.meta.get("aggregate_fingerprint")
+            and csv_path.exists() and contexts_path.exists()):
+        logger.info("Aggregates up to date")
+        live = kept
+        built_at = manifest.meta.get("aggregate_built_at")
+    else:
+        tracer = TraceWriter(output_folder, suffix) if todo else None
+        try:
+            live = kept + _process_streaming(todo, kept, job_kwargs, cfg, manifest, contexts_path, executor, workers,
+                                             stage_workers, queue_size, tracer,
+                                             built_at=manifest.meta.get("aggregate_built_at"))
+            built_at = time.time()   # every entry in `live` finished before the new file was swapped in
+        finally:
+            if tracer is not None:
+                tracer.close()
+        if profile:
+            merge_profiles(profile_dir)
+        write_index(csv_path, [e["index_row"] for e in live])
+    manifest.compact(meta={"aggregate_fingerprint": aggregate_fingerprint(live), "aggregate_built_at": built_at})
 
+    tm = get_memory()
+    if tm is not None:
+        tm.log_stats()
+    log_scheduler_stats()
+    get_embedding_service().log_stats()
     print("Done. Outputs in", output_folder)
 
 if __name__ == "__main__":
@@ -158,7 +261,60 @@ if __name__ == "__main__":
     parser.add_argument("input_folder")
     parser.add_argument("output_folder")
     parser.add_argument("--ocr", action="store_true")
-    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=None, help="default: the CPU plan's processes, else 2")
+    parser.add_argument("--plan", default=None, help="CPU plan profile (default: the scripts.autotune profile)")
+    parser.add_argument("--executor", choices=("staged", "threads", "prefork"), default=None,
+                        help="staged: per-stage workers + bounded queues; threads: whole documents per thread; "
+                             "prefork: load models once, then fork --workers processes sharing the weights")
+    parser.add_argument("--stage_workers", default=None,
+                        help="per-stage worker counts, e.g. extract=4,citations=2,embed=1,generate=1")
+    parser.add_argument("--queue_size", type=int, default=4, help="max documents waiting between stages")
+    parser.add_argument("--micro_batch", action="store_true",
+                        help="batch generate()/translation calls across concurrent documents")
+    parser.add_argument("--json_format", choices=JSON_FORMATS, default="pretty",
+                        help="outputs/json: pretty (indent=2), compact, or gzip (compact .json.gz)")
+    parser.add_argument("--shard", default=None, help="i/N: process only this content-hash shard")
+    parser.add_argument("--profile", default=None,
+                        help="comma-separated span names to run under cProfile (extract,clean,citations,segment,"
+                             "embed,contexts,citation_summaries,generate,translate_input,translate_output,write) "
+                             "or 'all'")
+    parser.add_argument("--memory_budget_mb", type=float, default=os.environ.get("MEMORY_BUDGET_MB") or None,
+                        help="RSS budget per worker process (models included): adaptive batch sizes, "
+                             "degraded processing instead of OOM for documents that would not fit")
+    parser.add_argument("--force", action="store_true", help="ignore the run manifest and reprocess every PDF")
     parser.add_argument("--ocr_page_limit", type=int, default=None)
+    parser.add_argument("--mode", choices=MODES, default="generative")
+    parser.add_argument("--no_translate", action="store_true", help="extractive mode only: skip HI<->EN translation")
+    parser.add_argument("--lazy_translation", action="store_true",
+                        help="Hindi input: translate only sentences needed for citations/summary")
+    parser.add_argument("--sbert_batch_size", type=int, default=None, help="sentences per SBERT batch")
+    parser.add_argument("--sbert_max_seq_length", type=int, default=None)
+    parser.add_argument("--translate_batch_size", type=int, default=None, help="sentences per translation batch")
+    parser.add_argument("--cascade", action="store_true", help="route citation mini-summaries by salience")
+    parser.add_argument("--cascade_low", type=float, default=None, help="below -> extractive one-liner")
+    parser.add_argument("--cascade_high", type=float, default=None,
+                        help="RELIED/OVERRULED with supporting-sentence similarity at/above -> large model")
+    parser.add_argument("--cascade_small_model", default=None)
     args = parser.parse_args()
-    main(args.input_folder, args.output_folder, ocr=args.ocr, workers=args.workers, ocr_page_limit=args.ocr_page_limit)
+    plan = load_plan(args.plan)
+    calibrated = plan["source"] == "calibrated"
+    executor = args.executor or (plan["executor"] if calibrated else "staged")
+    workers = args.workers or (plan["processes"] if calibrated and executor == "prefork" else 2)
+    # one process (staged/threads executors) owns all cores; prefork workers get their share each
+    apply_plan(plan, single_process=executor != "prefork")
+    if args.sbert_batch_size:
+        os.environ["SBERT_BATCH_SIZE"] = str(args.sbert_batch_size)
+    if args.sbert_max_seq_length:
+        os.environ["SBERT_MAX_SEQ_LENGTH"] = str(args.sbert_max_seq_length)
+    if args.micro_batch:
+        enable_scheduler(True)
+    if args.translate_batch_size:
+        translator.DEFAULT_BATCH_SIZE = args.translate_batch_size
+    cascade = cascade_config(low_threshold=args.cascade_low, high_threshold=args.cascade_high,
+                             small_model=args.cascade_small_model) if args.cascade else None
+    main(args.input_folder, args.output_folder, ocr=args.ocr, workers=workers, ocr_page_limit=args.ocr_page_limit,
+         mode=args.mode, translate=not args.no_translate, cascade=cascade, lazy_translation=args.lazy_translation,
+         executor=executor, stage_workers=parse_stage_workers(args.stage_workers), queue_size=args.queue_size,
+         force=args.force, shard=parse_shard(args.shard), json_format=args.json_format,
+         profile=[s.strip() for s in args.profile.split(",") if s.strip()] if args.profile else None,
+         memory_budget_mb=args.memory_budget_mb)
@@ -1,7 +1,8 @@
 # src/citations/citation_extractor.py
+import os
 import re
+import threading
 from src.utils import sentence_spans
-from sentence_transformers import SentenceTransformer, util
 
 CITATION_PATTERNS = [
     r"(?P<case1>[A-Z][\w\.\-\,\s&]+ v(?:s|\.|s\.)? [A-Z][\w\.\-\,\s&]+),\s*\((?P<year1>\d{4})\)\s*(?P<vol1>\d+)\s*SCC\s*(?P<page1>\d+)",
@@ -14,11 +15,18 @@ CITATION_PATTERNS = [
 ]
 CITATION_REGEX = re.compile("|".join(CITATION_PATTERNS), flags=re.IGNORECASE)
 
+# override with a local path (e.g. the benchmark stand-in) via env SBERT_MODEL
+SBERT_MODEL = os.environ.get("SBERT_MODEL", "sentence-transformers/paraphrase-multilingual-mpnet-base-v2")
 _sbert = None
+_sbert_load_lock = threading.Lock()
 def get_sbert():
     global _sbert
-    if _sbert is None:
-        _sbert = SentenceTransformer("sentence-transformers/paraphrase-multilingual-mpnet-base-v2")
+    with _sbert_load_lock:
+        if _sbert is None:
+            from sentence_transformers import SentenceTransformer
+            from src.pipeline.planner import configure_torch
+            configure_torch()
+            _sbert = SentenceTransformer(SBERT_MODEL)
     return _sbert
 
 def find_citations(text):
@@ -50,12 +58,20 @@ def canonicalize(c):
     if c.get("page"): parts.append(str(c["page"]))
     return "::".join(parts) if parts else c.get("match")
 
-def build_contexts(text, citations, window=5, top_k=8):
-    spans = sentence_spans(text)
+def encode_sentences(sentences, batch_size=None):
+    # pooled with other documents' sentences, length-sorted, batched (src/inference/embedding.py)
+    from src.inference.embedding import get_embedding_service
+    return get_embedding_service(get_sbert).encode(sentences, batch_size=batch_size) if sentences else None
+
+def build_contexts(text, citations, window=5, top_k=8, spans=None, sent_embs=None):
+    # spans / sent_embs can be passed in when the caller already segmented + encoded the text
+    spans = spans if spans is not None else sentence_spans(text)
     sentences = [s for (_,_,s) in spans]
     offsets = [(s,e) for s,e,_ in spans]
-    sbert = get_sbert()
-    sent_embs = sbert.encode(sentences, convert_to_tensor=True) if sentences else None
+    if sent_embs is None:
+        sent_embs = encode_sentences(sentences)
+    if sent_embs is not None:
+        from sentence_transformers import util
     contexts=[]
     for cit in citations:
         sidx = None
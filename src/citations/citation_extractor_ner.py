@@ -1,7 +1,6 @@
 # src/citations/citation_extractor_ner.py
 
-import torch
-from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
+from src.inference.weights import load_hf_model
 
 MODEL_NAME = "law-ai/InLegalBERT-NER-Citation"
 
@@ -12,8 +11,8 @@ _ner = None
 def get_ner():
     global _tokenizer, _model, _ner
     if _ner is None:
-        _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-        _model = AutoModelForTokenClassification.from_pretrained(MODEL_NAME)
+        from transformers import AutoModelForTokenClassification, pipeline
+        _tokenizer, _model = load_hf_model(MODEL_NAME, AutoModelForTokenClassification)
         _ner = pipeline(
             "token-classification",
             model=_model,
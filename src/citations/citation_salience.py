@@ -15,9 +15,14 @@ def classify_role(context_text):
                 return role
     return "MENTIONED"
 
+ROLE_WEIGHTS = {"RELIED": 0.4, "DISTINGUISHED": 0.2, "MENTIONED": 0.1, "OVERRULED": -0.3}
+
 def compute_salience(supporting_sentences, role):
     if not supporting_sentences:
         return 0.0
     base = sum(s["score"] for s in supporting_sentences) / len(supporting_sentences)
-    weight = {"RELIED": 0.4, "DISTINGUISHED": 0.2, "MENTIONED": 0.1, "OVERRULED": -0.3}[role]
-    return round(base + weight, 3)
+    return round(base + ROLE_WEIGHTS[role], 3)
+
+def salience_base(salience, role):
+    """The role-independent part of compute_salience (mean supporting-sentence similarity)."""
+    return round(float(salience) - ROLE_WEIGHTS.get(role, 0.0), 3)
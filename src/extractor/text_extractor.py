@@ -1,17 +1,25 @@
 # src/extractor/text_extractor.py
-from pdfminer.high_level import extract_text
 from pathlib import Path
-try:
-    from pdf2image import convert_from_path
-    import pytesseract
-    OCR_IMPORTED = True
-except Exception:
-    OCR_IMPORTED = False
 from src.utils import md5_of_file
+from src.pipeline.tracing import child
 import logging
 logger = logging.getLogger(__name__)
 
+_ocr = None   # (convert_from_path, pytesseract) or False, imported on first OCR use
+
+def _ocr_modules():
+    global _ocr
+    if _ocr is None:
+        try:
+            from pdf2image import convert_from_path
+            import pytesseract
+            _ocr = (convert_from_path, pytesseract)
+        except Exception:
+            _ocr = False
+    return _ocr
+
 def extract_text_pdfminer(pdf_path):
+    from pdfminer.high_level import extract_text
     try:
         return extract_text(str(pdf_path)) or ""
     except Exception as e:
@@ -19,8 +27,10 @@ def extract_text_pdfminer(pdf_path):
         return ""
 
 def ocr_pdf(pdf_path, dpi=250, page_limit=None):
-    if not OCR_IMPORTED:
+    mods = _ocr_modules()
+    if not mods:
         return ""
+    convert_from_path, pytesseract = mods
     pages = convert_from_path(str(pdf_path), dpi=dpi)
     if page_limit:
         pages = pages[:page_limit]
@@ -31,10 +41,14 @@ def ocr_pdf(pdf_path, dpi=250, page_limit=None):
 
 def extract(pdf_path, ocr=False, ocr_page_limit=None):
     pdf_path = Path(pdf_path)
-    text = extract_text_pdfminer(pdf_path)
+    with child("pdfminer") as attrs:
+        text = extract_text_pdfminer(pdf_path)
+        attrs["chars"] = len(text)
     used_ocr = False
     if not text or len(text.strip()) < 300:
-        if ocr and OCR_IMPORTED:
-            text = ocr_pdf(pdf_path, page_limit=ocr_page_limit)
+        if ocr and _ocr_modules():
+            with child("ocr") as attrs:
+                text = ocr_pdf(pdf_path, page_limit=ocr_page_limit)
+                attrs["chars"] = len(text)
             used_ocr = True
     return {"text": text or "", "ocr_used": used_ocr, "md5": md5_of_file(pdf_path)}
@@ -0,0 +1,129 @@
+# src/inference/embedding.py
+"""
+Shared SBERT embedding service.
+
+encode() calls from concurrent documents are pooled for a short wait window, all their
+sentences are sorted by token length, encoded in fixed-size batches and scattered back to
+each caller in the original order. Small documents no longer leave batches underfilled and
+long documents get length-sorted batches with a bounded max_seq_length.
+
+Env: SBERT_BATCH_SIZE (64), SBERT_MAX_SEQ_LENGTH (128), SBERT_MAX_WAIT_MS (10).
+"""
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+from src.utils import model_lock
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingService:
+    def __init__(self, model_getter, batch_size: int = None, max_seq_length: int = None, max_wait_ms: float = None):
+        self._get_model = model_getter
+        self.batch_size = batch_size or int(os.environ.get("SBERT_BATCH_SIZE", 64))
+        self.max_seq_length = max_seq_length or int(os.environ.get("SBERT_MAX_SEQ_LENGTH", 128))
+        wait = max_wait_ms if max_wait_ms is not None else float(os.environ.get("SBERT_MAX_WAIT_MS", 10))
+        self.max_wait = wait / 1000
+        self._q = queue.Queue()
+        self.sentences = 0
+        self.seconds = 0.0
+        self._thread = threading.Thread(target=self._loop, name="embedding-service", daemon=True)
+        self._thread.start()
+
+    def encode(self, sentences, batch_size: int = None):
+        """
+        Blocking: returns a (len(sentences), dim) tensor, or None for an empty list.
+        batch_size caps the batches of the pooled encode this request ends up in (memory budget).
+        """
+        if not sentences:
+            return None
+        fut = Future()
+        self._q.put((list(sentences), fut, batch_size))
+        return fut.result()
+
+    def _collect(self):
+        reqs = [self._q.get()]
+        n = len(reqs[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while n < self.batch_size * 8:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                r = self._q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            reqs.append(r); n += len(r[0])
+        return reqs
+
+    def _loop(self):
+        while True:
+            reqs = self._collect()
+            try:
+                caps = [b for _, _, b in reqs if b]
+                embs = self._encode_pooled([s for sents, _, _ in reqs for s in sents],
+                                           min([self.batch_size] + caps))
+                start = 0
+                for sents, fut, _ in reqs:
+                    fut.set_result(embs[start:start + len(sents)])
+                    start += len(sents)
+                del embs
+            except Exception as e:
+                for _, fut, _ in reqs:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+    def _encode_pooled(self, sentences, batch_size=None):
+        import torch
+        model = self._get_model()
+        t0 = time.perf_counter()
+        with model_lock(model), torch.no_grad():
+            if model.max_seq_length != self.max_seq_length:
+                model.max_seq_length = self.max_seq_length
+            lengths = [len(ids) for ids in model.tokenizer(sentences, add_special_tokens=False,
+                                                          truncation=True, max_length=self.max_seq_length)["input_ids"]]
+            order = sorted(range(len(sentences)), key=lambda i: lengths[i])
+            chunks = []
+            batch_size = batch_size or self.batch_size
+            for b in range(0, len(order), batch_size):
+                batch = [sentences[i] for i in order[b:b + batch_size]]
+                chunks.append(model.encode(batch, batch_size=len(batch), convert_to_tensor=True,
+                                           show_progress_bar=False))
+            sorted_embs = torch.cat(chunks, dim=0)
+            # scatter back to the caller's order
+            embs = torch.empty_like(sorted_embs)
+            embs[torch.tensor(order, device=sorted_embs.device)] = sorted_embs
+        self.sentences += len(sentences)
+        self.seconds += time.perf_counter() - t0
+        return embs
+
+    def stats(self):
+        return {
+            "sentences": self.sentences,
+            "seconds": round(self.seconds, 3),
+            "sentences_per_sec": round(self.sentences / self.seconds, 1) if self.seconds else 0.0,
+            "batch_size": self.batch_size,
+            "max_seq_length": self.max_seq_length,
+        }
+
+    def log_stats(self):
+        logger.info("embedding service: %s", self.stats())
+
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_embedding_service(model_getter=None) -> EmbeddingService:
+    """Process-wide service around the multilingual SBERT (citation_extractor.get_sbert)."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            if model_getter is None:
+                from src.citations.citation_extractor import get_sbert
+                model_getter = get_sbert
+            _service = EmbeddingService(model_getter)
+        return _service
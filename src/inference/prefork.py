@@ -0,0 +1,95 @@
+# src/inference/prefork.py
+"""
+Fork-after-warm-up workers.
+
+The parent loads every model the pipeline needs (warm_up), moves all surviving objects to the
+permanent GC generation (gc.freeze, so collections in the children don't write to their pages)
+and only then forks its workers: weight pages stay shared copy-on-write between the parent and
+all children instead of each worker loading its own copy. Combine with MODEL_MMAP=1
+(src.inference.weights) so the weights are file-backed, shared page cache as well.
+
+Warm-up only loads weights; it does not run inference, so no intra-op thread pool exists at fork
+time (forking a process with a running OpenMP pool can hang the children).
+
+memory_report() reads /proc/<pid>/smaps_rollup: RSS vs. the shared part vs. private pages.
+"""
+import gc
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_SMAPS_FIELDS = {"Rss": "rss_mb", "Pss": "pss_mb", "Shared_Clean": "shared_clean_mb",
+                 "Shared_Dirty": "shared_dirty_mb", "Private_Clean": "private_clean_mb",
+                 "Private_Dirty": "private_dirty_mb"}
+
+
+def warm_up(mode: str = "generative", translate: bool = True):
+    """Load (not run) the models process_document will use for this mode."""
+    from src.citations.citation_extractor import get_sbert
+    get_sbert()
+    if translate or mode == "generative":
+        from src.translation.translator import get_translator, HI_TO_EN, EN_TO_HI
+        get_translator(HI_TO_EN)
+        get_translator(EN_TO_HI)
+    if mode == "generative":
+        from src.summarizer.summarizer import _load, get_mt5
+        _load()
+        get_mt5()
+    gc.collect()
+    gc.freeze()
+    logger.info("warm-up done (pid %d): %s", os.getpid(), memory_report())
+
+
+def _init_worker(threads):
+    # each child gets its share of the cores for torch's intra-op pool
+    import torch
+    torch.set_num_threads(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+
+def fork_pool(workers: int, threads: int = None) -> ProcessPoolExecutor:
+    """
+    ProcessPoolExecutor whose workers are forked from the (already warmed-up) current process.
+    threads: torch intra-op threads per worker (default: the physical cores split evenly).
+    """
+    from src.pipeline.planner import cpu_topology
+    threads = threads or max(1, cpu_topology()["cores"] // max(1, workers))
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+                               initializer=_init_worker, initargs=(threads,))
+
+
+def memory_report(pid="self") -> dict:
+    """Memory of one process in MB; {} where /proc is not available."""
+    out = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in _SMAPS_FIELDS:
+                    out[_SMAPS_FIELDS[key]] = round(int(rest.split()[0]) / 1024, 1)
+    except OSError:
+        return out
+    out["shared_mb"] = round(out.get("shared_clean_mb", 0) + out.get("shared_dirty_mb", 0), 1)
+    out["private_mb"] = round(out.get("private_clean_mb", 0) + out.get("private_dirty_mb", 0), 1)
+    return out
+
+
+def workers_memory_report() -> dict:
+    """{"parent": report, "workers": {pid: report}, "total_pss_mb": ...} for this process and its children."""
+    parent = memory_report()
+    workers = {p.pid: memory_report(p.pid) for p in multiprocessing.active_children()}
+    total_pss = parent.get("pss_mb", 0) + sum(r.get("pss_mb", 0) for r in workers.values())
+    return {"parent": parent, "workers": workers, "total_pss_mb": round(total_pss, 1)}
+
+
+def log_workers_memory_report(report: dict = None):
+    report = report or workers_memory_report()
+    logger.info("parent: %s", report["parent"])
+    for pid, r in report["workers"].items():
+        logger.info("worker %d: rss %.1f MB = shared %.1f MB + private %.1f MB (pss %.1f MB)", pid,
+                    r.get("rss_mb", 0), r.get("shared_mb", 0), r.get("private_mb", 0), r.get("pss_mb", 0))
+    logger.info("total PSS (actual RAM used, shared pages split between processes): %.1f MB", report["total_pss_mb"])
+    return report
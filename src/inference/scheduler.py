@@ -0,0 +1,128 @@
+# src/inference/scheduler.py
+"""
+Cross-document micro-batching for seq2seq generate().
+
+Callers (document summaries, citation mini-summaries, translations — from any thread) submit a
+single text and get a Future back. One scheduler thread per model drains the request queue for a
+short wait window, groups requests with identical generation settings, sorts them by input
+length (chars) and runs them as padded batches of at most max_batch.
+
+Enable with env INFERENCE_SCHEDULER=1 or enable_scheduler(); batch size / wait window via
+INFERENCE_MAX_BATCH (8) and INFERENCE_MAX_WAIT_MS (20).
+"""
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+from src.utils import model_lock
+
+logger = logging.getLogger(__name__)
+
+_enabled = os.environ.get("INFERENCE_SCHEDULER", "0").lower() in ("1", "true", "yes", "on")
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def enable_scheduler(on: bool = True):
+    global _enabled
+    _enabled = on
+
+
+def scheduler_enabled() -> bool:
+    return _enabled
+
+
+class _Request:
+    __slots__ = ("text", "max_input_len", "gen_kwargs", "future")
+
+    def __init__(self, text, max_input_len, gen_kwargs):
+        self.text = text
+        self.max_input_len = max_input_len
+        self.gen_kwargs = gen_kwargs
+        self.future = Future()
+
+
+class GenerateScheduler:
+    def __init__(self, tokenizer, model, max_batch: int = None, max_wait_ms: float = None):
+        self.tokenizer, self.model = tokenizer, model
+        self.max_batch = max_batch or int(os.environ.get("INFERENCE_MAX_BATCH", 8))
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else float(os.environ.get("INFERENCE_MAX_WAIT_MS", 20))) / 1000
+        self._q = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self._thread = threading.Thread(target=self._loop, name="generate-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str, max_input_len: int = 512, **gen_kwargs) -> Future:
+        req = _Request(text, max_input_len, gen_kwargs)
+        self._q.put(req)
+        return req.future
+
+    def _collect(self):
+        batch = [self._q.get()]
+        deadline = time.monotonic() + self.max_wait
+        # look a few batches ahead so length-sorting has something to sort
+        while len(batch) < self.max_batch * 4:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            reqs = self._collect()
+            groups = {}
+            for r in reqs:
+                key = (r.max_input_len, tuple(sorted(r.gen_kwargs.items())))
+                groups.setdefault(key, []).append(r)
+            for group in groups.values():
+                group.sort(key=lambda r: len(r.text))   # chars as a cheap proxy for token length
+                for i in range(0, len(group), self.max_batch):
+                    self._run(group[i:i + self.max_batch])
+
+    def _run(self, reqs):
+        import torch
+        try:
+            with model_lock(self.model), torch.no_grad():
+                enc = self.tokenizer([r.text for r in reqs], return_tensors="pt", padding=True,
+                                     truncation=True, max_length=reqs[0].max_input_len).to(self.model.device)
+                out = self.model.generate(**enc, **reqs[0].gen_kwargs)
+                dec = self.tokenizer.batch_decode(out, skip_special_tokens=True)
+            self.batches += 1
+            self.items += len(reqs)
+            for r, d in zip(reqs, dec):
+                r.future.set_result(d)
+        except Exception as e:
+            for r in reqs:
+                if not r.future.done():
+                    r.future.set_exception(e)
+
+    def stats(self):
+        return {"batches": self.batches, "items": self.items,
+                "mean_batch": round(self.items / self.batches, 2) if self.batches else 0.0}
+
+
+def get_scheduler(tokenizer, model) -> GenerateScheduler:
+    """One scheduler (and thread) per loaded model."""
+    with _schedulers_lock:
+        if id(model) not in _schedulers:
+            _schedulers[id(model)] = GenerateScheduler(tokenizer, model)
+        return _schedulers[id(model)]
+
+
+def scheduled_generate(tokenizer, model, text: str, max_input_len: int = 512, **gen_kwargs) -> str:
+    """Blocking convenience wrapper: submit one text and wait for its decoded output."""
+    return get_scheduler(tokenizer, model).submit(text, max_input_len=max_input_len, **gen_kwargs).result()
+
+
+def log_scheduler_stats():
+    with _schedulers_lock:
+        for sch in _schedulers.values():
+            logger.info("generate scheduler [%s]: %s", type(sch.model).__name__, sch.stats())
@@ -0,0 +1,127 @@
+# src/inference/weights.py
+"""
+Model loading through local, memory-mapped safetensors.
+
+With MODEL_MMAP=1 every Hugging Face model loaded through load_hf_model() is exported once to
+MODEL_CACHE_DIR/<name>/ (save_pretrained, safetensors) and later loads map that file instead of
+reading it into private memory: the model is built on the meta device and its parameters are
+assigned views of a file-backed storage. Read-only weight pages then live in the page cache and
+are shared by every process on the node that maps the same file — forked workers and separately
+started ones alike. Models whose layout cannot be mapped (a tensor missing from the file) fall
+back to a regular from_pretrained() of the local copy.
+
+Env:
+  MODEL_MMAP=1                     enable (default off: plain from_pretrained)
+  MODEL_CACHE_DIR=...              default ~/.cache/legal_summarizer/models
+"""
+import os
+import json
+import struct
+import logging
+import threading
+from pathlib import Path
+
+from src.utils import safe_filename
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "legal_summarizer", "models")
+_export_lock = threading.Lock()
+
+_DTYPES = {"F32": "float32", "F16": "float16", "BF16": "bfloat16", "F64": "float64",
+           "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool"}
+
+
+def mmap_enabled() -> bool:
+    return os.environ.get("MODEL_MMAP", "0").lower() in ("1", "true", "yes", "on")
+
+
+def local_model_dir(model_name: str) -> Path:
+    return Path(os.environ.get("MODEL_CACHE_DIR", DEFAULT_CACHE_DIR)) / safe_filename(model_name.replace("/", "__"))
+
+
+def export_safetensors(model_name: str, auto_cls) -> Path:
+    """Save model + tokenizer once as a local safetensors checkpoint; returns its directory."""
+    out = local_model_dir(model_name)
+    with _export_lock:
+        if (out / "model.safetensors").exists():
+            return out
+        from transformers import AutoTokenizer
+        logger.info("exporting %s to %s (safetensors)", model_name, out)
+        tmp = out.with_name(out.name + ".tmp")
+        model = auto_cls.from_pretrained(model_name)
+        # one file (no shards) so a single mapping covers every tensor
+        model.save_pretrained(tmp, safe_serialization=True, max_shard_size="100GB")
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(tmp)
+        del model
+        tmp.replace(out)
+    return out
+
+
+def _read_header(path: Path):
+    with open(path, "rb") as f:
+        n = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(n))
+    header.pop("__metadata__", None)
+    return 8 + n, header
+
+
+def mmap_state_dict(path):
+    """{name: tensor} whose storage is a read-only, copy-on-write mapping of the safetensors file."""
+    import torch
+    path = Path(path)
+    data_start, header = _read_header(path)
+    nbytes = path.stat().st_size
+    storage = torch.UntypedStorage.from_file(str(path), shared=False, nbytes=nbytes)
+    state = {}
+    for name, info in header.items():
+        dtype = getattr(torch, _DTYPES[info["dtype"]])
+        begin, end = data_start + info["data_offsets"][0], data_start + info["data_offsets"][1]
+        shape = tuple(info["shape"])
+        esize = torch.empty((), dtype=dtype).element_size()
+        if end == begin:
+            state[name] = torch.empty(shape, dtype=dtype)
+        elif begin % esize == 0:
+            state[name] = torch.empty(0, dtype=dtype).set_(storage, begin // esize, shape)
+        else:
+            # misaligned for its dtype: this (small) tensor gets a private copy
+            raw = torch.empty(0, dtype=torch.uint8).set_(storage, begin, (end - begin,))
+            state[name] = raw.clone().view(dtype).reshape(shape)
+    return state
+
+
+def _load_mmapped(local_dir: Path, auto_cls):
+    import torch
+    from transformers import AutoConfig
+    config = AutoConfig.from_pretrained(local_dir)
+    with torch.device("meta"):
+        model = auto_cls.from_config(config)
+    state = mmap_state_dict(local_dir / "model.safetensors")
+    model.load_state_dict(state, strict=False, assign=True)
+    model.tie_weights()
+    missing = [n for n, t in list(model.named_parameters()) + list(model.named_buffers()) if t.is_meta]
+    if missing:
+        raise ValueError(f"{len(missing)} tensors not in the checkpoint (e.g. {missing[0]})")
+    return model.eval()
+
+
+def load_hf_model(model_name: str, auto_cls=None):
+    """
+    (tokenizer, model) on CPU, eval mode. With MODEL_MMAP=1 the weights are mapped from the local
+    safetensors export (created on first use); otherwise a plain from_pretrained().
+    """
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+    from src.pipeline.planner import configure_torch
+    configure_torch()
+    auto_cls = auto_cls or AutoModelForSeq2SeqLM
+    if not mmap_enabled():
+        return AutoTokenizer.from_pretrained(model_name), auto_cls.from_pretrained(model_name).eval()
+    local_dir = export_safetensors(model_name, auto_cls)
+    tok = AutoTokenizer.from_pretrained(local_dir)
+    try:
+        model = _load_mmapped(local_dir, auto_cls)
+        logger.info("loaded %s memory-mapped from %s", model_name, local_dir)
+    except Exception as e:
+        logger.warning("cannot memory-map %s (%s); loading the local copy normally", model_name, e)
+        model = auto_cls.from_pretrained(local_dir).eval()
+    return tok, model
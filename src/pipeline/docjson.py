@@ -0,0 +1,74 @@
+# src/pipeline/docjson.py
+"""
+Per-document JSON files (outputs/json) in one of three formats:
+
+  pretty   <doc_id>.json     indent=2 (default, human-readable)
+  compact  <doc_id>.json     no indentation / spaces
+  gzip     <doc_id>.json.gz  compact + gzip
+
+Readers should go through read_doc_json / iter_doc_jsons so every format works.
+"""
+import gzip
+import json
+from pathlib import Path
+
+from src.pipeline.manifest import atomic_write_bytes
+
+JSON_FORMATS = ("pretty", "compact", "gzip")
+
+
+def doc_json_path(json_dir, doc_id: str, json_format: str = "pretty") -> Path:
+    return Path(json_dir) / (f"{doc_id}.json.gz" if json_format == "gzip" else f"{doc_id}.json")
+
+
+def dumps_doc(obj, json_format: str = "pretty") -> bytes:
+    if json_format not in JSON_FORMATS:
+        raise ValueError(f"Unknown json format: {json_format}")
+    if json_format == "pretty":
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    data = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return gzip.compress(data, mtime=0) if json_format == "gzip" else data
+
+
+def write_doc_json(json_dir, doc_id: str, obj, json_format: str = "pretty") -> Path:
+    return atomic_write_bytes(doc_json_path(json_dir, doc_id, json_format), dumps_doc(obj, json_format))
+
+
+def read_doc_json(path):
+    path = Path(path)
+    data = path.read_bytes()
+    if path.suffix == ".gz":
+        data = gzip.decompress(data)
+    return json.loads(data.decode("utf-8"))
+
+
+def json_format_of(path) -> str:
+    """Format of an existing per-document file (pretty files start with "{" + newline)."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        return "gzip"
+    with path.open("rb") as f:
+        return "pretty" if f.read(2) == b"{\n" else "compact"
+
+
+def convert_doc_json(path, json_format: str) -> Path:
+    """Re-serialize a per-document file in `json_format`; the old file goes if the name changes."""
+    path = Path(path)
+    doc_id = path.name[:-len(".json.gz")] if path.name.endswith(".json.gz") else path.stem
+    new = write_doc_json(path.parent, doc_id, read_doc_json(path), json_format)
+    if new != path:
+        path.unlink(missing_ok=True)
+    return new
+
+
+def save_doc_json(path, obj):
+    """Rewrite an existing per-document file in place (gzip stays gzip, .json is written pretty)."""
+    path = Path(path)
+    return atomic_write_bytes(path, dumps_doc(obj, "gzip" if path.suffix == ".gz" else "pretty"))
+
+
+def iter_doc_jsons(json_dir):
+    """(path, doc) for every <doc_id>.json / <doc_id>.json.gz, sorted by name."""
+    json_dir = Path(json_dir)
+    for fp in sorted([*json_dir.glob("*.json"), *json_dir.glob("*.json.gz")]):
+        yield fp, read_doc_json(fp)
@@ -0,0 +1,132 @@
+# src/pipeline/executor.py
+"""
+Staged executor: each stage has its own workers, stages are linked by bounded queues.
+
+  - "process" stages run their function in a shared ProcessPoolExecutor (CPU-bound work is not
+    serialized by the GIL); `workers` feeder threads keep that many items in flight. Its workers
+    are spawned, not forked: by the time they start the parent runs model, embedding and
+    scheduler threads, and a fork child can inherit a lock one of them held (torch/OpenMP,
+    tokenizers, logging) and deadlock. The process stages need no model state from the parent.
+  - "thread" stages run in `workers` threads (model stages default to 1 worker, so a model global
+    is never driven from two threads at once).
+  - queues hold at most `queue_size` items, so a slow stage back-pressures the ones before it
+    and only a bounded number of documents is in memory at any time.
+
+Failures are not raised inside the pipeline: the failing item skips the remaining stages and is
+yielded as (key, None, exc). An error from the input iterable ends the run: the items already fed
+are still yielded, then run() raises it. Closing run()'s generator early stops every thread.
+"""
+import logging
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class StagedExecutor:
+    def __init__(self, stages, workers=None, queue_size=4, max_processes=None):
+        """
+        stages:  [(name, fn, kind)] with kind in {"process", "thread"}
+        workers: {name: n}; missing stages get 1 worker
+        """
+        self.stages = stages
+        self.workers = {name: max(1, int((workers or {}).get(name, 1))) for name, _, _ in stages}
+        self.queue_size = queue_size
+        n_proc = sum(self.workers[name] for name, _, kind in stages if kind == "process")
+        self.max_processes = max_processes or max(1, n_proc)
+
+    def run(self, items):
+        """items: iterable of (key, payload). Yields (key, result, exc) as items leave the last stage."""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        pool = ProcessPoolExecutor(max_workers=self.max_processes, mp_context=multiprocessing.get_context("spawn")) \
+            if any(kind == "process" for _, _, kind in self.stages) else None
+        threads = []
+        stop = threading.Event()   # set when the consumer stops; blocked puts/gets give up
+        feed_error = []
+
+        def put(q, item):
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def get(q):
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            return _DONE
+
+        def feed():
+            try:
+                for key, payload in items:
+                    if not put(queues[0], (key, payload, None)):
+                        return
+            except Exception as e:
+                logger.exception("reading the pipeline input failed")
+                feed_error.append(e)
+            finally:
+                put(queues[0], _DONE)
+
+        def worker(i, fn, kind, remaining):
+            q_in, q_out = queues[i], queues[i + 1]
+            while True:
+                item = get(q_in)
+                if item is _DONE:
+                    # last worker of this stage closes the next queue
+                    with remaining["lock"]:
+                        remaining["n"] -= 1
+                        last = remaining["n"] == 0
+                    if last:
+                        put(q_out, _DONE)
+                    else:
+                        put(q_in, _DONE)   # let sibling workers see it too
+                    return
+                key, payload, exc = item
+                if exc is None:
+                    try:
+                        payload = pool.submit(fn, payload).result() if kind == "process" else fn(payload)
+                    except Exception as e:
+                        logger.exception("stage %s failed for %s", self.stages[i][0], key)
+                        payload, exc = None, e
+                if not put(q_out, (key, payload, exc)):
+                    return
+
+        threads.append(threading.Thread(target=feed, name="stage-feed", daemon=True))
+        for i, (name, fn, kind) in enumerate(self.stages):
+            remaining = {"n": self.workers[name], "lock": threading.Lock()}
+            for w in range(self.workers[name]):
+                threads.append(threading.Thread(target=worker, args=(i, fn, kind, remaining),
+                                                name=f"stage-{name}-{w}", daemon=True))
+        for t in threads:
+            t.start()
+
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is _DONE:
+                    break
+                yield item
+            if feed_error:
+                raise feed_error[0]
+        finally:
+            # also reached when the consumer stops early: unblock every thread and drop queued items
+            stop.set()
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+            for q in queues:
+                while True:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        break
+            for t in threads:
+                t.join(timeout=1)
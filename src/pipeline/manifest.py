@@ -0,0 +1,109 @@
+# src/pipeline/manifest.py
+"""
+Run manifest for incremental / resumable batch runs.
+
+Stored as an append-only journal (<output>/run_manifest.jsonl): one line per finished document,
+keyed by "<pdf md5>:<pipeline-config hash>", flushed + fsynced as each document completes, so an
+interrupted run resumes where it stopped. The journal is compacted (atomically rewritten) at the
+end of a run. A "meta" line records the fingerprint and time of the last aggregate build so unchanged
+runs skip rebuilding index.csv / citation_contexts.jsonl, and entries recorded after that build
+(by a run that died before its aggregates were swapped in) are not carried over from them.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+PIPELINE_VERSION = "1"
+
+
+def config_hash(opts: dict) -> str:
+    """Hash of everything that changes a document's output (mode, translation, cascade, OCR, models, ...)."""
+    blob = json.dumps({"version": PIPELINE_VERSION, **opts}, sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def atomic_write_bytes(path, data: bytes):
+    """Write to a temp file next to `path`, fsync, then os.replace — readers never see half a file."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def atomic_write_text(path, text: str, encoding="utf-8"):
+    return atomic_write_bytes(path, text.encode(encoding))
+
+
+class RunManifest:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}      # key -> entry
+        self.meta = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue   # torn last line from a crash
+                    if rec.get("type") == "meta":
+                        self.meta = rec
+                    else:
+                        self.entries[rec["key"]] = rec
+        self._journal = None
+
+    @staticmethod
+    def key(md5: str, cfg_hash: str) -> str:
+        return f"{md5}:{cfg_hash}"
+
+    def lookup(self, md5: str, cfg_hash: str, doc_id: str):
+        """The finished entry for this PDF content + config, if its output is still on disk."""
+        e = self.entries.get(self.key(md5, cfg_hash))
+        if e and e.get("doc_id") == doc_id and Path(e.get("json_path", "")).exists():
+            return e
+        return None
+
+    def record(self, md5: str, cfg_hash: str, doc_id: str, json_path, index_row: dict, contexts_count: int):
+        entry = {
+            "key": self.key(md5, cfg_hash), "doc_id": doc_id, "md5": md5, "config_hash": cfg_hash,
+            "json_path": str(json_path), "index_row": index_row, "contexts_count": contexts_count,
+            "finished_at": time.time(),
+        }
+        with self._lock:
+            # drop older entries for the same doc (content or config changed)
+            for k in [k for k, e in self.entries.items() if e.get("doc_id") == doc_id]:
+                del self.entries[k]
+            self.entries[entry["key"]] = entry
+            if self._journal is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._journal = self.path.open("a", encoding="utf-8")
+            self._journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        return entry
+
+    def compact(self, meta: dict = None):
+        """Rewrite the journal with one line per live entry (+ meta)."""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close(); self._journal = None
+            if meta is not None:
+                self.meta = {"type": "meta", **meta}
+            lines = [json.dumps(e, ensure_ascii=False) for e in self.entries.values()]
+            if self.meta:
+                lines.append(json.dumps(self.meta, ensure_ascii=False))
+            atomic_write_text(self.path, "\n".join(lines) + ("\n" if lines else ""))
+
+
+def aggregate_fingerprint(entries) -> str:
+    """Identity of the set of documents (and their versions) that make up the aggregates."""
+    keys = sorted(f"{e['doc_id']}|{e['key']}|{e.get('finished_at')}" for e in entries)
+    return hashlib.sha1("\n".join(keys).encode("utf-8")).hexdigest()
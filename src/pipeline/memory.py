@@ -0,0 +1,181 @@
+# src/pipeline/memory.py
+"""
+Resident memory accounting and the memory budget mode.
+
+rss_mb() reads /proc/self/statm. Peak RSS per span: a daemon thread per process samples RSS every
+MEMORY_SAMPLE_MS (20) and raises the high-water mark of every open watch; spans (src.pipeline.tracing)
+open one watch each, so their peak_rss_mb is the process peak while they ran (documents processed
+concurrently in the same process share it).
+
+MemoryBudget(budget_mb) sizes the memory-heavy steps of a document from the headroom left under the
+budget (budget - current RSS, which includes the resident models):
+  - embedding: SBERT batch size, and for documents whose embedding matrix would not fit, only the
+    sentences around citations are embedded (degraded: "embed_citation_windows");
+  - generation: beam count, citation mini-summaries skipped and finally the extractive summary
+    instead of mT5 (degraded: "no_citation_summaries", "extractive_summary");
+  - translation batch size.
+The sizes below are unvalidated estimates for the default models (768-dim SBERT, mT5-base), not
+measurements. They are a floor: after each embed / generate span the stages report the measured
+peak RSS growth (observe()), and the plans use the larger of the estimate and the worst rate seen
+so far in the process. Spans measure process-wide peaks, so concurrent documents make the
+measured rates conservative. Each degradation is recorded on the document so it can be re-run
+without a budget.
+
+A failed allocation that still raises (MemoryError, torch.OutOfMemoryError, or the CPU allocator's
+RuntimeError "not enough memory") is recognised by is_oom() and degrades the document; the Linux
+OOM killer raises nothing, which is what the proactive plans are for.
+
+Env: MEMORY_BUDGET_MB (process_folder --memory_budget_mb), MEMORY_SAMPLE_MS.
+"""
+import os
+import bisect
+import itertools
+import threading
+import time
+
+SAMPLE_SEC = float(os.environ.get("MEMORY_SAMPLE_MS", 20)) / 1000
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+EMB_DIM = 768                    # paraphrase-multilingual-mpnet-base-v2
+SBERT_ACT_MB_PER_SENT = 3.0      # transformer activations per sentence in flight (seq 128)
+SBERT_BATCHES = (64, 32, 16, 8, 4)
+MT5_BEAM_MB = 60.0               # beam search state per beam (512 input tokens, mT5-base)
+MT5_MIN_MB = 150.0               # one greedy generate() + citation-aware input
+CIT_SUMMARY_MB = 120.0           # per-citation mini-summary (second model pass)
+TRANSLATE_ITEM_MB = 8.0          # Marian generate() per sentence in the batch
+SAFETY = 0.8                     # plan against this fraction of the headroom
+
+OOM_MESSAGES = ("out of memory", "not enough memory", "cannot allocate memory", "can't allocate memory",
+                "defaultcpuallocator")
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss (KB on Linux): only the lifetime peak is available here
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class _PeakSampler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open = {}
+        self._ids = itertools.count()
+        self._pid = None
+
+    def _ensure_thread(self):
+        # threads do not survive fork: every (forked) process starts its own sampler
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._open = {}
+            threading.Thread(target=self._loop, name="rss-sampler", daemon=True).start()
+
+    def _loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(SAMPLE_SEC)
+            with self._lock:
+                if not self._open:
+                    continue
+                r = rss_mb()
+                for k, v in self._open.items():
+                    if r > v:
+                        self._open[k] = r
+
+    def open(self) -> int:
+        r = rss_mb()
+        with self._lock:
+            self._ensure_thread()
+            wid = next(self._ids)
+            self._open[wid] = r
+        return wid
+
+    def close(self, wid) -> float:
+        r = rss_mb()
+        with self._lock:
+            return max(r, self._open.pop(wid, r))
+
+
+peaks = _PeakSampler()
+
+_rates = {}          # "sbert_sent" / "mt5_beam" -> worst measured MB per unit in this process
+_rates_lock = threading.Lock()
+
+
+def observe(kind: str, mb_per_unit: float):
+    """Record a measured per-unit memory rate (see MemoryBudget); only the maximum is kept."""
+    with _rates_lock:
+        if mb_per_unit > _rates.get(kind, 0.0):
+            _rates[kind] = mb_per_unit
+
+
+def _rate(kind: str, estimate: float) -> float:
+    with _rates_lock:
+        return max(estimate, _rates.get(kind, 0.0))
+
+
+def is_oom(exc: BaseException) -> bool:
+    """True for the allocation failures a degraded retry can avoid."""
+    if isinstance(exc, MemoryError) or type(exc).__name__ == "OutOfMemoryError":
+        return True
+    return isinstance(exc, RuntimeError) and any(m in str(exc).lower() for m in OOM_MESSAGES)
+
+
+def span_growth_mb(rec) -> float:
+    """Peak RSS growth during a finished tracing span (peak minus RSS at its start)."""
+    return rec["peak_rss_mb"] - (rec["rss_mb"] - rec["rss_delta_mb"])
+
+
+class MemoryBudget:
+    def __init__(self, budget_mb: float):
+        self.budget_mb = float(budget_mb)
+
+    def headroom_mb(self) -> float:
+        return max(0.0, (self.budget_mb - rss_mb()) * SAFETY)
+
+    def embed_plan(self, n_sentences: int):
+        """(batch_size, max_sentences or None) for embedding n_sentences."""
+        head = self.headroom_mb()
+        per_sent = _rate("sbert_sent", SBERT_ACT_MB_PER_SENT)
+        for b in SBERT_BATCHES:
+            act = b * per_sent
+            matrix = n_sentences * EMB_DIM * 4 / (1024 * 1024)
+            # the result matrix is held once by the service and once by the caller while it is scattered back
+            if act + 2 * matrix <= head:
+                return b, None
+        b = SBERT_BATCHES[-1]
+        room = max(0.0, head - b * per_sent)
+        return b, max(64, int(room * 1024 * 1024 / (2 * EMB_DIM * 4)))
+
+    def generate_plan(self, n_citations: int, beams: int = 5):
+        """{"num_beams", "citation_summaries", "extractive"} for the generate stage."""
+        head = self.headroom_mb()
+        if head < MT5_MIN_MB:
+            return {"num_beams": 1, "citation_summaries": False, "extractive": True}
+        fit = int((head - MT5_MIN_MB) // _rate("mt5_beam", MT5_BEAM_MB))
+        return {"num_beams": max(1, min(beams, fit)),
+                "citation_summaries": n_citations == 0 or head >= MT5_MIN_MB + CIT_SUMMARY_MB,
+                "extractive": False}
+
+    def translate_batch_size(self, default: int = 16) -> int:
+        return max(1, min(default, int(self.headroom_mb() // TRANSLATE_ITEM_MB)))
+
+
+def citation_window_spans(spans, citations, window, max_sentences):
+    """Subset of `spans` (kept in order, offsets intact) around the citations, at most max_sentences."""
+    starts = [st for st, _, _ in spans]
+    keep = set()
+    for cit in citations:
+        i = bisect.bisect_right(starts, cit["start"]) - 1
+        if i < 0:
+            continue
+        keep.update(range(max(0, i - 2 * window), min(len(spans), i + 2 * window + 1)))
+        if len(keep) >= max_sentences:
+            break
+    if not keep:
+        # no citation located: the opening of the judgment
+        keep = set(range(min(len(spans), max_sentences)))
+    return [spans[i] for i in sorted(keep)[:max_sentences]]
@@ -0,0 +1,228 @@
+# src/pipeline/planner.py
+"""
+CPU plan: how many worker processes, how many torch threads each, tokenizer parallelism and batch
+sizes for this machine.
+
+A plan is produced by calibration (python -m scripts.autotune sample_pdfs/) and saved as a JSON
+profile; the entry points (process_folder, ctx_summarize, the Streamlit app, the API per server
+worker) load it with load_plan() and apply it with apply_plan(); library modules never do. A profile records the topology it was measured on and is ignored (with a warning) on
+a machine that does not match. Without a profile, default_plan() splits the physical cores between
+the workers so they never oversubscribe.
+
+Env:
+  PLAN_PROFILE=...     default ~/.cache/legal_summarizer/cpu_plan.json
+  PLAN_DISABLE=1       ignore any saved profile
+"""
+import os
+import sys
+import json
+import socket
+import logging
+import platform
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE = os.path.join(os.path.expanduser("~"), ".cache", "legal_summarizer", "cpu_plan.json")
+PLAN_VERSION = 1
+
+_torch_lock = threading.Lock()
+_torch_threads = None      # (intra, inter) to apply once torch is imported
+_torch_applied = False
+
+
+def profile_path() -> Path:
+    return Path(os.environ.get("PLAN_PROFILE", DEFAULT_PROFILE))
+
+
+def _cgroup_cpus():
+    # cgroup v2 quota ("max 100000" = unlimited), else v1
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()[:2]
+        return None if quota == "max" else max(1, int(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text())
+        period = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text())
+        return None if quota <= 0 else max(1, quota // period)
+    except (OSError, ValueError):
+        return None
+
+
+def _physical_cores():
+    # distinct (physical id, core id) pairs; None where /proc/cpuinfo has no topology
+    cores, phys = set(), "0"
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                key, _, val = line.partition(":")
+                key = key.strip()
+                if key == "physical id":
+                    phys = val.strip()
+                elif key == "core id":
+                    cores.add((phys, val.strip()))
+    except OSError:
+        return None
+    return len(cores) or None
+
+
+def _cpu_model():
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.partition(":")[2].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def _mem_total_mb():
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+
+def cpu_topology() -> dict:
+    """Usable CPUs as this process sees them (affinity mask and cgroup quota applied)."""
+    try:
+        logical = len(os.sched_getaffinity(0))
+    except AttributeError:
+        logical = os.cpu_count() or 1
+    quota = _cgroup_cpus()
+    usable = min(logical, quota) if quota else logical
+    physical = _physical_cores() or logical
+    # SMT siblings add little for GEMM-bound inference: plan on physical cores within the quota
+    cores = max(1, min(physical, usable))
+    return {"host": socket.gethostname(), "cpu_model": _cpu_model(), "logical_cpus": logical,
+            "cgroup_cpus": quota, "physical_cores": physical, "cores": cores, "mem_mb": _mem_total_mb()}
+
+
+def _same_machine(a: dict, b: dict) -> bool:
+    return all(a.get(k) == b.get(k) for k in ("cpu_model", "logical_cpus", "cgroup_cpus", "physical_cores"))
+
+
+def candidate_splits(cores: int):
+    """(processes, intra-op threads) pairs that use every core exactly once."""
+    return [(p, cores // p) for p in range(1, cores + 1) if cores % p == 0]
+
+
+def default_plan(topo: dict = None) -> dict:
+    """No calibration: one process per 4 cores, the cores split evenly between them."""
+    topo = topo or cpu_topology()
+    cores = topo["cores"]
+    processes = max(1, cores // 4)
+    return make_plan(topo, processes, max(1, cores // processes), source="default")
+
+
+def make_plan(topo, processes, intra, inter=1, sbert_batch_size=64, translate_batch_size=16, source="calibrated",
+              measurements=None) -> dict:
+    return {
+        "version": PLAN_VERSION,
+        "source": source,
+        "topology": topo,
+        "processes": processes,
+        "executor": "prefork" if processes > 1 else "staged",
+        "intra_op_threads": intra,
+        "inter_op_threads": inter,
+        # a single process owns every core (ctx_summarize, the app)
+        "single_process_threads": topo["cores"],
+        # Rust tokenizers spawn their own pool; off whenever workers are forked
+        "tokenizers_parallelism": processes == 1,
+        "sbert_batch_size": sbert_batch_size,
+        "translate_batch_size": translate_batch_size,
+        "measurements": measurements or {},
+    }
+
+
+def save_plan(plan: dict, path=None) -> Path:
+    from src.pipeline.manifest import atomic_write_text
+    path = Path(path) if path else profile_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(path, json.dumps(plan, indent=2))
+    return path
+
+
+def load_plan(path=None, fallback=True):
+    """The saved profile for this machine; default_plan() (or None with fallback=False) otherwise."""
+    if os.environ.get("PLAN_DISABLE", "0").lower() in ("1", "true", "yes", "on"):
+        return default_plan() if fallback else None
+    path = Path(path) if path else profile_path()
+    plan = None
+    if path.exists():
+        try:
+            plan = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning("unreadable CPU plan %s (%s)", path, e)
+        topo = cpu_topology()
+        if plan and (plan.get("version") != PLAN_VERSION or not _same_machine(plan.get("topology", {}), topo)):
+            logger.warning("CPU plan %s was calibrated on another machine/version; re-run scripts.autotune", path)
+            plan = None
+    if plan is None and fallback:
+        plan = default_plan()
+    return plan
+
+
+def apply_plan(plan: dict, single_process: bool = False, processes: int = None):
+    """
+    Thread and batch settings of `plan` for this process. Env vars are set for libraries that read
+    them at import; torch itself is configured by configure_torch() when a model is loaded (so this
+    stays cheap to call from light entry points). Call it from entry points only, before models load.
+    single_process=True: this process is the only worker (use all cores).
+    processes=N: this process is one of N server workers (the cores are split between them).
+    Variables the operator already set (OMP_NUM_THREADS, TOKENIZERS_PARALLELISM, SBERT_BATCH_SIZE,
+    TRANSLATE_BATCH_SIZE, ...) are kept, and torch follows an explicit OMP_NUM_THREADS.
+    """
+    global _torch_threads, _torch_applied
+    if processes:
+        intra = max(1, plan["topology"]["cores"] // processes)
+    else:
+        intra = plan["single_process_threads"] if single_process else plan["intra_op_threads"]
+    inter = plan["inter_op_threads"]
+    kept = [v for v in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "TOKENIZERS_PARALLELISM",
+                        "SBERT_BATCH_SIZE", "TRANSLATE_BATCH_SIZE") if v in os.environ]
+    try:
+        intra = max(1, int(os.environ.get("OMP_NUM_THREADS", intra)))
+    except ValueError:
+        pass
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ.setdefault(var, str(intra))
+    parallel = (plan["tokenizers_parallelism"] or single_process) and not (processes and processes > 1)
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "true" if parallel else "false")
+    os.environ.setdefault("SBERT_BATCH_SIZE", str(plan["sbert_batch_size"]))
+    os.environ.setdefault("TRANSLATE_BATCH_SIZE", str(plan["translate_batch_size"]))
+    translator = sys.modules.get("src.translation.translator")
+    if translator is not None:
+        translator.DEFAULT_BATCH_SIZE = int(os.environ["TRANSLATE_BATCH_SIZE"])
+    with _torch_lock:
+        _torch_threads, _torch_applied = (intra, inter), False
+    if "torch" in sys.modules:
+        configure_torch()
+    logger.info("CPU plan (%s): %s thread(s) intra-op, %s inter-op, tokenizers parallel=%s, sbert batch %s, "
+                "translate batch %s%s", plan.get("source"), intra, inter, os.environ["TOKENIZERS_PARALLELISM"],
+                os.environ["SBERT_BATCH_SIZE"], os.environ["TRANSLATE_BATCH_SIZE"],
+                f" (kept from env: {', '.join(kept)})" if kept else "")
+
+
+def configure_torch():
+    """Apply the active plan's torch thread counts once; called by the model loaders."""
+    global _torch_applied
+    with _torch_lock:
+        if _torch_threads is None or _torch_applied:
+            return
+        import torch
+        intra, inter = _torch_threads
+        torch.set_num_threads(intra)
+        try:
+            torch.set_num_interop_threads(inter)
+        except RuntimeError:
+            # only settable before the first inter-op parallel work in this process
+            pass
+        _torch_applied = True
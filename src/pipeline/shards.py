@@ -0,0 +1,91 @@
+# src/pipeline/shards.py
+"""
+Deterministic partitioning of a PDF intake over N shard processes (same box or several machines
+on a shared filesystem) and merging of their outputs.
+
+A document belongs to shard int(md5, 16) % N, so the assignment depends only on the PDF content:
+every shard can list the same folder independently and the shards never overlap. Each shard writes
+the shared json/ and texts/ folders plus its own index.shard-i-of-N.csv,
+citation_contexts.shard-i-of-N.jsonl and run manifest; merge_shards() combines them into the usual
+index.csv / citation_contexts.jsonl.
+"""
+import csv
+import json
+import logging
+import os
+import re
+from pathlib import Path
+
+from src.pipeline.writers import write_index
+
+logger = logging.getLogger(__name__)
+
+_SHARD_FILE = re.compile(r"^index\.shard-(\d+)-of-(\d+)\.csv$")
+
+
+def parse_shard(spec):
+    """'2/8' -> (2, 8); None/'' -> None."""
+    if not spec:
+        return None
+    i, n = (int(x) for x in spec.split("/"))
+    if n < 1 or not 0 <= i < n:
+        raise ValueError(f"Invalid shard {spec!r}: expected i/N with 0 <= i < N")
+    return i, n
+
+
+def shard_of(md5: str, n: int) -> int:
+    return int(md5, 16) % n
+
+
+def shard_suffix(shard) -> str:
+    """'' for an unsharded run, '.shard-i-of-N' otherwise."""
+    return f".shard-{shard[0]}-of-{shard[1]}" if shard else ""
+
+
+def merge_shards(output_folder, expected=None):
+    """
+    Combine index.shard-*.csv / citation_contexts.shard-*.jsonl into index.csv /
+    citation_contexts.jsonl. A doc_id appearing in several shards (e.g. after re-sharding with a
+    different N) is taken from the first shard file that has it, contexts included.
+    Returns the number of merged documents.
+    """
+    output_folder = Path(output_folder)
+    shard_files = sorted((p for p in output_folder.glob("index.shard-*.csv") if _SHARD_FILE.match(p.name)),
+                         key=lambda p: tuple(int(x) for x in _SHARD_FILE.match(p.name).groups())[::-1])
+    if not shard_files:
+        raise FileNotFoundError(f"No index.shard-*.csv in {output_folder}")
+
+    counts = {int(_SHARD_FILE.match(p.name).group(2)) for p in shard_files}
+    for n in sorted(counts if expected is None else {expected}):
+        missing = [i for i in range(n) if not (output_folder / f"index.shard-{i}-of-{n}.csv").exists()]
+        if missing:
+            logger.warning("shard set of %d is missing shards %s", n, missing)
+
+    rows, owner = {}, {}   # doc_id -> row, doc_id -> shard suffix it was taken from
+    for p in shard_files:
+        suffix = p.name[len("index"):-len(".csv")]
+        with p.open(newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row["doc_id"] not in rows:
+                    rows[row["doc_id"]] = row
+                    owner[row["doc_id"]] = suffix
+    write_index(output_folder / "index.csv", rows.values())
+
+    contexts_path = output_folder / "citation_contexts.jsonl"
+    tmp = contexts_path.with_name(f".{contexts_path.name}.tmp")
+    with tmp.open("w", encoding="utf-8") as out:
+        for suffix in dict.fromkeys(owner.values()):
+            shard_ctx = output_folder / f"citation_contexts{suffix}.jsonl"
+            if not shard_ctx.exists():
+                continue
+            with shard_ctx.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        doc_id = json.loads(line).get("doc_id")
+                    except json.JSONDecodeError:
+                        continue
+                    if owner.get(doc_id) == suffix:
+                        out.write(line if line.endswith("\n") else line + "\n")
+    os.replace(tmp, contexts_path)
+    logger.info("Merged %d documents from %d shard files", len(rows), len(shard_files))
+    return len(rows)
@@ -0,0 +1,333 @@
+# src/pipeline/stages.py
+"""
+Per-document pipeline, split into stages that pass a plain (picklable) state dict along:
+
+  extract          pdfminer/OCR + cleaning + language detection        (CPU, process pool)
+  translate_input  HI→EN of the working text (full or lazy)            (translation model)
+  citations        regex citations + sentence segmentation             (CPU, process pool)
+  embed            SBERT contexts, role/salience (+ extractive summary) (SBERT)
+  generate         citation mini-summaries + mT5 document summary      (mT5)
+  translate_output EN→HI of the summary                                (translation model)
+  write            per-document JSON                                   (I/O)
+
+process_document() runs them back to back; src.pipeline.executor runs them as a staged pipeline.
+Every step records a span (src.pipeline.tracing) in state["trace_spans"]; the result of
+stage_write carries them as "trace_spans" (they are not written to the document JSON).
+
+opts["memory_budget_mb"] (only present when set) turns on the memory budget mode
+(src.pipeline.memory): batch sizes and beams follow the headroom, text no later stage needs is
+dropped from the state, and documents that would not fit are processed in a degraded way; the
+degradations are listed in the document JSON under "degraded".
+"""
+import logging
+import os
+import re
+from pathlib import Path
+
+from src.utils import safe_filename, sentence_spans, split_hindi_sentences, language_map, language_runs
+from src.extractor.text_extractor import extract
+from src.cleaning.cleaner import clean_text, clean_for_json
+from src.translation import translator
+from src.translation.translator import is_devanagari, translate_sentences, translate_mixed
+from src.translation.lazy import lazy_working_text
+from src.citations import citation_extractor
+from src.citations.citation_extractor import find_citations, build_contexts, encode_sentences
+from src.citations.citation_salience import classify_role, compute_salience
+from src.summarizer import summarizer
+from src.summarizer.summarizer import make_citation_aware_input, summarize_text, MAX_TEXT_CHARS
+from src.summarizer.citation_summarizer import summarize_all_citations_in_json
+from src.summarizer.extractive import extractive_summary
+from src.pipeline.docjson import write_doc_json
+from src.pipeline.tracing import span
+from src.pipeline.memory import MemoryBudget, citation_window_spans, is_oom, observe, span_growth_mb, EMB_DIM, MT5_MIN_MB
+
+logger = logging.getLogger(__name__)
+
+MODES = ("generative", "extractive")
+
+
+def model_ids():
+    """The models (and model settings) a run would use, resolved now; part of opts so a model swap reprocesses."""
+    return {
+        "summary": summarizer.DEFAULT_SUMMARY_MODEL,
+        "mt5": os.environ.get("MT5_MODEL_NAME", "google/mt5-base"),
+        "legal_mt5": os.environ.get("LEGAL_MT5_MODEL_PATH", "/content/drive/MyDrive/mt5-legal-best"),
+        "hi_en": translator.HI_TO_EN,
+        "en_hi": translator.EN_TO_HI,
+        "sbert": citation_extractor.SBERT_MODEL,
+        "sbert_max_seq_length": int(os.environ.get("SBERT_MAX_SEQ_LENGTH", 128)),
+    }
+
+
+def new_job(pdf_path, out_dir, ocr=False, ocr_page_limit=None, mode="generative", translate=True,
+            cascade=None, lazy_translation=False, json_format="pretty", trace=None, memory_budget_mb=None):
+    """
+    trace: optional {"profile": [span names] | ["all"], "profile_dir": ...} (cProfile; not part of opts)
+    json_format: encoding of the output JSON; not part of opts (a format switch re-serializes, it does not reprocess)
+    memory_budget_mb: RSS budget of the worker process (memory budget mode)
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode}")
+    job = {
+        "pdf_path": str(pdf_path),
+        "out_dir": str(out_dir),
+        "opts": {
+            "ocr": ocr, "ocr_page_limit": ocr_page_limit, "mode": mode,
+            "translate": translate or mode == "generative",
+            "cascade": cascade, "lazy_translation": lazy_translation,
+            "models": model_ids(),
+        },
+        "json_format": json_format,
+        "trace": trace or {},
+    }
+    if memory_budget_mb:
+        # only when set, so runs without a budget keep their config hash
+        job["opts"]["memory_budget_mb"] = float(memory_budget_mb)
+    return job
+
+
+def _budget(state):
+    mb = state["opts"].get("memory_budget_mb")
+    return MemoryBudget(mb) if mb else None
+
+
+def _degrade(state, what):
+    state.setdefault("degraded", []).append(what)
+    logger.warning("%s: memory budget -> %s", state.get("base"), what)
+
+
+def stage_extract(state):
+    opts = state["opts"]
+    pdf_path = Path(state["pdf_path"])
+    base = safe_filename(pdf_path.stem)
+    texts_dir = Path(state["out_dir"]) / "texts"; texts_dir.mkdir(parents=True, exist_ok=True)
+
+    state["base"] = base
+
+    # extract raw
+    with span(state, "extract", pdf_bytes=pdf_path.stat().st_size) as attrs:
+        res = extract(pdf_path, ocr=opts["ocr"], ocr_page_limit=opts["ocr_page_limit"])
+        attrs.update(chars=len(res.get("text", "")), ocr_used=res.get("ocr_used", False))
+
+    # clean: produce readable text (with paragraphs) and single-line text (for JSON)
+    raw = res.pop("text", "")
+    with span(state, "clean", chars=len(raw)):
+        text_preserve, text_single = clean_text(raw)
+    del raw
+
+    # save text file with preserved paragraphs
+    (texts_dir / f"{base}.txt").write_text(text_preserve, encoding="utf-8")
+
+    state.update({
+        "md5": res.get("md5"),
+        "ocr_used": res.get("ocr_used", False),
+        "lang": "hi" if is_devanagari(text_preserve) else "en",   # simple heuristic
+        "text_single": text_single,
+    })
+    return state
+
+
+def stage_translate_input(state):
+    opts = state["opts"]
+    text_single = state["text_single"]
+    budget = _budget(state)
+    batch_size = budget.translate_batch_size() if budget else None
+    alignment = None
+    working_text = text_single
+    if state["lang"] == "hi" and opts["translate"] and opts["lazy_translation"]:
+        with span(state, "translate_input", chars=len(text_single), lazy=True):
+            working_text, alignment = lazy_working_text(
+                text_single, window=5, top_k=8, central_k=12 if opts["mode"] == "extractive" else 0
+            )
+    elif state["lang"] == "hi" and opts["translate"]:
+        with span(state, "translate_input", chars=len(text_single), lazy=False) as attrs:
+            # split into sentences (danda-aware), then translate only the Hindi segments
+            hindi_sents = split_hindi_sentences(text_single)
+            lmap = language_map(hindi_sents)
+            en_sents = translate_mixed(hindi_sents, lmap, src="hi", tgt="en", batch_size=batch_size)
+            working_text = " ".join(en_sents)
+            alignment = {"hindi_count": len(hindi_sents), "en_count": lmap.count("hi"),
+                         "language_map": language_runs(lmap)}
+            attrs["sentences"] = lmap.count("hi")
+
+    state["language_map"] = alignment.pop("language_map", None) if alignment else None
+    state["alignment"] = alignment
+    state["working_text"] = working_text
+    state["word_count"] = len((text_single if alignment and alignment.get("lazy") else working_text).split())
+    if working_text is not text_single or budget:
+        state.pop("text_single")
+    return state
+
+
+def stage_citations(state):
+    working_text = state["working_text"]
+    with span(state, "citations", chars=len(working_text)) as attrs:
+        state["citations"] = find_citations(working_text)
+        attrs["citations"] = len(state["citations"])
+    with span(state, "segment", chars=len(working_text)) as attrs:
+        state["spans"] = sentence_spans(working_text)
+        attrs["sentences"] = len(state["spans"])
+    return state
+
+
+def stage_embed(state):
+    working_text, spans = state["working_text"], state.pop("spans")
+    budget = _budget(state)
+    batch_size = None
+    if budget:
+        batch_size, max_sentences = budget.embed_plan(len(spans))
+        if max_sentences and max_sentences < len(spans):
+            # the full embedding matrix would not fit: only the sentences around citations
+            spans = citation_window_spans(spans, state["citations"], window=5, max_sentences=max_sentences)
+            _degrade(state, f"embed_citation_windows:{len(spans)}")
+    sentences = [s for (_, _, s) in spans]
+    # segment + encode once, shared by build_contexts and (extractive) the sentence ranker
+    with span(state, "embed", sentences=len(sentences), batch_size=batch_size):
+        try:
+            sent_embs = encode_sentences(sentences, batch_size=batch_size)
+        except Exception as e:
+            if not (budget and is_oom(e)):
+                raise
+            spans = citation_window_spans(spans, state["citations"], window=5, max_sentences=256)
+            sentences = [s for (_, _, s) in spans]
+            _degrade(state, f"embed_citation_windows:{len(spans)}")
+            sent_embs = encode_sentences(sentences, batch_size=1)
+    if budget and sentences:
+        # measured activations per sentence in flight (the result matrix is held twice)
+        matrix = len(sentences) * EMB_DIM * 4 / (1024 * 1024)
+        observe("sbert_sent", (span_growth_mb(state["trace_spans"][-1]) - 2 * matrix) / min(batch_size, len(sentences)))
+    with span(state, "contexts", citations=len(state["citations"])) as attrs:
+        contexts = build_contexts(working_text, state["citations"], window=5, top_k=8, spans=spans,
+                                  sent_embs=sent_embs)
+
+        for c in contexts:
+            combined_text = " ".join(c["context_window"])
+            role = classify_role(combined_text)
+            c["role"] = role
+            c["salience"] = compute_salience(c["supporting_sentences"], role)
+        attrs["contexts"] = len(contexts)
+    state["contexts"] = contexts
+
+    if state["opts"]["mode"] == "extractive":
+        with span(state, "extractive_summary", sentences=len(sentences)):
+            en_summary = extractive_summary(sentences, sent_embs, contexts)
+        state["hi_summary"] = None
+        if state["lang"] == "hi" and not state["opts"]["translate"]:
+            # untranslated Hindi doc: the picked sentences are Hindi already
+            en_summary, state["hi_summary"] = "", en_summary
+        state["en_summary"] = en_summary
+    elif budget:
+        # cheap fallback while the embeddings exist, in case generation does not fit later
+        state["fallback_summary"] = extractive_summary(sentences, sent_embs, contexts)
+    if budget:
+        # later stages only read the prompt prefix of the text
+        state["working_text"] = working_text[:MAX_TEXT_CHARS]
+    return state
+
+
+def stage_generate(state):
+    opts = state["opts"]
+    if opts["mode"] == "extractive":
+        return state
+    contexts = state["contexts"]
+    budget = _budget(state)
+    fallback = state.pop("fallback_summary", None)
+    plan = budget.generate_plan(len(contexts)) if budget else {"num_beams": 5, "citation_summaries": True,
+                                                                "extractive": False}
+    state["hi_summary"] = None
+    if plan["extractive"]:
+        _degrade(state, "extractive_summary")
+        state["en_summary"] = fallback or ""
+        return state
+
+    if plan["citation_summaries"]:
+        with span(state, "citation_summaries", contexts=len(contexts)):
+            state["citation_summaries"] = summarize_all_citations_in_json(
+                {"doc_id": state["base"], "citation_contexts": contexts}, sentences=2, max_out_len=96,
+                translate_to_hi=(state["lang"] == "hi"), cascade=opts["cascade"]
+            )
+    else:
+        _degrade(state, "no_citation_summaries")
+
+    # build citation-aware input and summarize
+    cit_input = make_citation_aware_input(state["working_text"], contexts)
+    if plan["num_beams"] < 5:
+        _degrade(state, f"num_beams:{plan['num_beams']}")
+    with span(state, "generate", chars=len(cit_input), num_beams=plan["num_beams"]):
+        try:
+            state["en_summary"] = summarize_text(cit_input, num_beams=plan["num_beams"])
+        except Exception as e:
+            if not (is_oom(e) and fallback is not None):
+                raise
+            _degrade(state, "extractive_summary")
+            state["en_summary"] = fallback
+            return state
+    if budget:
+        observe("mt5_beam", (span_growth_mb(state["trace_spans"][-1]) - MT5_MIN_MB) / plan["num_beams"])
+    return state
+
+
+def stage_translate_output(state):
+    if state["lang"] == "hi" and state["opts"]["translate"]:
+        # translate summary back (sentence-level)
+        en_summary = state["en_summary"].strip()
+        en_summary_sents = re.split(r'(?<=[.!?])\s+', en_summary) if en_summary else []
+        budget = _budget(state)
+        with span(state, "translate_output", sentences=len(en_summary_sents), chars=len(en_summary)):
+            hi_summary_sents = translate_sentences(en_summary_sents, src="en", tgt="hi",
+                                                   batch_size=budget.translate_batch_size() if budget else None)
+        state["hi_summary"] = " ".join(hi_summary_sents) if hi_summary_sents else None
+    return state
+
+
+def stage_write(state):
+    pdf_path = Path(state["pdf_path"])
+    json_dir = Path(state["out_dir"]) / "json"; json_dir.mkdir(parents=True, exist_ok=True)
+    hi_summary = state.get("hi_summary")
+
+    # prepare json output, ensure no newlines in JSON fields
+    out_json = {
+        "doc_id": state["base"],
+        "filename": pdf_path.name,
+        "filepath": str(pdf_path.resolve()),
+        "md5": state["md5"],
+        "ocr_used": state["ocr_used"],
+        "language": state["lang"],
+        "language_map": state["language_map"],
+        "word_count": state["word_count"],
+        "citations_count": len(state["citations"]),
+        "citations": state["citations"],
+        "citation_contexts": state["contexts"],
+        "summary_en": clean_for_json(state["en_summary"]),
+        "summary_hi": clean_for_json(hi_summary) if hi_summary else None,
+        "alignment": state["alignment"]
+    }
+    if state.get("degraded"):
+        out_json["degraded"] = state["degraded"]
+
+    # atomic: an interrupted run never leaves a truncated JSON that a resumed run would trust
+    with span(state, "write"):
+        write_doc_json(json_dir, state["base"], out_json, state.get("json_format", "pretty"))
+    spans = state.get("trace_spans", [])
+    logger.info("Processed %s (mode=%s, citations=%d, %.1fs)", pdf_path.name, state["opts"]["mode"],
+                len(state["citations"]), sum(s["wall_ms"] for s in spans if s["depth"] == 0) / 1000)
+    return dict(out_json, trace_spans=spans)
+
+
+# (name, function, kind) in pipeline order; kind "process" stages are CPU-bound and picklable
+STAGES = [
+    ("extract", stage_extract, "process"),
+    ("translate_input", stage_translate_input, "thread"),
+    ("citations", stage_citations, "process"),
+    ("embed", stage_embed, "thread"),
+    ("generate", stage_generate, "thread"),
+    ("translate_output", stage_translate_output, "thread"),
+    ("write", stage_write, "thread"),
+]
+
+
+def process_document(job):
+    state = job
+    for _, fn, _ in STAGES:
+        state = fn(state)
+    return state
@@ -0,0 +1,229 @@
+# src/pipeline/tracing.py
+"""
+Per-document, per-stage spans.
+
+Stage functions wrap their steps in `with span(state, "citations") as attrs:`; each span records
+wall time, CPU time (of the running thread), RSS after / peak RSS during the span (process-wide,
+src.pipeline.memory), pid/tid and size attributes (chars, sentences,
+citations, tokens) and is appended to state["trace_spans"], so spans travel with the document
+through thread and process stages alike. Code below a stage that has no state at hand opens
+child("ocr") spans or add(tokens_in=...) counts on the innermost open span of its thread.
+
+job["trace"] = {"profile": ["extract", "generate"] | ["all"], "profile_dir": ...} additionally runs
+cProfile around those spans; one .prof file per span, merged per stage by merge_profiles().
+
+TraceWriter streams finished documents' spans to trace.jsonl and, on close, derives the Chrome
+trace (chrome://tracing, ui.perfetto.dev) and the run summary (per-stage percentiles).
+"""
+import os
+import json
+import math
+import time
+import logging
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+from src.pipeline.memory import peaks, rss_mb
+
+logger = logging.getLogger(__name__)
+
+SLOW_SPAN_SEC = float(os.environ.get("TRACE_SLOW_SPAN_SEC", 60))
+PERCENTILES = (50, 90, 99)
+
+_local = threading.local()
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _profiler_for(state, name):
+    cfg = state.get("trace") or {}
+    stages = cfg.get("profile") or ()
+    if getattr(_local, "profiling", False) or not (name in stages or "all" in stages):
+        return None
+    import cProfile
+    return cProfile.Profile()
+
+
+def _dump_profile(prof, state, rec):
+    out = Path((state.get("trace") or {}).get("profile_dir") or Path(state["out_dir"]) / "profiles") / rec["stage"]
+    out.mkdir(parents=True, exist_ok=True)
+    prof.dump_stats(out / f"{rec['doc']}-{rec['pid']}-{int(rec['ts'] * 1e6)}.prof")
+
+
+@contextmanager
+def span(state, name, **attrs):
+    """Time one step of `state`'s document; yields the attrs dict to fill in."""
+    stack = _stack()
+    rec = {"doc": state.get("base") or Path(state.get("pdf_path", "?")).stem, "stage": name,
+           "depth": len(stack), "ts": time.time(), "pid": os.getpid(), "tid": threading.get_ident(),
+           "attrs": attrs}
+    prof = _profiler_for(state, name)
+    watch = peaks.open()
+    rss0 = rss_mb()
+    stack.append((state, rec))
+    t0, c0 = time.perf_counter(), time.thread_time()
+    if prof is not None:
+        _local.profiling = True
+        prof.enable()
+    try:
+        yield rec["attrs"]
+    except BaseException as e:
+        rec["error"] = repr(e)[:200]
+        raise
+    finally:
+        if prof is not None:
+            prof.disable()
+            _local.profiling = False
+        rec["wall_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+        rec["cpu_ms"] = round((time.thread_time() - c0) * 1000, 3)
+        rec["peak_rss_mb"] = round(peaks.close(watch), 1)
+        rec["rss_mb"] = round(rss_mb(), 1)
+        rec["rss_delta_mb"] = round(rec["rss_mb"] - rss0, 1)
+        stack.pop()
+        if prof is not None:
+            _dump_profile(prof, state, rec)
+        state.setdefault("trace_spans", []).append(rec)
+        if rec["wall_ms"] > SLOW_SPAN_SEC * 1000:
+            logger.warning("slow %s for %s: %.1fs", name, rec["doc"], rec["wall_ms"] / 1000)
+
+
+@contextmanager
+def child(name, **attrs):
+    """Nested span under the innermost open span of this thread (no-op outside of one)."""
+    stack = _stack()
+    if not stack:
+        yield attrs
+        return
+    with span(stack[-1][0], name, **attrs) as a:
+        yield a
+
+
+def add(**counts):
+    """Add numeric counts (e.g. tokens_in=512) to the innermost open span of this thread."""
+    stack = _stack()
+    if stack:
+        attrs = stack[-1][1]["attrs"]
+        for k, v in counts.items():
+            attrs[k] = attrs.get(k, 0) + v
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def _dist(values):
+    values = sorted(values)
+    out = {f"p{p}": round(percentile(values, p), 3) for p in PERCENTILES}
+    out.update({"max": round(values[-1], 3), "mean": round(sum(values) / len(values), 3)})
+    return out
+
+
+def chrome_event(rec):
+    args = {"doc": rec["doc"], "cpu_ms": rec["cpu_ms"], **rec.get("attrs", {})}
+    if "error" in rec:
+        args["error"] = rec["error"]
+    return {"name": rec["stage"], "cat": "pipeline", "ph": "X", "ts": int(rec["ts"] * 1e6),
+            "dur": int(rec["wall_ms"] * 1000), "pid": rec["pid"], "tid": rec["tid"], "args": args}
+
+
+class TraceWriter:
+    """
+    trace.jsonl (one span per line, appended as documents finish), then on close():
+    trace.chrome.json and trace_summary.json (per-stage wall/CPU percentiles, slowest documents).
+    Memory: the per-stage timing lists and one total per document.
+    """
+    def __init__(self, output_folder, suffix=""):
+        folder = Path(output_folder)
+        self.jsonl_path = folder / f"trace{suffix}.jsonl"
+        self.chrome_path = folder / f"trace{suffix}.chrome.json"
+        self.summary_path = folder / f"trace_summary{suffix}.json"
+        self._f = self.jsonl_path.open("w", encoding="utf-8")
+        self._wall, self._cpu, self._peak, self._docs = {}, {}, {}, {}
+        self._counts = {}
+
+    def write_doc(self, spans):
+        for rec in spans or ():
+            self._f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            self._wall.setdefault(rec["stage"], []).append(rec["wall_ms"])
+            self._cpu.setdefault(rec["stage"], []).append(rec["cpu_ms"])
+            self._peak.setdefault(rec["stage"], []).append(rec.get("peak_rss_mb", 0.0))
+            for k, v in rec.get("attrs", {}).items():
+                if k.startswith("tokens") and isinstance(v, (int, float)):
+                    c = self._counts.setdefault(rec["stage"], {})
+                    c[k] = c.get(k, 0) + v
+            if rec["depth"] == 0:
+                self._docs[rec["doc"]] = self._docs.get(rec["doc"], 0.0) + rec["wall_ms"]
+        self._f.flush()
+
+    def summary(self, slowest=5):
+        stages = {}
+        for name, wall in self._wall.items():
+            stages[name] = {"count": len(wall), "total_sec": round(sum(wall) / 1000, 3),
+                            "wall_ms": _dist(wall), "cpu_ms": _dist(self._cpu[name]),
+                            "peak_rss_mb": _dist(self._peak[name])}
+            if name in self._counts:
+                stages[name]["tokens"] = self._counts[name]
+        docs = sorted(self._docs.items(), key=lambda kv: kv[1], reverse=True)
+        return {"documents": len(docs), "stages": stages,
+                "document_wall_ms": _dist([v for _, v in docs]) if docs else {},
+                "slowest_documents": [{"doc": d, "wall_ms": round(v, 3)} for d, v in docs[:slowest]]}
+
+    def close(self):
+        from src.pipeline.manifest import atomic_write_text
+        self._f.close()
+        # Chrome trace from the JSONL, one event at a time
+        tmp = self.chrome_path.with_name(f".{self.chrome_path.name}.tmp")
+        with tmp.open("w", encoding="utf-8") as out, self.jsonl_path.open(encoding="utf-8") as f:
+            out.write('{"displayTimeUnit": "ms", "traceEvents": [\n')
+            first = True
+            for line in f:
+                out.write(("" if first else ",\n") + json.dumps(chrome_event(json.loads(line)), ensure_ascii=False))
+                first = False
+            out.write("\n]}\n")
+        os.replace(tmp, self.chrome_path)
+        summary = self.summary()
+        atomic_write_text(self.summary_path, json.dumps(summary, indent=2))
+        log_summary(summary)
+        return summary
+
+
+def log_summary(summary):
+    logger.info("%-20s %6s %10s %10s %10s %10s %10s %12s", "stage", "n", "total s", "p50 ms", "p90 ms", "p99 ms",
+                "cpu p50", "peak RSS MB")
+    for name, s in summary["stages"].items():
+        w = s["wall_ms"]
+        logger.info("%-20s %6d %10.1f %10.1f %10.1f %10.1f %10.1f %12.1f", name, s["count"], s["total_sec"], w["p50"],
+                    w["p90"], w["p99"], s["cpu_ms"]["p50"], s["peak_rss_mb"]["max"])
+    for d in summary["slowest_documents"]:
+        logger.info("slow document: %s %.1fs", d["doc"], d["wall_ms"] / 1000)
+
+
+def merge_profiles(profile_dir, top=25):
+    """Merge the per-span .prof files of each stage into <stage>.prof + <stage>.txt (top by cumulative)."""
+    import io
+    import pstats
+    profile_dir = Path(profile_dir)
+    merged = {}
+    for stage_dir in sorted(p for p in profile_dir.iterdir() if p.is_dir()) if profile_dir.exists() else ():
+        files = sorted(stage_dir.glob("*.prof"))
+        if not files:
+            continue
+        stats = pstats.Stats(str(files[0]))
+        for f in files[1:]:
+            stats.add(str(f))
+        stats.dump_stats(profile_dir / f"{stage_dir.name}.prof")
+        buf = io.StringIO()
+        pstats.Stats(str(profile_dir / f"{stage_dir.name}.prof"), stream=buf).sort_stats("cumulative").print_stats(top)
+        (profile_dir / f"{stage_dir.name}.txt").write_text(buf.getvalue(), encoding="utf-8")
+        merged[stage_dir.name] = len(files)
+        logger.info("cProfile %s: %d span(s) -> %s", stage_dir.name, len(files), profile_dir / f"{stage_dir.name}.txt")
+    return merged
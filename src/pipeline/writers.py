@@ -0,0 +1,88 @@
+# src/pipeline/writers.py
+"""Corpus-level aggregates written by process_folder: index.csv and citation_contexts.jsonl."""
+import csv
+import json
+import os
+from pathlib import Path
+
+from src.pipeline.docjson import read_doc_json
+
+INDEX_FIELDS = ["doc_id", "filename", "filepath", "md5", "ocr_used", "language", "word_count", "citations_count"]
+
+
+def index_row(r: dict) -> dict:
+    return {
+        "doc_id": r.get("doc_id", ""),
+        "filename": r.get("filename", ""),
+        "filepath": r.get("filepath", ""),
+        "md5": r.get("md5", ""),
+        "ocr_used": r.get("ocr_used", False),
+        "language": r.get("language", ""),
+        "word_count": r.get("word_count", 0),
+        "citations_count": r.get("citations_count", 0),
+    }
+
+
+def write_index(csv_path, rows):
+    csv_path = Path(csv_path)
+    tmp = csv_path.with_name(f".{csv_path.name}.tmp")
+    with tmp.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=INDEX_FIELDS)
+        writer.writeheader()
+        for r in sorted(rows, key=lambda x: x["doc_id"]):
+            writer.writerow(index_row(r))
+    os.replace(tmp, csv_path)
+
+
+class ContextsWriter:
+    """
+    Streams citation_contexts.jsonl: lines of unchanged documents are carried over from the
+    previous file (or read from their JSON if missing there), then each newly processed document
+    is appended as it completes. Only entries finished before the previous file was built
+    (built_at, from the manifest meta) are carried over: an entry recorded by a run that died
+    before swapping its file in is newer than the file, so its lines are re-read from the JSON. Written to a temp file and swapped in on close(), so readers keep
+    seeing the previous complete file until then. Documents no longer in the input drop out.
+    """
+
+    def __init__(self, contexts_path):
+        self.path = Path(contexts_path)
+        self._tmp = self.path.with_name(f".{self.path.name}.tmp")
+        self._f = self._tmp.open("w", encoding="utf-8")
+        self.lines = 0
+
+    def _write(self, line):
+        self._f.write(line if line.endswith("\n") else line + "\n")
+        self.lines += 1
+
+    def carry_over(self, kept_entries, built_at=None):
+        # no built_at (older manifest): the previous file cannot be trusted, read every JSON
+        kept_ids = {e["doc_id"] for e in kept_entries
+                    if built_at is not None and (e.get("finished_at") or 0) <= built_at}
+        seen = set()
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        doc_id = json.loads(line).get("doc_id")
+                    except json.JSONDecodeError:
+                        continue
+                    if doc_id in kept_ids:
+                        self._write(line)
+                        seen.add(doc_id)
+        for e in kept_entries:
+            if e["doc_id"] in seen or not e.get("contexts_count"):
+                continue
+            self.write_doc(e["doc_id"], read_doc_json(e["json_path"]).get("citation_contexts", []))
+
+    def write_doc(self, doc_id, contexts):
+        for c in contexts:
+            self._write(json.dumps({"doc_id": doc_id, **c}, ensure_ascii=False))
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        self._f.close()
+        self._tmp.unlink(missing_ok=True)
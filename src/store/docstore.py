@@ -0,0 +1,212 @@
+# src/store/docstore.py
+"""
+Indexed store for pipeline outputs (SQLite, <output_folder>/docstore.sqlite).
+
+One row per (doc_id, field) with the field value as JSON text, plus a docs table indexed on
+doc_id and md5. Tools read only the fields they need (the large citations/citation_contexts
+values are never parsed unless asked for) and post-processing steps update single fields in
+place instead of rewriting whole files.
+
+The per-document JSON files in <output_folder>/json stay the pipeline's primary output;
+open_docstore() syncs the store from them (only new / modified files are parsed), so the store
+works on top of existing output folders. Every field records its origin: "file" for values
+imported from a JSON file, "store" for values set through update() (gold_citations, the
+summary_*_ctxaware fields of ctx_summarize, ...). Re-importing a modified file replaces its "file"
+fields and keeps the "store" ones, so a reprocessed or re-serialized document does not lose
+post-processing results. When a doc_id has both <doc_id>.json and <doc_id>.json.gz, the most
+recently written one is imported.
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from src.pipeline.docjson import read_doc_json, write_doc_json
+
+logger = logging.getLogger(__name__)
+
+DOCSTORE_NAME = "docstore.sqlite"
+
+
+class DocStore:
+    def __init__(self, path):
+        self.path = str(path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " doc_id TEXT PRIMARY KEY, md5 TEXT, source TEXT, source_mtime REAL, updated_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS docs_md5 ON docs(md5)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fields ("
+            " doc_id TEXT, field TEXT, pos INTEGER, value TEXT, PRIMARY KEY (doc_id, field)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS fields_field ON fields(field, doc_id)")
+        if "origin" not in {r[1] for r in self._conn.execute("PRAGMA table_info(fields)")}:
+            # stores from before origins were tracked: NULL is kept like "store" (unknown, not dropped)
+            self._conn.execute("ALTER TABLE fields ADD COLUMN origin TEXT")
+        self._conn.commit()
+
+    # --- writes -------------------------------------------------------------------------------
+
+    def put(self, doc: dict, source: str = None, source_mtime: float = None):
+        """
+        Insert/replace a document as imported from a file: its previous "file" fields are replaced
+        by `doc`; fields set through update() and not in `doc` are kept.
+        """
+        doc_id = doc["doc_id"]
+        with self._lock:
+            self._conn.execute("DELETE FROM fields WHERE doc_id=? AND origin='file'", (doc_id,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO docs(doc_id, md5, source, source_mtime, updated_at) VALUES (?,?,?,?,?)",
+                (doc_id, doc.get("md5"), source, source_mtime, time.time()),
+            )
+            self._conn.executemany(
+                "INSERT INTO fields(doc_id, field, pos, value, origin) VALUES (?,?,?,?,'file')"
+                " ON CONFLICT(doc_id, field) DO UPDATE SET pos=excluded.pos, value=excluded.value, origin='file'",
+                [(doc_id, k, i, json.dumps(v, ensure_ascii=False)) for i, (k, v) in enumerate(doc.items()) if k != "doc_id"],
+            )
+            # kept fields go after the file's
+            self._conn.execute(
+                "UPDATE fields SET pos = pos + ? WHERE doc_id=? AND (origin IS NULL OR origin != 'file')",
+                (len(doc), doc_id),
+            )
+            self._conn.commit()
+
+    def update(self, doc_id: str, fields: Dict):
+        """Set (or add) individual fields of an existing document in place."""
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM docs WHERE doc_id=?", (doc_id,)).fetchone() is None:
+                raise KeyError(doc_id)
+            self._conn.executemany(
+                # existing fields keep their position, new ones go last
+                "INSERT INTO fields(doc_id, field, pos, value, origin) VALUES"
+                " (?, ?, (SELECT COALESCE(MAX(pos), 0) + 1 FROM fields WHERE doc_id=?), ?, 'store')"
+                " ON CONFLICT(doc_id, field) DO UPDATE SET value=excluded.value, origin='store'",
+                [(doc_id, k, doc_id, json.dumps(v, ensure_ascii=False)) for k, v in fields.items() if k != "doc_id"],
+            )
+            self._conn.execute("UPDATE docs SET updated_at=? WHERE doc_id=?", (time.time(), doc_id))
+            self._conn.commit()
+
+    def delete(self, doc_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM fields WHERE doc_id=?", (doc_id,))
+            self._conn.execute("DELETE FROM docs WHERE doc_id=?", (doc_id,))
+            self._conn.commit()
+
+    # --- reads --------------------------------------------------------------------------------
+
+    def doc_ids(self) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT doc_id FROM docs ORDER BY doc_id")]
+
+    def find_by_md5(self, md5: str) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT doc_id FROM docs WHERE md5=? ORDER BY doc_id", (md5,))]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def get(self, doc_id: str, fields: Optional[Iterable[str]] = None) -> Optional[dict]:
+        """The document (or just `fields` of it), None if unknown. Missing fields are left out."""
+        docs = list(self.iter_docs(fields, doc_ids=[doc_id]))
+        return docs[0] if docs else None
+
+    def iter_docs(self, fields: Optional[Iterable[str]] = None, doc_ids: Optional[Iterable[str]] = None) -> Iterator[dict]:
+        """
+        Yields {"doc_id", <requested fields>} ordered by doc_id; fields=None means every field.
+        Only the requested values are read and parsed.
+        """
+        sql = "SELECT d.doc_id, f.field, f.value FROM docs d LEFT JOIN fields f ON f.doc_id = d.doc_id"
+        params = []
+        if fields is not None:
+            fields = list(fields)
+            sql += f" AND f.field IN ({','.join('?' * len(fields)) or 'NULL'})"
+            params += fields
+        if doc_ids is not None:
+            doc_ids = list(doc_ids)
+            sql += f" WHERE d.doc_id IN ({','.join('?' * len(doc_ids)) or 'NULL'})"
+            params += doc_ids
+        sql += " ORDER BY d.doc_id, f.pos"
+        # own read connection: rows are streamed (WAL lets writers carry on meanwhile)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            doc = None
+            for doc_id, field, value in conn.execute(sql, params):
+                if doc is None or doc["doc_id"] != doc_id:
+                    if doc is not None:
+                        yield doc
+                    doc = {"doc_id": doc_id}
+                if field is not None:
+                    doc[field] = json.loads(value)
+            if doc is not None:
+                yield doc
+        finally:
+            conn.close()
+
+    # --- JSON folder sync ---------------------------------------------------------------------
+
+    def sync_from_json_dir(self, json_dir) -> int:
+        """Import new / modified per-document JSON files; documents whose file is gone are dropped."""
+        json_dir = Path(json_dir)
+        with self._lock:
+            known = {r[0]: (r[1], r[2]) for r in self._conn.execute("SELECT doc_id, source, source_mtime FROM docs")}
+        seen, imported = set(), 0
+        files = {}   # doc_id -> (mtime, path); the most recently written file per doc_id
+        for fp in sorted([*json_dir.glob("*.json"), *json_dir.glob("*.json.gz")]) if json_dir.exists() else []:
+            doc_id = fp.name[:-len(".json.gz")] if fp.name.endswith(".gz") else fp.stem
+            cand = (fp.stat().st_mtime, str(fp))
+            if doc_id in files:
+                logger.warning("docstore: %s has both %s and %s; using the newer one",
+                               doc_id, Path(files[doc_id][1]).name, fp.name)
+                cand = max(cand, files[doc_id])
+            files[doc_id] = cand
+        for doc_id, (mtime, source) in sorted(files.items()):
+            fp = Path(source)
+            seen.add(doc_id)
+            if known.get(doc_id) == (source, mtime):
+                continue
+            doc = read_doc_json(fp)
+            doc["doc_id"] = doc_id   # the file name is the key, as in outputs/json
+            self.put(doc, source=source, source_mtime=mtime)
+            imported += 1
+        for doc_id, (source, _) in known.items():
+            if source and doc_id not in seen:
+                self.delete(doc_id)
+        if imported:
+            logger.info("docstore: imported %d documents from %s", imported, json_dir)
+        return imported
+
+    def export_json_dir(self, out_dir, json_format: str = "pretty"):
+        """Write every document back out as per-document JSON files."""
+        out_dir = Path(out_dir); out_dir.mkdir(parents=True, exist_ok=True)
+        n = 0
+        for doc in self.iter_docs():
+            write_doc_json(out_dir, doc["doc_id"], doc, json_format)
+            n += 1
+        return n
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_docstore(folder, sync: bool = True) -> DocStore:
+    """
+    Store for an output folder. `folder` may be the output folder or its json/ subfolder
+    (what the scripts used to take); the store lives at <output_folder>/docstore.sqlite.
+    """
+    folder = Path(folder)
+    out_dir = folder.parent if folder.name == "json" else folder
+    store = DocStore(out_dir / DOCSTORE_NAME)
+    if sync:
+        store.sync_from_json_dir(out_dir / "json")
+    return store
@@ -0,0 +1,105 @@
+# src/summarizer/cascade.py
+"""
+Salience-based routing for citation mini-summaries.
+
+  role in high_roles, similarity >= high_threshold   -> "large": full model (mt5-base / fine-tuned)
+  role in high_roles, otherwise                      -> "small": small model (mt5-small)
+  other roles, salience < low_threshold              -> "extractive": one-liner lifted from the context window
+  other roles, otherwise                             -> "small"
+
+high_roles (RELIED / OVERRULED) are routed on the role-independent similarity (salience minus the
+role weight of compute_salience): OVERRULED's -0.3 weight would otherwise keep the citations the
+judgment turns on below every salience cut. They are never reduced to a one-liner.
+
+Thresholds / model names come from env (CASCADE_LOW_THRESHOLD, CASCADE_HIGH_THRESHOLD,
+CASCADE_SMALL_MODEL, CASCADE_LARGE_MODEL) or keyword overrides to cascade_config().
+"""
+import os
+import re
+import time
+import logging
+from typing import Dict, Any
+
+from src.citations.citation_salience import salience_base
+
+logger = logging.getLogger(__name__)
+
+TIERS = ("extractive", "small", "large")
+
+
+def cascade_config(**overrides) -> Dict[str, Any]:
+    cfg = {
+        "low_threshold": float(os.environ.get("CASCADE_LOW_THRESHOLD", 0.5)),
+        "high_threshold": float(os.environ.get("CASCADE_HIGH_THRESHOLD", 0.4)),   # similarity, not salience
+        "high_roles": ("RELIED", "OVERRULED"),
+        "small_model": os.environ.get("CASCADE_SMALL_MODEL", "google/mt5-small"),
+        "large_model": os.environ.get("CASCADE_LARGE_MODEL") or None,  # None -> the default summarizer model
+    }
+    cfg.update({k: v for k, v in overrides.items() if v is not None})
+    return cfg
+
+
+def route_citation(entry: Dict[str, Any], cfg: Dict[str, Any]) -> str:
+    sal = float(entry.get("salience", 0.0))
+    role = (entry.get("role") or "MENTIONED").upper()
+    if role in cfg["high_roles"]:
+        return "large" if salience_base(sal, role) >= cfg["high_threshold"] else "small"
+    if sal < cfg["low_threshold"]:
+        return "extractive"
+    return "small"
+
+
+def tier_model(tier: str, cfg: Dict[str, Any]):
+    return cfg["small_model"] if tier == "small" else cfg["large_model"]
+
+
+def extractive_one_liner(entry: Dict[str, Any], max_chars: int = 300) -> str:
+    """The context sentence that mentions the citation (else the best supporting sentence)."""
+    raw = (entry.get("raw") or "").strip()
+    window = entry.get("context_window") or []
+    key = re.sub(r"\s+", " ", raw.lower())[:60]
+
+    line = ""
+    if key:
+        for s in window:
+            if key in re.sub(r"\s+", " ", s.lower()):
+                line = s; break
+    if not line:
+        supports = [s for s in (entry.get("supporting_sentences") or []) if isinstance(s, dict) and s.get("sentence")]
+        if supports:
+            line = max(supports, key=lambda s: s.get("score", 0.0))["sentence"]
+    if not line and window:
+        line = window[len(window) // 2]
+    line = re.sub(r"\s+", " ", line or raw).strip()
+    if len(line) > max_chars:
+        line = line[:max_chars].rsplit(" ", 1)[0] + " …"
+    return line
+
+
+def new_tier_stats() -> Dict[str, Dict[str, float]]:
+    return {t: {"count": 0, "sec": 0.0} for t in TIERS}
+
+
+class timed_tier:
+    """with timed_tier(stats, tier): ...  — adds one call + its latency to the tier counters."""
+    def __init__(self, stats, tier):
+        self.stats, self.tier = stats, tier
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        st = self.stats[self.tier]
+        st["count"] += 1
+        st["sec"] += time.perf_counter() - self.t0
+        return False
+
+
+def log_tier_stats(stats: Dict[str, Dict[str, float]], label: str = "citation cascade"):
+    parts = []
+    for t in TIERS:
+        st = stats[t]
+        avg = st["sec"] / st["count"] if st["count"] else 0.0
+        parts.append(f"{t}={st['count']} ({st['sec']:.2f}s, {avg * 1000:.0f}ms/cit)")
+    logger.info("%s: %s", label, ", ".join(parts))
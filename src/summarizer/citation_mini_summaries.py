@@ -5,6 +5,7 @@ from typing import Dict, Any, List
 
 from src.summarizer.summarizer import summarize_text
 from src.translation.translator import translate_sentences
+from src.summarizer.cascade import route_citation, tier_model, extractive_one_liner, new_tier_stats, timed_tier, log_tier_stats
 
 logger = logging.getLogger(__name__)
 _SENT_SPLIT = re.compile(r'(?<=[.!?])\s+')
@@ -19,7 +20,8 @@ def _steer(entry: Dict[str, Any], body: str) -> str:
     raw = entry.get("raw", "")
     return f"[CITATION] {raw} [ROLE={role}] [SALIENCE={sal:.2f}]\n{body}"
 
-def summarize_citation(entry: Dict[str, Any], translate_to_hi: bool = True) -> Dict[str, Any]:
+def summarize_citation(entry: Dict[str, Any], translate_to_hi: bool = True,
+                       cascade: Dict[str, Any] = None, tier_stats: Dict[str, Any] = None) -> Dict[str, Any]:
     # choose context text
     body = entry.get("context_text")
     if not body:
@@ -38,11 +40,18 @@ def summarize_citation(entry: Dict[str, Any], translate_to_hi: bool = True) -> D
 
     prompt = _steer(entry, body[:2000])
 
-    try:
-        en = summarize_text("summarize: " + prompt, max_len=max_len)
-    except Exception as e:
-        logger.exception("citation summarize failed: %s", e)
-        en = ""
+    tier = route_citation(entry, cascade) if cascade else "large"
+    tier_stats = tier_stats if tier_stats is not None else new_tier_stats()
+    with timed_tier(tier_stats, tier):
+        if tier == "extractive":
+            en = extractive_one_liner(entry)
+        else:
+            try:
+                en = summarize_text("summarize: " + prompt, max_len=max_len,
+                                    model_name=tier_model(tier, cascade) if cascade else None)
+            except Exception as e:
+                logger.exception("citation summarize failed: %s", e)
+                en = ""
 
     en_sents = _split(en)
 
@@ -51,6 +60,7 @@ def summarize_citation(entry: Dict[str, Any], translate_to_hi: bool = True) -> D
         "raw": entry.get("raw"),
         "role": entry.get("role", "MENTIONED"),
         "salience": entry.get("salience", 0.0),
+        "tier": tier,
         "summary_en": en,
         "summary_en_sentences": en_sents
     }
@@ -65,5 +75,11 @@ def summarize_citation(entry: Dict[str, Any], translate_to_hi: bool = True) -> D
 
     return out
 
-def summarize_all_citations(contexts: List[Dict[str, Any]], translate_to_hi: bool = True) -> List[Dict[str, Any]]:
-    return [summarize_citation(c, translate_to_hi=translate_to_hi) for c in (contexts or [])]
+def summarize_all_citations(contexts: List[Dict[str, Any]], translate_to_hi: bool = True,
+                            cascade: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    stats = new_tier_stats()
+    out = [summarize_citation(c, translate_to_hi=translate_to_hi, cascade=cascade, tier_stats=stats)
+           for c in (contexts or [])]
+    if cascade and out:
+        log_tier_stats(stats)
+    return out
@@ -4,10 +4,13 @@ os.environ.setdefault("TRANSFORMERS_NO_TF", "1")
 
 from typing import Dict, List
 from .summarizer import get_mt5
+from .cascade import route_citation, tier_model, extractive_one_liner, new_tier_stats, timed_tier, log_tier_stats
 from src.translation.translator import translate_sentences
+from src.utils import model_lock
+from src.inference.scheduler import scheduler_enabled, scheduled_generate
+from concurrent.futures import ThreadPoolExecutor
 import re
 import logging
-import torch
 
 logger = logging.getLogger(__name__)
 
@@ -22,21 +25,84 @@ def _role_header(entry: Dict) -> str:
     raw = entry.get("raw", "")
     return f"[CITATION] {raw}  [ROLE={role}]  [SALIENCE={sal:.2f}]"
 
-def summarize_context_with_mt5(context_text: str, prefix: str = "summarize:", max_out_len: int = 80) -> str:
-    tokenizer, model = get_mt5()
+def encode_context_for_mt5(context_text: str, prefix: str = "summarize:", model_name: str = None) -> Dict:
+    """
+    Tokenize + run the encoder once. The returned state is fed to generate_from_encoded(),
+    which can be called again (e.g. a longer retry) without re-encoding the 1024-token input.
+    """
+    import torch
+    tokenizer, model = get_mt5(model_name)
     inp = prefix + " " + _clean_text_for_model(context_text)
-    inputs = tokenizer(inp, return_tensors="pt", truncation=True, max_length=1024)
-    if next(model.parameters()).is_cuda:
-        inputs = {k: v.to("cuda") for k, v in inputs.items()}
-    out = model.generate(**inputs, max_length=max_out_len, num_beams=4, early_stopping=True)
-    summary = tokenizer.decode(out[0], skip_special_tokens=True)
-    return summary.strip()
+    with model_lock(model), torch.no_grad():
+        inputs = tokenizer(inp, return_tensors="pt", truncation=True, max_length=1024)
+        if next(model.parameters()).is_cuda:
+            inputs = {k: v.to("cuda") for k, v in inputs.items()}
+        enc = model.get_encoder()(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"])
+    return {
+        "tokenizer": tokenizer,
+        "model": model,
+        "attention_mask": inputs["attention_mask"],
+        "encoder_hidden": enc.last_hidden_state,
+        "output_ids": None,   # best beam of the last pass
+    }
+
+def _continuable_prefix(state: Dict):
+    """Decoded ids of the previous pass if it stopped on the length cap (no EOS), else None."""
+    ids = state.get("output_ids")
+    if ids is None:
+        return None
+    model = state["model"]
+    eos, pad = model.config.eos_token_id, model.config.pad_token_id
+    ids = ids.tolist()
+    while len(ids) > 1 and ids[-1] == pad:
+        ids.pop()
+    if len(ids) <= 1 or ids[-1] == eos:
+        return None
+    import torch
+    return torch.tensor([ids], device=state["encoder_hidden"].device)
+
+def generate_from_encoded(state: Dict, max_out_len: int = 80, continue_decoding: bool = False) -> str:
+    """
+    Beam search over cached encoder states. continue_decoding=True resumes from the previous
+    pass's output when it was cut by max_length, so only the extra steps are decoded.
+    """
+    import torch
+    from transformers.modeling_outputs import BaseModelOutput
+
+    tokenizer, model = state["tokenizer"], state["model"]
+    kwargs = {}
+    prefix_ids = _continuable_prefix(state) if continue_decoding else None
+    if prefix_ids is not None:
+        kwargs["decoder_input_ids"] = prefix_ids
+    with model_lock(model), torch.no_grad():
+        # fresh BaseModelOutput each call: generate() expands it per beam in place
+        out = model.generate(
+            encoder_outputs=BaseModelOutput(last_hidden_state=state["encoder_hidden"]),
+            attention_mask=state["attention_mask"],
+            max_length=max_out_len, num_beams=4, early_stopping=True, **kwargs
+        )
+        state["output_ids"] = out[0]
+        return tokenizer.decode(out[0], skip_special_tokens=True).strip()
+
+def summarize_context_with_mt5(context_text: str, prefix: str = "summarize:", max_out_len: int = 80,
+                               model_name: str = None) -> str:
+    if scheduler_enabled():
+        tokenizer, model = get_mt5(model_name)
+        inp = prefix + " " + _clean_text_for_model(context_text)
+        return scheduled_generate(tokenizer, model, inp, max_input_len=1024,
+                                  max_length=max_out_len, num_beams=4, early_stopping=True).strip()
+    state = encode_context_for_mt5(context_text, prefix=prefix, model_name=model_name)
+    return generate_from_encoded(state, max_out_len=max_out_len)
 
 def split_into_sentences(text: str) -> List[str]:
     return re.split(r'(?<=[.!?])\s+', text.strip()) if text and text.strip() else []
 
 def summarize_citation_entry(context_entry: Dict, sentences: int = 2, max_out_len: int = 80,
-                             translate_to_hi: bool = True) -> Dict:
+                             translate_to_hi: bool = True, cascade: Dict = None, tier_stats: Dict = None) -> Dict:
+    """
+    cascade: optional config from cascade.cascade_config(); routes the entry to an
+    extractive one-liner, the small model or the large model by salience/role.
+    """
     # Build context text
     ctxt = context_entry.get("context_text")
     if not ctxt:
@@ -54,20 +120,42 @@ def summarize_citation_entry(context_entry: Dict, sentences: int = 2, max_out_le
     header = _role_header(context_entry)
     steer_text = f"{header}\n{ctxt}"
 
-    try:
-        summary_en = summarize_context_with_mt5(steer_text, prefix="summarize:", max_out_len=max_out_len)
-    except Exception as e:
-        logger.exception("mT5 summarization failed for citation %s: %s", context_entry.get("citation"), e)
-        summary_en = ""
+    tier = route_citation(context_entry, cascade) if cascade else "large"
+    model_name = tier_model(tier, cascade) if cascade else None
+    tier_stats = tier_stats if tier_stats is not None else new_tier_stats()
+
+    with timed_tier(tier_stats, tier):
+        if tier == "extractive":
+            summary_en = extractive_one_liner(context_entry)
+            sents = [summary_en] if summary_en else []
+        else:
+            # scheduled: both passes go through the cross-document batcher (no encoder-state reuse)
+            batched = scheduler_enabled()
+            state = None
+            try:
+                if batched:
+                    summary_en = summarize_context_with_mt5(steer_text, prefix="summarize:", max_out_len=max_out_len,
+                                                            model_name=model_name)
+                else:
+                    state = encode_context_for_mt5(steer_text, prefix="summarize:", model_name=model_name)
+                    summary_en = generate_from_encoded(state, max_out_len=max_out_len)
+            except Exception as e:
+                logger.exception("mT5 summarization failed for citation %s: %s", context_entry.get("citation"), e)
+                summary_en = ""
 
-    sents = split_into_sentences(summary_en)
-    if len(sents) < sentences and summary_en and len(summary_en.split()) < (sentences * 10):
-        # second pass with a bit more budget
-        try:
-            summary_en = summarize_context_with_mt5(steer_text, prefix="summarize:", max_out_len=max_out_len * 2)
             sents = split_into_sentences(summary_en)
-        except Exception:
-            pass
+            if (batched or state is not None) and len(sents) < sentences and summary_en \
+                    and len(summary_en.split()) < (sentences * 10):
+                # second pass with a bit more budget — reuses the encoder states (and the prefix if it was cut)
+                try:
+                    if batched:
+                        summary_en = summarize_context_with_mt5(steer_text, prefix="summarize:",
+                                                                max_out_len=max_out_len * 2, model_name=model_name)
+                    else:
+                        summary_en = generate_from_encoded(state, max_out_len=max_out_len * 2, continue_decoding=True)
+                    sents = split_into_sentences(summary_en)
+                except Exception:
+                    pass
 
     sents = sents[:sentences] if sents else ([summary_en] if summary_en else [])
     summary_en_joined = " ".join(sents).strip()
@@ -77,6 +165,7 @@ def summarize_citation_entry(context_entry: Dict, sentences: int = 2, max_out_le
         "raw": context_entry.get("raw"),
         "role": context_entry.get("role", "MENTIONED"),
         "salience": context_entry.get("salience", 0.0),
+        "tier": tier,
         "summary_en": summary_en_joined,
         "summary_en_sentences": sents
     }
@@ -94,9 +183,20 @@ def summarize_citation_entry(context_entry: Dict, sentences: int = 2, max_out_le
     return result
 
 def summarize_all_citations_in_json(json_obj: Dict, sentences: int = 2, max_out_len: int = 80,
-                                    translate_to_hi: bool = True) -> List[Dict]:
+                                    translate_to_hi: bool = True, cascade: Dict = None) -> List[Dict]:
     entries = json_obj.get("citation_contexts", [])
-    return [
-        summarize_citation_entry(e, sentences=sentences, max_out_len=max_out_len, translate_to_hi=translate_to_hi)
-        for e in entries
-    ]
+    stats = new_tier_stats()
+
+    def one(e):
+        return summarize_citation_entry(e, sentences=sentences, max_out_len=max_out_len,
+                                        translate_to_hi=translate_to_hi, cascade=cascade, tier_stats=stats)
+
+    if scheduler_enabled() and len(entries) > 1:
+        # submit all citations at once so the scheduler can batch them
+        with ThreadPoolExecutor(max_workers=min(8, len(entries))) as ex:
+            out = list(ex.map(one, entries))
+    else:
+        out = [one(e) for e in entries]
+    if cascade and entries:
+        log_tier_stats(stats, label=f"citation cascade [{json_obj.get('doc_id', '?')}]")
+    return out
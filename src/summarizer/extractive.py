@@ -0,0 +1,68 @@
+# src/summarizer/extractive.py
+import re
+from typing import Dict, Any, List
+
+from src.citations.citation_extractor import encode_sentences
+
+_NOISE_RE = re.compile(r"Indian Kanoon|http[s]?://|^\W*$", flags=re.IGNORECASE)
+
+
+def score_sentences(sentences: List[str], sent_embs, contexts: List[Dict[str, Any]],
+                    salience_weight: float = 0.35, lead_weight: float = 0.1) -> List[float]:
+    """
+    Centrality (cosine to the document centroid) + salience of the citations a sentence supports
+    + a small lead/holding position prior.
+    """
+    n = len(sentences)
+    if not n or sent_embs is None:
+        return [0.0] * n
+
+    from sentence_transformers import util
+    centroid = sent_embs.mean(dim=0, keepdim=True)
+    scores = util.cos_sim(sent_embs, centroid).squeeze(-1).tolist()
+    if isinstance(scores, float):
+        scores = [scores]
+
+    # sentences that anchor / support salient citations get a boost
+    for c in contexts or []:
+        sal = max(0.0, float(c.get("salience", 0.0)))
+        idx = c.get("sent_index")
+        if isinstance(idx, int) and 0 <= idx < n:
+            scores[idx] += salience_weight * sal
+        for s in (c.get("supporting_sentences") or [])[:2]:
+            j = s.get("idx") if isinstance(s, dict) else None
+            if isinstance(j, int) and 0 <= j < n:
+                scores[j] += 0.5 * salience_weight * sal * float(s.get("score", 0.0))
+
+    # judgments open with the facts and close with the order
+    lead = max(1, n // 20)
+    for i in range(n):
+        if i < lead or i >= n - lead:
+            scores[i] += lead_weight
+
+    for i, s in enumerate(sentences):
+        if len(s) < 40 or _NOISE_RE.search(s):
+            scores[i] = float("-inf")
+    return scores
+
+
+def extractive_summary(sentences: List[str], sent_embs=None, contexts: List[Dict[str, Any]] = None,
+                       max_sentences: int = 6, max_chars: int = 1500) -> str:
+    """Pick the top-ranked sentences and return them in document order (no neural generation)."""
+    if not sentences:
+        return ""
+    if sent_embs is None:
+        sent_embs = encode_sentences(sentences)
+    scores = score_sentences(sentences, sent_embs, contexts or [])
+
+    ranked = sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)
+    picked, total = [], 0
+    for i in ranked:
+        if scores[i] == float("-inf") or len(picked) >= max_sentences:
+            break
+        if total + len(sentences[i]) > max_chars and picked:
+            continue
+        picked.append(i)
+        total += len(sentences[i])
+
+    return " ".join(sentences[i].strip() for i in sorted(picked))
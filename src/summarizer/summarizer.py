@@ -2,30 +2,37 @@
 import os
 os.environ.setdefault("TRANSFORMERS_NO_TF", "1")
 import re
-
-import torch
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-
-_MT5_TOKENIZER = None
-_MT5_MODEL = None
-_model = None
-_tok = None
-
-def _load():
-    global _model, _tok
-
-    if _model is None:
-        model_path = "google/mt5-base"  # ✅ Base model from Hugging Face
-
-        print(f"🔹 Loading base model: {model_path}")
-        _tok = AutoTokenizer.from_pretrained(model_path)
-        _model = AutoModelForSeq2SeqLM.from_pretrained(model_path)
-
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        _model = _model.to(device)
-        print(f"✅ Model loaded successfully on {device}")
-
-    return _model, _tok
+import threading
+
+from src.utils import model_lock
+from src.inference.scheduler import scheduler_enabled, scheduled_generate
+from src.inference.weights import load_hf_model
+from src.pipeline.tracing import add
+
+DEFAULT_SUMMARY_MODEL = os.environ.get("SUMMARY_MODEL", "google/mt5-base")  # ✅ Base model from Hugging Face
+# chars of the document text that go into the citation-aware prompt
+MAX_TEXT_CHARS = 3800
+
+_MT5_CACHE = {}   # model name/path -> (tokenizer, model); one copy per name for summarize_text and get_mt5
+_load_lock = threading.Lock()
+
+def _load_cached(name: str):
+    with _load_lock:
+        if name not in _MT5_CACHE:
+            print(f"🔹 Loading base model: {name}")
+            import torch
+            tok, model = load_hf_model(name)   # memory-mapped with MODEL_MMAP=1
+
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            model = model.to(device)
+            _MT5_CACHE[name] = (tok, model)
+            print(f"✅ Model loaded successfully on {device}")
+    return _MT5_CACHE[name]
+
+def _load(model_path: str = None):
+    """(model, tokenizer) for summarize_text."""
+    tok, model = _load_cached(model_path or DEFAULT_SUMMARY_MODEL)
+    return model, tok
 
 import re
 
@@ -44,8 +51,8 @@ def fix_ocr_spacing(text: str) -> str:
     return text.strip()
 
 
-def summarize_text(text, max_len=260):
-    model, tok = _load()                   # Load ONCE
+def summarize_text(text, max_len=260, model_name=None, num_beams=5):
+    model, tok = _load(model_name)         # Load ONCE per model
 
     # Force summarization task
     text = fix_ocr_spacing(text)
@@ -54,44 +61,60 @@ def summarize_text(text, max_len=260):
     # ✅ Use the same prompt style used during fine-tuning
     text = "summarize: " + text
 
+    gen_kwargs = dict(
+        max_new_tokens=max_len,
+        num_beams=num_beams,
+        no_repeat_ngram_size=3,
+        repetition_penalty=1.15,
+        length_penalty=1.1,
+        early_stopping=True
+    )
+    if scheduler_enabled():
+        # batched with concurrent requests from other documents
+        return scheduled_generate(tok, model, text, max_input_len=512, **gen_kwargs).strip()
+
     # Tokenize directly on same device
+    import torch
     device = model.device
-    inputs = tok(text, return_tensors="pt", truncation=True, max_length=512).to(device)
-
-    with torch.no_grad():
-        output = model.generate(
-            **inputs,
-            max_new_tokens=max_len,
-            num_beams=5,
-            no_repeat_ngram_size=3,
-            repetition_penalty=1.15,
-            length_penalty=1.1,
-            early_stopping=True
-        )
+    with model_lock(model), torch.no_grad():
+        inputs = tok(text, return_tensors="pt", truncation=True, max_length=512).to(device)
+        output = model.generate(**inputs, **gen_kwargs)
+    add(tokens_in=int(inputs["input_ids"].shape[1]), tokens_out=int(output.shape[1]))
 
     return tok.decode(output[0], skip_special_tokens=True).strip()
 
 def get_mt5(model_name: str = None):
     """
     Returns (tokenizer, model). Set env MT5_MODEL_NAME to your fine-tuned path.
-    Defaults to google/mt5-base.
+    Defaults to google/mt5-base. Each model name is loaded once and cached.
     """
-    global _MT5_TOKENIZER, _MT5_MODEL
-    if _MT5_MODEL is None or _MT5_TOKENIZER is None:
-        name = model_name or os.environ.get("MT5_MODEL_NAME", "google/mt5-base")
-        _MT5_TOKENIZER = AutoTokenizer.from_pretrained(name)
-        _MT5_MODEL = AutoModelForSeq2SeqLM.from_pretrained(name)
-        if torch.cuda.is_available():
-            _MT5_MODEL = _MT5_MODEL.to("cuda")
-    return _MT5_TOKENIZER, _MT5_MODEL
+    return _load_cached(model_name or os.environ.get("MT5_MODEL_NAME", "google/mt5-base"))
 
 
-def make_citation_aware_input(text: str, contexts,salience_threshold: float = 0.55, max_contexts: int = 12) -> str:
+def _fit_tokens(text: str, tokenizer, max_tokens: int) -> str:
+    # longest prefix of text that is at most max_tokens tokens
+    if max_tokens <= 0 or not text:
+        return ""
+    # ~4 chars per token for these texts; 8x leaves room for short tokens
+    enc = tokenizer(text[:max_tokens * 8], add_special_tokens=False, truncation=True, max_length=max_tokens,
+                    return_offsets_mapping=getattr(tokenizer, "is_fast", False))
+    if "offset_mapping" in enc:
+        return text[:enc["offset_mapping"][-1][1]] if enc["offset_mapping"] else ""
+    return tokenizer.decode(enc["input_ids"], skip_special_tokens=True)
+
+
+def make_citation_aware_input(text: str, contexts,salience_threshold: float = 0.55, max_contexts: int = 12,
+                              tokenizer=None, max_tokens: int = None, prefix: str = "summarize: ") -> str:
     """
     Improved prompt: do NOT filter citations away.
     We include the most informative citation windows instead of salience-cutoff.
+
+    Token-aware with tokenizer + max_tokens: the citation evidence and the task are kept whole and
+    the facts get the tokens that are left (prefix + prompt + EOS fit in max_tokens), instead of a
+    fixed char cut that lets truncation at encode time drop the evidence.
     """
-    text = (text or "")[:3800]  # allow slightly more context
+    token_aware = tokenizer is not None and max_tokens
+    text = (text or "") if token_aware else (text or "")[:MAX_TEXT_CHARS]  # allow slightly more context
 
     # Sort by salience, but DO NOT drop low-salience citations anymore.
     key = sorted(contexts or [], key=lambda c: c.get("salience", 0.0), reverse=True)[:max_contexts]
@@ -110,11 +133,15 @@ def make_citation_aware_input(text: str, contexts,salience_threshold: float = 0.
             if sent and len(sent) > 5:
                 lines.append(f" - {sent.strip()}")
 
-    return (
-        "### FACTS ###\n" + text +
+    head = "### FACTS ###\n"
+    tail = (
         "\n\n### KEY CITATION EVIDENCE ###\n" + ("\n".join(lines) if lines else "None") +
         "\n\n### TASK ###\n"
         "Write a concise legal summary (4-8 sentences). "
         "Explicitly mention key precedents when they influenced reasoning. "
         "Summarize holdings, not procedural details."
     )
+    if token_aware:
+        used = len(tokenizer(prefix + head + tail, add_special_tokens=True)["input_ids"])
+        text = _fit_tokens(text, tokenizer, max_tokens - used)
+    return head + text + tail
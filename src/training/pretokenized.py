@@ -0,0 +1,103 @@
+# src/training/pretokenized.py
+"""
+Sharded, pre-tokenized training data.
+
+Layout of one split (e.g. train/):
+  shard-00000.input_ids.npy      int32, every item's input ids concatenated
+  shard-00000.input_offsets.npy  int64, n+1 offsets into input_ids
+  shard-00000.labels.npy         int32, target ids concatenated
+  shard-00000.label_offsets.npy  int64, n+1 offsets into labels
+  ...
+  meta.json                      tokenizer, max lengths, shard sizes
+
+ShardWriter streams items into shards of `shard_size` (only the current shard is in memory);
+PretokenizedDataset memory-maps every shard (np.load(mmap_mode="r")), so opening a corpus of any
+size is cheap and items are read from the page cache on access. It is a map-style dataset
+(len / getitem) that a torch DataLoader can use directly.
+"""
+import json
+import bisect
+from pathlib import Path
+
+META = "meta.json"
+
+
+def shard_name(i: int) -> str:
+    return f"shard-{i:05d}"
+
+
+class ShardWriter:
+    def __init__(self, out_dir, shard_size: int = 10000, meta: dict = None):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        for old in self.out_dir.glob("shard-*.npy"):
+            old.unlink()
+        self.shard_size = shard_size
+        self.meta = dict(meta or {})
+        self.shards = []
+        self._inputs, self._labels = [], []
+
+    def add(self, input_ids, labels):
+        self._inputs.append(input_ids)
+        self._labels.append(labels)
+        if len(self._inputs) >= self.shard_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._inputs:
+            return
+        import numpy as np
+        name = shard_name(len(self.shards))
+        for kind, offs, seqs in (("input_ids", "input_offsets", self._inputs), ("labels", "label_offsets", self._labels)):
+            lengths = np.fromiter((len(s) for s in seqs), dtype=np.int64, count=len(seqs))
+            offsets = np.zeros(len(seqs) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=offsets[1:])
+            flat = np.fromiter((t for s in seqs for t in s), dtype=np.int32, count=int(offsets[-1]))
+            np.save(self.out_dir / f"{name}.{kind}.npy", flat)
+            np.save(self.out_dir / f"{name}.{offs}.npy", offsets)
+        self.shards.append({"name": name, "items": len(self._inputs)})
+        self._inputs, self._labels = [], []
+
+    def close(self) -> dict:
+        from src.pipeline.manifest import atomic_write_text
+        self._flush()
+        self.meta.update({"shards": self.shards, "items": sum(s["items"] for s in self.shards)})
+        atomic_write_text(self.out_dir / META, json.dumps(self.meta, indent=2))
+        return self.meta
+
+
+class PretokenizedDataset:
+    """Map-style dataset over a split directory: ds[i] -> {"input_ids": int32 array, "labels": int32 array}."""
+
+    def __init__(self, split_dir):
+        import numpy as np
+        self.split_dir = Path(split_dir)
+        self.meta = json.loads((self.split_dir / META).read_text(encoding="utf-8"))
+        self._shards = []
+        self._starts = []
+        n = 0
+        for s in self.meta["shards"]:
+            arrs = {k: np.load(self.split_dir / f"{s['name']}.{k}.npy", mmap_mode="r")
+                    for k in ("input_ids", "input_offsets", "labels", "label_offsets")}
+            self._shards.append(arrs)
+            self._starts.append(n)
+            n += s["items"]
+        self._len = n
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        k = bisect.bisect_right(self._starts, i) - 1
+        a, j = self._shards[k], i - self._starts[k]
+        return {"input_ids": a["input_ids"][a["input_offsets"][j]:a["input_offsets"][j + 1]],
+                "labels": a["labels"][a["label_offsets"][j]:a["label_offsets"][j + 1]]}
+
+    def lengths(self):
+        """Input lengths of every item (for length-bucketed batching), without touching the ids."""
+        import numpy as np
+        return np.concatenate([np.diff(a["input_offsets"]) for a in self._shards]) if self._shards else np.zeros(0)
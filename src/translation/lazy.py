@@ -0,0 +1,94 @@
+# src/translation/lazy.py
+"""
+Selective (lazy) HI→EN translation for long Hindi judgments.
+
+Instead of translating every sentence before anything else, only the sentences that can
+reach the rest of the pipeline are translated:
+  - citation anchors (Latin reporter citations, or Devanagari cues such as "बनाम") and their context windows,
+  - supporting-sentence candidates, picked with the multilingual SBERT on the *source* sentences,
+  - the lead of the document (the summarizer only sees the first ~3800 chars),
+  - optionally the most central sentences (extractive summary candidates).
+The selected sentences are translated in one batch (through the translation memory); sentences
+that are already English segments pass through untranslated.
+"""
+import re
+from typing import Dict, List, Tuple
+
+from src.citations.citation_extractor import CITATION_REGEX, encode_sentences
+from src.translation.translator import translate_mixed
+from src.utils import language_map, language_runs, split_hindi_sentences
+
+HINDI_CITATION_CUES = re.compile(r"बनाम|विरुद्ध|एस\.?\s?सी\.?\s?सी|ए\.?\s?आई\.?\s?आर")
+
+
+class LazyTranslator:
+    """Translates source sentences by index on demand; each index is translated at most once."""
+    def __init__(self, sentences: List[str], src: str = "hi", tgt: str = "en", lang_map: List[str] = None):
+        self.sentences = sentences
+        self.src, self.tgt = src, tgt
+        self.lang_map = lang_map or language_map(sentences)
+        self._cache: Dict[int, str] = {}
+
+    def translate(self, indices) -> Dict[int, str]:
+        n = len(self.sentences)
+        todo = sorted(i for i in set(indices) if 0 <= i < n and i not in self._cache)
+        if todo:
+            out = translate_mixed([self.sentences[i] for i in todo], [self.lang_map[i] for i in todo],
+                                  src=self.src, tgt=self.tgt)
+            self._cache.update(zip(todo, out))
+        return {i: self._cache[i] for i in indices if i in self._cache}
+
+    @property
+    def translated_count(self) -> int:
+        """Sentences actually sent to HI→EN (English segments are not counted)."""
+        return sum(1 for i in self._cache if self.lang_map[i] == self.src[:2])
+
+
+def find_anchor_sentences(sentences: List[str]) -> List[int]:
+    return [i for i, s in enumerate(sentences) if CITATION_REGEX.search(s) or HINDI_CITATION_CUES.search(s)]
+
+
+def select_sentences(sentences: List[str], window: int = 5, top_k: int = 8,
+                     lead_chars: int = 3800, central_k: int = 0) -> List[int]:
+    """Sorted indices of the source sentences that need an English translation."""
+    n = len(sentences)
+    needed = set()
+
+    total = 0
+    for i, s in enumerate(sentences):
+        if total >= lead_chars:
+            break
+        needed.add(i); total += len(s)
+
+    anchors = find_anchor_sentences(sentences)
+    for a in anchors:
+        needed.update(range(max(0, a - window), min(n, a + window + 1)))
+
+    if n and (anchors or central_k):
+        from sentence_transformers import util
+        embs = encode_sentences(sentences)   # multilingual SBERT: no translation needed
+        if anchors:
+            hits = util.semantic_search(embs[anchors], embs, top_k=top_k + 3)
+            for per_anchor in hits:
+                needed.update(h["corpus_id"] for h in per_anchor)
+        if central_k:
+            centroid = embs.mean(dim=0, keepdim=True)
+            needed.update(h["corpus_id"] for h in util.semantic_search(centroid, embs, top_k=central_k)[0])
+
+    return sorted(needed)
+
+
+def lazy_working_text(text: str, window: int = 5, top_k: int = 8, lead_chars: int = 3800,
+                      central_k: int = 0) -> Tuple[str, Dict]:
+    """
+    Returns (sparse English working text, alignment info).
+    The working text holds only the selected sentences, in document order.
+    """
+    sents = split_hindi_sentences(text)
+    lt = LazyTranslator(sents)
+    idx = select_sentences(sents, window=window, top_k=top_k, lead_chars=lead_chars, central_k=central_k)
+    en = lt.translate(idx)
+    working_text = " ".join(en[i] for i in idx if en.get(i))
+    alignment = {"hindi_count": len(sents), "en_count": lt.translated_count, "lazy": True,
+                 "language_map": language_runs(lt.lang_map)}
+    return working_text, alignment
@@ -0,0 +1,136 @@
+# src/translation/memory.py
+"""
+Sentence-level translation memory (SQLite on disk).
+
+Keyed by normalized source text + language pair + model name, consulted by
+translate_sentences() before any model call. Size is bounded: once the table grows past
+max_entries the least recently used rows are evicted.
+
+Env:
+  TRANSLATION_MEMORY=0                    disable
+  TRANSLATION_MEMORY_PATH=...sqlite       location (default ~/.cache/legal_summarizer/translation_memory.sqlite)
+  TRANSLATION_MEMORY_MAX_ENTRIES=200000
+"""
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TM_PATH = os.path.join(os.path.expanduser("~"), ".cache", "legal_summarizer", "translation_memory.sqlite")
+DEFAULT_MAX_ENTRIES = 200000
+
+
+def normalize_source(text: str) -> str:
+    text = unicodedata.normalize("NFC", text or "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class TranslationMemory:
+    def __init__(self, path: str = DEFAULT_TM_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = str(path)
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tm ("
+            " key TEXT PRIMARY KEY, pair TEXT, model TEXT, src TEXT, tgt TEXT,"
+            " last_used REAL, uses INTEGER DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tm_last_used ON tm(last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.pid = os.getpid()
+
+    @staticmethod
+    def make_key(src_text: str, pair: str, model: str) -> str:
+        return hashlib.sha1(f"{model}\t{pair}\t{normalize_source(src_text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str], pair: str, model: str) -> Dict[str, str]:
+        """Returns {normalize_source(text): translation} for the texts already in memory."""
+        keys = {self.make_key(t, pair, model): normalize_source(t) for t in texts}
+        found, hit_keys = {}, []
+        if not keys:
+            return found
+        with self._lock:
+            klist = list(keys)
+            for i in range(0, len(klist), 500):   # stay under SQLite's variable limit
+                chunk = klist[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, tgt FROM tm WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for k, tgt in rows:
+                    found[keys[k]] = tgt
+                    hit_keys.append(k)
+            now = time.time()
+            self._conn.executemany("UPDATE tm SET last_used=?, uses=uses+1 WHERE key=?", [(now, k) for k in hit_keys])
+            self._conn.commit()
+            self.hits += len(hit_keys)
+            self.misses += len(keys) - len(hit_keys)
+        return found
+
+    def put_many(self, items: List[Tuple[str, str]], pair: str, model: str):
+        if not items:
+            return
+        now = time.time()
+        rows = [(self.make_key(s, pair, model), pair, model, normalize_source(s), t, now)
+                for s, t in items if s and s.strip()]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tm(key, pair, model, src, tgt, last_used) VALUES (?,?,?,?,?,?)", rows
+            )
+            self._count += self._conn.total_changes - before
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # drop ~10% below the bound so we don't evict on every insert
+        excess = self._count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM tm WHERE key IN (SELECT key FROM tm ORDER BY last_used ASC LIMIT ?)", (excess,)
+        )
+        self._count = self._conn.execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": self._count,
+        }
+
+    def log_stats(self):
+        st = self.stats()
+        logger.info("translation memory: %d hits / %d lookups (%.1f%%), %d entries in %s",
+                    st["hits"], st["hits"] + st["misses"], 100 * st["hit_rate"], st["entries"], self.path)
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+def get_memory():
+    """Process-wide TranslationMemory, or None when disabled via TRANSLATION_MEMORY=0."""
+    global _memory
+    if os.environ.get("TRANSLATION_MEMORY", "1").lower() in ("0", "false", "no", "off"):
+        return None
+    with _memory_lock:
+        # a forked worker must not reuse the parent's SQLite connection
+        if _memory is None or _memory.pid != os.getpid():
+            _memory = TranslationMemory(
+                os.environ.get("TRANSLATION_MEMORY_PATH", DEFAULT_TM_PATH),
+                int(os.environ.get("TRANSLATION_MEMORY_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            )
+    return _memory
@@ -1,65 +1,139 @@
 # src/translation/translator.py
 import os
 os.environ.setdefault("TRANSFORMERS_NO_TF", "1")
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, pipeline
 import re
-from src.utils import is_devanagari
+import threading
+from src.utils import is_devanagari, language_map, model_lock
+from src.translation.memory import get_memory, normalize_source
+from src.inference.scheduler import scheduler_enabled, get_scheduler
+from src.inference.weights import load_hf_model
+from src.pipeline.tracing import add
 from typing import List
 
-HI_TO_EN = "Helsinki-NLP/opus-mt-hi-en"
-EN_TO_HI = "Helsinki-NLP/opus-mt-en-hi"
+# override with local paths (e.g. the benchmark stand-ins) via env TRANSLATE_HI_EN_MODEL / TRANSLATE_EN_HI_MODEL
+HI_TO_EN = os.environ.get("TRANSLATE_HI_EN_MODEL", "Helsinki-NLP/opus-mt-hi-en")
+EN_TO_HI = os.environ.get("TRANSLATE_EN_HI_MODEL", "Helsinki-NLP/opus-mt-en-hi")
 _model_cache = {}
+_load_lock = threading.Lock()
+
+# sentences per generate() call; override with env TRANSLATE_BATCH_SIZE or batch_size=
+DEFAULT_BATCH_SIZE = int(os.environ.get("TRANSLATE_BATCH_SIZE", 16))
+# longer sentences are split into pieces of at most this many chars (avoids 512-token overflow)
+MAX_PIECE_CHARS = 300
+
+_CLAUSE_SPLIT = re.compile(r'(?<=[;:,।])\s+')
 
 def get_translator(model_name):
-    if model_name in _model_cache:
-        return _model_cache[model_name]
-    tok = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-    pipe = pipeline("translation", model=model, tokenizer=tok, device=-1)
-    _model_cache[model_name] = pipe
-    return pipe
+    """Returns (tokenizer, model) for a Marian model, loaded once."""
+    with _load_lock:
+        if model_name in _model_cache:
+            return _model_cache[model_name]
+        import torch
+        tok, model = load_hf_model(model_name)   # memory-mapped with MODEL_MMAP=1
+        model.to("cuda" if torch.cuda.is_available() else "cpu")
+        _model_cache[model_name] = (tok, model)
+        return tok, model
+
+def model_for_pair(src="hi", tgt="en"):
+    if src.startswith("hi") and tgt.startswith("en"):
+        return HI_TO_EN
+    if src.startswith("en") and tgt.startswith("hi"):
+        return EN_TO_HI
+    raise ValueError("Unsupported pair")
 
-def chunk_sentences(sentences, max_chars=384):
-    chunks=[]; curr=[]; curr_len=0
-    for s in sentences:
-        if curr_len + len(s) > max_chars and curr:
-            chunks.append(curr); curr=[s]; curr_len=len(s)
+def split_long_sentence(s: str, max_chars: int = MAX_PIECE_CHARS) -> List[str]:
+    """Split an over-long sentence at clause boundaries (then whitespace) into pieces <= max_chars."""
+    s = s.strip()
+    if len(s) <= max_chars:
+        return [s] if s else []
+    pieces, curr = [], ""
+    for clause in _CLAUSE_SPLIT.split(s):
+        while len(clause) > max_chars:
+            cut = clause.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if curr:
+                pieces.append(curr); curr = ""
+            pieces.append(clause[:cut].strip()); clause = clause[cut:].strip()
+        if curr and len(curr) + 1 + len(clause) > max_chars:
+            pieces.append(curr); curr = clause
         else:
-            curr.append(s); curr_len+=len(s)
-    if curr: chunks.append(curr)
-    return chunks
+            curr = f"{curr} {clause}".strip()
+    if curr:
+        pieces.append(curr)
+    return pieces
+
+def translate_batch(texts: List[str], model_name: str, batch_size: int = None, max_length: int = 256) -> List[str]:
+    """
+    Translate independent items in length-sorted buckets of batch_size; results come back
+    in the input order.
+    """
+    if not texts:
+        return []
+    import torch
+    batch_size = max(1, batch_size or DEFAULT_BATCH_SIZE)
+    tok, model = get_translator(model_name)
+
+    if scheduler_enabled():
+        # the scheduler buckets these together with other documents' sentences
+        sch = get_scheduler(tok, model)
+        futures = [sch.submit(t, max_input_len=512, max_length=max_length) for t in texts]
+        return [f.result().strip() for f in futures]
 
-def translate_sentences(sentences: List[str], src="hi", tgt="en") -> List[str]:
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    out = [""] * len(texts)
+    for b in range(0, len(order), batch_size):
+        idx = order[b:b + batch_size]
+        with model_lock(model), torch.no_grad():
+            enc = tok([texts[i] for i in idx], return_tensors="pt", padding=True,
+                      truncation=True, max_length=512).to(model.device)
+            gen = model.generate(**enc, max_length=max_length)
+            dec = tok.batch_decode(gen, skip_special_tokens=True, clean_up_tokenization_spaces=True)
+        add(tokens_in=int(enc["attention_mask"].sum()), tokens_out=int((gen != tok.pad_token_id).sum()))
+        for i, t in zip(idx, dec):
+            out[i] = t.strip()
+    return out
+
+def translate_sentences(sentences: List[str], src="hi", tgt="en", batch_size: int = None,
+                        use_memory: bool = True) -> List[str]:
+    """
+    One output per input sentence; each sentence (or piece of a long one) is its own batch item.
+    Pieces already in the translation memory (or repeated within the call) skip the model.
+    """
     if not sentences:
         return []
-    model_name = HI_TO_EN if src.startswith("hi") and tgt.startswith("en") else EN_TO_HI if src.startswith("en") and tgt.startswith("hi") else None
-    if model_name is None:
-        raise ValueError("Unsupported pair")
-    translator = get_translator(model_name)
+    model_name = model_for_pair(src, tgt)
 
-    # smaller chunks to avoid 512-token overflow
-    chunks = chunk_sentences(sentences, max_chars=300)
-    out=[]
-    for ch in chunks:
-        text = "\n".join(ch)
+    pieces, owner = [], []
+    for i, s in enumerate(sentences):
+        for p in split_long_sentence(s or ""):
+            pieces.append(p); owner.append(i)
 
-        # key fix – max_length and truncation
-        res = translator(
-            text,
-            max_length=256,
-            truncation=True,
-            clean_up_tokenization_spaces=True
-        )[0]["translation_text"]
+    memory = get_memory() if use_memory else None
+    pair = f"{src}-{tgt}"
+    uniq = list(dict.fromkeys(normalize_source(p) for p in pieces))
+    known = memory.get_many(uniq, pair, model_name) if memory else {}
+    todo = [u for u in uniq if u not in known]
+    new = translate_batch(todo, model_name, batch_size=batch_size)
+    if memory:
+        memory.put_many(list(zip(todo, new)), pair, model_name)
+    known.update(zip(todo, new))
+    translated = [known[normalize_source(p)] for p in pieces]
 
-        parts = res.split("\n")
-        if len(parts)==len(ch):
-            out.extend([p.strip() for p in parts])
-        else:
-            # fallback: sentence-wise splitting
-            cand = re.split(r'(?<=[।.!?])\s+', res)
-            if len(cand)==len(ch):
-                out.extend([c.strip() for c in cand])
-            else:
-                for _ in ch:
-                    out.append(res.strip())
-    return out[:len(sentences)]
+    parts = [[] for _ in sentences]
+    for i, t in zip(owner, translated):
+        parts[i].append(t)
+    return [" ".join(p).strip() for p in parts]
+
+def translate_mixed(sentences: List[str], lang_map: List[str] = None, src="hi", tgt="en", **kwargs) -> List[str]:
+    """
+    Translate only the sentences tagged `src` in lang_map (computed if not given); the others
+    (e.g. English passages of a bilingual order) pass through unchanged.
+    """
+    if not sentences:
+        return []
+    lang_map = lang_map or language_map(sentences)
+    idx = [i for i, l in enumerate(lang_map) if l == src[:2]]
+    out = list(sentences)
+    for i, t in zip(idx, translate_sentences([sentences[i] for i in idx], src=src, tgt=tgt, **kwargs)):
+        out[i] = t
+    return out
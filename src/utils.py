@@ -1,11 +1,22 @@
 # src/utils.py
 import hashlib
 import logging
-from nltk.tokenize.punkt import PunktSentenceTokenizer
+import threading
 import re
 
 logger = logging.getLogger(__name__)
-_SENT_TOKENIZER = PunktSentenceTokenizer()
+_SENT_TOKENIZER = None   # Punkt, built on first use (importing nltk is slow)
+
+_model_locks = {}
+_model_locks_guard = threading.Lock()
+
+def model_lock(model):
+    """
+    One lock per loaded model object. Model globals are shared by every thread of a process,
+    and HF fast tokenizers / generate() are not safe to drive from two threads at once.
+    """
+    with _model_locks_guard:
+        return _model_locks.setdefault(id(model), threading.RLock())
 
 def md5_of_file(path, block_size=65536):
     h = hashlib.md5()
@@ -18,14 +29,54 @@ def sentence_spans(text):
     """
     returns list of (start, end, sentence_text)
     """
+    global _SENT_TOKENIZER
+    if _SENT_TOKENIZER is None:
+        from nltk.tokenize.punkt import PunktSentenceTokenizer
+        _SENT_TOKENIZER = PunktSentenceTokenizer()
     spans = []
     for s,e in _SENT_TOKENIZER.span_tokenize(text):
         spans.append((s,e,text[s:e].strip()))
     return spans
 
+_HI_SENT_SPLIT = re.compile(r'(?<=[।.!?])\s+')
+
+def split_hindi_sentences(text):
+    """Danda-aware sentence split (Punkt does not break on '।')."""
+    text = (text or "").strip()
+    return [s for s in _HI_SENT_SPLIT.split(text) if s.strip()] if text else []
+
 def is_devanagari(text, threshold=10):
     return sum(1 for ch in text if '\u0900' <= ch <= '\u097F') >= threshold
 
 def safe_filename(s):
     # small helper to make filename-friendly doc ids
     return re.sub(r'[^0-9A-Za-z_\-\.]', '_', s)[:200]
+
+def _script_counts(text):
+    deva = sum(1 for ch in text if '\u0900' <= ch <= '\u097F')
+    latin = sum(1 for ch in text if ('a' <= ch <= 'z') or ('A' <= ch <= 'Z'))
+    return deva, latin
+
+def language_map(sentences, min_hi_ratio=0.3):
+    """
+    Per-sentence script decision: "hi" if Devanagari letters make up >= min_hi_ratio of the
+    letters, else "en". Sentences with no letters (numbers, punctuation) inherit the previous label.
+    """
+    labels = []
+    prev = "en"
+    for s in sentences:
+        deva, latin = _script_counts(s or "")
+        if deva + latin:
+            prev = "hi" if deva / (deva + latin) >= min_hi_ratio else "en"
+        labels.append(prev)
+    return labels
+
+def language_runs(labels):
+    """Run-length form of a language map for JSON output: [{"start", "end" (exclusive), "lang"}]."""
+    runs = []
+    for i, lang in enumerate(labels):
+        if runs and runs[-1]["lang"] == lang:
+            runs[-1]["end"] = i + 1
+        else:
+            runs.append({"start": i, "end": i + 1, "lang": lang})
+    return runs
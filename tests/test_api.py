@@ -0,0 +1,211 @@
+# tests/test_api.py
+"""
+In-process integration tests of the HTTP API (fastapi.testclient; no server, no models).
+The JobManager gets a stub process_fn and the streaming endpoint a stub event generator, so
+only the API layer runs: uploads, dedup, job lanes, status/result, sync size limit, NDJSON.
+Run from project root: python -m pytest tests/
+"""
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")   # fastapi.testclient
+from fastapi.testclient import TestClient
+
+import app.api as api
+
+PDF = b"%PDF-1.4\n% tiny stand-in upload\n"
+
+
+def _upload(data=PDF, name="judgment.pdf"):
+    return {"file": (name, data, "application/pdf")}
+
+
+def _wait(client, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = client.get(f"/jobs/{job_id}").json()
+        if status["status"] in ("done", "failed"):
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def gate():
+    ev = threading.Event()
+    ev.set()   # tests that need a job to stay running clear it
+    return ev
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, calls, gate):
+    def process(pdf_path, settings):
+        gate.wait(5)
+        calls.append((pdf_path, settings))
+        if "fail" in Path(pdf_path).name:
+            raise RuntimeError("boom")
+        return {"doc_id": Path(pdf_path).stem, "mode": settings["mode"]}
+
+    monkeypatch.setattr(api, "UPLOAD_DIR", tmp_path / "uploads")
+    monkeypatch.setattr(api, "manager", api.JobManager(workers=1, sync_workers=1, process_fn=process))
+    with TestClient(api.app) as c:
+        yield c
+
+
+def test_upload_dedup_by_md5_and_settings(client, calls):
+    first = client.post("/jobs", files=_upload()).json()
+    again = client.post("/jobs", files=_upload(name="renamed.pdf")).json()
+    other_settings = client.post("/jobs", files=_upload(), data={"mode": "extractive"}).json()
+    other_content = client.post("/jobs", files=_upload(PDF + b"x")).json()
+
+    assert first["deduplicated"] is False
+    assert again == {**first, "deduplicated": True, "status": again["status"]}
+    assert other_settings["job_id"] != first["job_id"] and other_settings["deduplicated"] is False
+    assert other_content["job_id"] != first["job_id"] and other_content["deduplicated"] is False
+    for job in (first, other_settings, other_content):
+        assert _wait(client, job["job_id"])["status"] == "done"
+    assert len(calls) == 3
+
+    # a finished job is still the answer for the same upload + settings
+    assert client.post("/jobs", files=_upload()).json()["job_id"] == first["job_id"]
+    assert len(calls) == 3
+
+
+def test_job_status_and_result(client, gate):
+    assert client.get("/jobs/nope").status_code == 404
+    assert client.get("/jobs/nope/result").status_code == 404
+
+    gate.clear()
+    job_id = client.post("/jobs", files=_upload(), data={"mode": "extractive"}).json()["job_id"]
+    status = client.get(f"/jobs/{job_id}").json()
+    assert status["status"] in ("queued", "running") and status["lane"] == "bulk"
+    assert status["settings"]["mode"] == "extractive"
+    assert client.get(f"/jobs/{job_id}/result").status_code == 409
+    gate.set()
+
+    status = _wait(client, job_id)
+    assert status["status"] == "done" and status["finished_at"] >= status["started_at"]
+    result = client.get(f"/jobs/{job_id}/result")
+    assert result.status_code == 200
+    assert result.json() == {"doc_id": "judgment", "mode": "extractive"}
+
+
+def test_failed_job(client):
+    job_id = client.post("/jobs", files=_upload(name="fail.pdf")).json()["job_id"]
+    assert _wait(client, job_id)["error"] == "boom"
+    assert client.get(f"/jobs/{job_id}/result").status_code == 500
+
+
+def test_summarize_sync(client, calls):
+    r = client.post("/summarize", files=_upload(), data={"mode": "extractive"})
+    assert r.status_code == 200
+    assert r.json() == {"doc_id": "judgment", "mode": "extractive"}
+    # same upload + settings through /jobs: deduplicated onto the finished sync job
+    job = client.post("/jobs", files=_upload(), data={"mode": "extractive"}).json()
+    assert job["deduplicated"] is True
+    assert client.get(f"/jobs/{job['job_id']}").json()["lane"] == "sync"
+    assert len(calls) == 1
+
+
+def test_summarize_sync_size_limit(client, calls, monkeypatch):
+    monkeypatch.setattr(api, "SYNC_MAX_BYTES", len(PDF) - 1)
+    r = client.post("/summarize", files=_upload())
+    assert r.status_code == 413
+    assert calls == []
+    monkeypatch.setattr(api, "SYNC_MAX_BYTES", len(PDF))
+    assert client.post("/summarize", files=_upload()).status_code == 200
+
+
+def test_summarize_sync_not_behind_bulk_jobs(client, gate, calls):
+    gate.clear()
+    bulk = client.post("/jobs", files=_upload(PDF + b"bulk")).json()["job_id"]
+    queued = client.post("/jobs", files=_upload(PDF + b"queued")).json()["job_id"]
+    result = {}
+    t = threading.Thread(target=lambda: result.update(r=client.post("/summarize", files=_upload())))
+    t.start()
+    time.sleep(0.1)
+    gate.set()
+    t.join(5)
+    assert result["r"].status_code == 200
+    _wait(client, bulk), _wait(client, queued)
+    # the sync request did not wait for the queued bulk job
+    names = [Path(p).parent.name for p, _ in calls]
+    assert names.index(hashlib.md5(PDF).hexdigest()) < names.index(hashlib.md5(PDF + b"queued").hexdigest())
+
+
+def _ndjson(r):
+    return [json.loads(line) for line in r.text.splitlines() if line.strip()]
+
+
+def test_summarize_stream_events(client, monkeypatch):
+    seen = {}
+
+    def fake_iter(pdf_path, settings):
+        seen["settings"] = settings
+        yield {"event": "extracted", "doc_id": Path(pdf_path).stem, "language_detected": "en"}
+        yield {"event": "citations", "citations_count": 0, "citation_contexts": []}
+        if settings["stream_tokens"]:
+            yield {"event": "summary_en_token", "text": "A "}
+            yield {"event": "summary_en_token", "text": "summary."}
+        yield {"event": "summary_en", "text": "A summary."}
+        yield {"event": "result", "result": {"doc_id": Path(pdf_path).stem}}
+
+    monkeypatch.setattr(api, "_iter_process", fake_iter)
+    r = client.post("/summarize/stream", files=_upload())
+    assert r.status_code == 200 and r.headers["content-type"].startswith("application/x-ndjson")
+    events = [e["event"] for e in _ndjson(r)]
+    assert events == ["extracted", "citations", "summary_en", "result"]
+    assert seen["settings"]["stream_tokens"] is False
+
+    r = client.post("/summarize/stream", files=_upload(), data={"stream_tokens": "true"})
+    events = [e["event"] for e in _ndjson(r)]
+    assert events == ["extracted", "citations", "summary_en_token", "summary_en_token", "summary_en", "result"]
+
+
+def test_summarize_stream_not_behind_bulk_jobs(client, gate, monkeypatch):
+    def fake_iter(pdf_path, settings):
+        yield {"event": "result", "result": {"doc_id": Path(pdf_path).stem}}
+
+    monkeypatch.setattr(api, "_iter_process", fake_iter)
+    gate.clear()
+    bulk = client.post("/jobs", files=_upload(PDF + b"bulk")).json()["job_id"]
+    client.post("/jobs", files=_upload(PDF + b"queued"))
+    result = {}
+    t = threading.Thread(target=lambda: result.update(r=client.post("/summarize/stream", files=_upload())))
+    t.start()
+    t.join(2)
+    # the stream finished while the bulk lane was still blocked
+    finished, running = not t.is_alive(), client.get(f"/jobs/{bulk}").json()["status"]
+    gate.set()
+    t.join(5)
+    assert finished and running == "running"
+    assert _ndjson(result["r"]) == [{"event": "result", "result": {"doc_id": "judgment"}}]
+
+
+def test_summarize_stream_error_event(client, monkeypatch):
+    def failing(pdf_path, settings):
+        yield {"event": "extracted", "doc_id": "x"}
+        raise RuntimeError("extract failed")
+
+    monkeypatch.setattr(api, "_iter_process", failing)
+    events = _ndjson(client.post("/summarize/stream", files=_upload()))
+    assert events[-1] == {"event": "error", "error": "extract failed"}
+
+
+def test_summarize_stream_replays_finished_job(client, monkeypatch):
+    job_id = client.post("/jobs", files=_upload()).json()["job_id"]
+    _wait(client, job_id)
+    monkeypatch.setattr(api, "_iter_process", lambda *a: pytest.fail("finished job was reprocessed"))
+    events = _ndjson(client.post("/summarize/stream", files=_upload()))
+    assert events == [{"event": "result", "result": {"doc_id": "judgment", "mode": "generative"}}]
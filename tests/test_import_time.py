@@ -0,0 +1,24 @@
+# tests/test_import_time.py
+"""
+Cold-start budget of the lightweight entry points (scripts.check_import_time as a test): each one
+imports in a fresh interpreter within IMPORT_BUDGET_SEC (default 1.0) without heavy libraries.
+An import error fails the test; with IMPORT_ALLOW_MISSING_DEPS=1 an entry point whose third-party
+dependency is not installed is skipped instead (reported, never silently passed).
+"""
+import os
+
+import pytest
+
+from scripts.check_import_time import LIGHT, probe, verdict
+
+BUDGET = float(os.environ.get("IMPORT_BUDGET_SEC", 1.0))
+ALLOW_MISSING = os.environ.get("IMPORT_ALLOW_MISSING_DEPS", "0").lower() in ("1", "true", "yes", "on")
+
+
+@pytest.mark.parametrize("module", LIGHT)
+def test_light_entry_point_imports_fast(module):
+    res = probe(module, repeat=2)
+    status, note = verdict(module, res, BUDGET, allow_missing_deps=ALLOW_MISSING)
+    if status == "skipped":
+        pytest.skip(note)
+    assert status == "ok", f"{module}: {note} ({res})"